@@ -23,6 +23,24 @@ def parse_args() -> argparse.Namespace:
         ),
     )
 
+    parser.add_argument(
+        "--only-status",
+        help=(
+            "Dynamic analysis: comma-separated exec_status values of the commits to analyze, "
+            "e.g., none,clone_and_checkout_repo ('none' for commits without status)."
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Dynamic analysis: also analyze successful commits and commits that failed for good.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Dynamic analysis: only report the planned workload.",
+    )
+
     parser.add_argument(
         "--evaluation-type",
         choices=["patch", "test"],
@@ -98,7 +116,7 @@ def main() -> None:
     elif args.analysis_type == "dynamic":
         logging.info("Starting dynamic analysis (run_analysis)")
         from src.run_analysis import run as run_dynamic_analysis
-        run_dynamic_analysis()
+        run_dynamic_analysis(_parse_csv_list(args.only_status), args.force, args.dry_run)
     else:
         logging.info("Starting evaluation harness")
         from src.evaluation.evaluators import PatchEvaluator, TestEvaluator
@@ -9,7 +9,7 @@ import pandas as pd
 from github import Auth, Github
 
 import src.config as conf
-from src.data.dataset_adapter import DatasetAdapter
+from src.data.dataset_adapter import create_dataset_adapter
 
 
 def print_five_number_summary(name: str, values: list[float]) -> None:
@@ -26,38 +26,57 @@ def print_five_number_summary(name: str, values: list[float]) -> None:
 
 logs = ['logs/logging_2026-01-08-22-31.log', 'logs/logging_2026-01-10-21-51.log', 'logs/logging_2026-01-16-13-55.log']
 
-found_commits = set()
-all_checked_commits = set()
-commit_to_time = {}
-durations = []
-for l in logs:
-    with open(l, 'r') as f:
-        is_new_day = False
-        days = 0
-        for line in f:
-            line = line.strip()
-            commit = line.split(' ')[5]
-            if not commit in commit_to_time:
-                time = line.split(' ')[0]
-                commit_to_time[commit] = {'start': time}
-            if 'Analysis Result' in line:
-                if not 'end' in commit_to_time[commit]:
-                    commit_to_time[commit]['end'] = line.split(' ')[0]
-
-for commit, times in commit_to_time.items():
-    if 'end' in times:
-        start = times['start']
-        end = times['end']
-        # start and end have the format: 13:55:19,384
-        start_time = datetime.strptime(start, '%H:%M:%S,%f')
-        end_time = datetime.strptime(end, '%H:%M:%S,%f')
-        duration = (end_time - start_time).total_seconds()
-        if duration < 0:
-            print("negative")
-            duration += 3600 * 24
-        if duration > 10000:
+
+def durations_from_logs() -> dict[str, float]:
+    """Analysis durations per commit scraped from the logs of the runs before the dataset event log."""
+    commit_to_time = {}
+    durations = {}
+    for l in logs:
+        if not Path(l).exists():
+            print(f"Missing log {l}, its analyses are not counted")
             continue
-        durations.append(duration)
+        with open(l, 'r') as f:
+            for line in f:
+                line = line.strip()
+                commit = line.split(' ')[5]
+                if not commit in commit_to_time:
+                    time = line.split(' ')[0]
+                    commit_to_time[commit] = {'start': time}
+                if 'Analysis Result' in line:
+                    if not 'end' in commit_to_time[commit]:
+                        commit_to_time[commit]['end'] = line.split(' ')[0]
+
+    for commit, times in commit_to_time.items():
+        if 'end' in times:
+            start = times['start']
+            end = times['end']
+            # start and end have the format: 13:55:19,384
+            start_time = datetime.strptime(start, '%H:%M:%S,%f')
+            end_time = datetime.strptime(end, '%H:%M:%S,%f')
+            duration = (end_time - start_time).total_seconds()
+            if duration < 0:
+                print("negative")
+                duration += 3600 * 24
+            if duration > 10000:
+                continue
+            durations[commit] = duration
+    return durations
+
+
+def durations_from_events(stages: pd.DataFrame) -> list[float]:
+    """Durations of the analysis runs that ended with a successful maven execution."""
+    runs = stages.groupby(['repo', 'after_commit', 'run'])
+    totals = runs['seconds'].sum()[runs['stage'].last() == 'maven_execution_successful']
+    return totals.tolist()
+
+
+stages = create_dataset_adapter().stage_durations()
+durations = durations_from_events(stages)
+for stage, seconds in stages.groupby('stage')['seconds']:
+    print_five_number_summary(f'{stage} durations (s)', seconds.tolist())
+# The analyses of the commits without events predate the event log
+logged = set(stages['after_commit'])
+durations += [duration for commit, duration in durations_from_logs().items() if commit not in logged]
 print(durations)
 print_five_number_summary('Commit analysis durations (s)', durations)
 
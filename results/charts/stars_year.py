@@ -5,10 +5,9 @@ from pathlib import Path
 
 import matplotlib.pyplot as plt
 import pandas as pd
-from github import Auth, Github
 
-import src.config as conf
 from src.data.dataset_adapter import DatasetAdapter
+from src.gh.client import get_github_client, get_http_cache, get_rate_limit_scheduler
 
 OUTPUT_DIR = Path("results/charts")
 YEAR_OUTPUT_STEM = "commits_by_year_stacked"
@@ -48,11 +47,6 @@ def save_cache(path: Path, cache: dict) -> None:
     path.write_text(json.dumps(cache, indent=2, sort_keys=True), encoding="utf-8")
 
 
-def get_github_client() -> Github:
-    token = conf.github["access-token"]
-    return Github(auth=Auth.Token(token))
-
-
 def ensure_commit_years_and_stars(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
     cache = load_cache(CACHE_PATH)
     commit_year_by_repo_sha = cache.setdefault("commit_year_by_repo_sha", {})
@@ -107,6 +101,9 @@ def ensure_commit_years_and_stars(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]
 
     save_cache(CACHE_PATH, cache)
     github_client.close()
+    for stats in (get_http_cache(), get_rate_limit_scheduler()):
+        if stats is not None:
+            print(stats.summary())
 
     df["commit_year"] = df.apply(
         lambda row: commit_year_by_repo_sha.get(
@@ -0,0 +1,144 @@
+"""
+Offline end-to-end benchmark of CommitCollector throughput, in candidate commits per second.
+
+The whole collection runs against the local GitHub stand-in server: the repository search, commit
+fetching, issue resolution and the pull-request stage. The LLM requests are answered by
+ReplayLLMAdapter from recorded invocations, after a simulated latency. A first, untimed run records the
+answers to the fixture prompts (from the fixture's own labels) unless --recordings already holds them,
+so the timed runs are replayed only and reproducible.
+
+Usage: python -m scripts.bench_collector --repos 3 --commits 500 --workers 4 --latency lognormal:0.8,0.5 --runs 3
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+for var in ('OPENROUTER_API_KEY', 'OPENAI_API_KEY', 'github_access_token', 'workingdir'):
+    os.environ.setdefault(var, 'offline')
+
+import src.config as conf
+from src.data.dataset_adapter import DatasetBatch
+from src.gh.client import get_github_client
+from src.gh.commit_collector import CommitCollector
+from src.llm.invocation import Prompt
+from src.llm.replay import ReplayLLMAdapter
+from scripts.github_stub_server import GitHubStubServer, make_fixture
+
+
+class _InMemoryDataset:
+    """Keeps the found commits in memory instead of results/dataset.csv."""
+
+    def __init__(self):
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def contains(self, repo: str, sha: str) -> bool:
+        return False
+
+    def add_or_update_commits(self, rows: list[dict]) -> None:
+        with self._lock:
+            self.rows.extend(rows)
+
+    def batch(self) -> DatasetBatch:
+        return DatasetBatch(self)
+
+
+class _BenchCollector(CommitCollector):
+    """Collector counting the candidate commits it classifies."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dataset = _InMemoryDataset()
+        self.candidates = 0
+        self._candidates_lock = threading.Lock()
+
+    def fixed_performance_issue(self, repo, commit):
+        with self._candidates_lock:
+            self.candidates += 1
+        return super().fixed_performance_issue(repo, commit)
+
+
+def fixture_answer(prompt: Prompt) -> str:
+    """The answer of a well-behaved model for a fixture issue: its slow issues are the performance issues."""
+    content = prompt.messages[0].content
+    verdict = 'yes' if 'slow' in content.split('###Issue Body End###')[0].lower() else 'no'
+    if 'confidence' not in content:
+        return verdict
+    # Confidences spread around the cascade threshold, so some answers are escalated
+    return f"{verdict} {50 + int(hashlib.md5(content.encode('utf-8')).hexdigest()[:4], 16) % 50}"
+
+
+def run(stub: GitHubStubServer, recordings_dir: str, latency: str, seed: int, workers: int, record: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Fresh caches and checkpoint, so every run does the same work
+        conf.perf_commit['checkpoint-path'] = os.path.join(tmp_dir, 'checkpoint.json')
+        conf.perf_commit['issue-cache-dir'] = os.path.join(tmp_dir, 'issues')
+        conf.perf_commit['pr-cache-dir'] = os.path.join(tmp_dir, 'pulls')
+        conf.perf_commit['num-workers'] = workers
+        conf.llm['llm-invocation-cache-dir'] = os.path.join(tmp_dir, 'llm')
+        conf.llm['telemetry-report-path'] = os.path.join(tmp_dir, 'telemetry.csv')
+        # The local server needs no pacing or HTTP cache
+        conf.github['access-tokens'] = []
+        conf.github['http-cache-enabled'] = False
+
+        # One more connection than workers for the repository search
+        g = get_github_client('offline', base_url=stub.base_url, pool_size=workers + 1, per_page=100,
+                              seconds_between_requests=None, seconds_between_writes=None)
+        fallback = fixture_answer if record else None
+        adapters = [ReplayLLMAdapter(model, recordings_dir, latency, seed, fallback)
+                    for model in ('openai/gpt-5-nano', 'openai/gpt-5.1-codex-mini')]
+        collector = _BenchCollector(g, *adapters)
+
+        stub.reset_counts()
+        started = time.perf_counter()
+        collector.collect_commits()
+        seconds = time.perf_counter() - started
+        collector.close()
+
+    return {
+        'seconds': seconds,
+        'candidates': collector.candidates,
+        'found': len(collector.dataset.rows),
+        'github_requests': stub.total_requests(),
+        'llm_calls': sum(adapter.stats['api'] for adapter in adapters),
+        'recorded': sum(adapter.stats['replay_misses'] for adapter in adapters),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repos', type=int, default=3)
+    parser.add_argument('--commits', type=int, default=500, help='Commits per repository.')
+    parser.add_argument('--workers', type=int, default=conf.perf_commit['num-workers'])
+    parser.add_argument('--latency', default='lognormal:0.8,0.5', help='Simulated LLM latency, see src/llm/replay.py.')
+    parser.add_argument('--github-latency', type=float, default=0.0, help='Seconds added to every GitHub request.')
+    parser.add_argument('--recordings', default=None, help='Recorded invocations (default: a temporary directory).')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    fixture = make_fixture(args.repos, args.commits, args.seed)
+    with tempfile.TemporaryDirectory() as tmp_recordings, \
+            GitHubStubServer(fixture, latency=args.github_latency) as stub:
+        recordings_dir = args.recordings or tmp_recordings
+        res = run(stub, recordings_dir, 'none', args.seed, args.workers, record=True)
+        print(f"Recording run: {res['recorded']} answers recorded in {recordings_dir}.")
+
+        throughputs = []
+        for i in range(args.runs):
+            res = run(stub, recordings_dir, args.latency, args.seed, args.workers, record=False)
+            throughputs.append(res['candidates'] / res['seconds'])
+            print(f"Run {i + 1}: {res['candidates']} candidate commits in {res['seconds']:.2f}s -> "
+                  f"{throughputs[-1]:.2f} commits/s ({res['found']} performance commits, "
+                  f"{res['github_requests']} GitHub requests, {res['llm_calls']} LLM calls)")
+        throughputs.sort()
+        print(f"Median throughput with {args.workers} worker(s) and LLM latency {args.latency}: "
+              f"{throughputs[len(throughputs) // 2]:.2f} commits/s")
+
+
+if __name__ == '__main__':
+    main()
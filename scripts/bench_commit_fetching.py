@@ -0,0 +1,73 @@
+"""
+Benchmark the GitHub requests spent per accepted commit by the REST and the GraphQL commit fetch paths
+of CommitCollector, against the local GitHub stand-in server (no network access or tokens needed).
+
+Usage: python -m scripts.bench_commit_fetching --repos 3 --commits 500
+"""
+
+import argparse
+import os
+import time
+
+for var in ('OPENROUTER_API_KEY', 'OPENAI_API_KEY', 'github_access_token', 'workingdir'):
+    os.environ.setdefault(var, 'offline')
+
+import src.config as conf
+from src.gh.client import get_github_client
+from src.gh.commit_collector import CommitCollector
+from scripts.github_stub_server import GitHubStubServer, make_fixture
+
+
+class _FilterOnlyCollector(CommitCollector):
+    """Collector that does not consult results/dataset.csv, so only GitHub requests are measured."""
+    def _is_new_commit(self, repo, sha: str) -> bool:
+        return self._claim_commit(sha)
+
+
+def run_mode(stub: GitHubStubServer, mode: str) -> dict:
+    # The local server needs no pacing, and the HTTP cache would hide the requests being measured
+    conf.github['access-tokens'] = []
+    conf.github['http-cache-enabled'] = False
+    g = get_github_client('offline', base_url=stub.base_url,
+                          seconds_between_requests=None, seconds_between_writes=None)
+    collector = _FilterOnlyCollector(g)
+    collector.commit_fetch_mode = mode
+
+    repos = [g.get_repo(name) for name in stub.fixture['repos']]
+    stub.reset_counts()
+    started = time.perf_counter()
+    accepted = 0
+    for repo in repos:
+        accepted += sum(1 for _ in collector.iter_candidate_commits(repo))
+    elapsed = time.perf_counter() - started
+    g.close()
+
+    return {
+        'mode': mode,
+        'accepted': accepted,
+        'requests': stub.total_requests(),
+        'per_route': dict(stub.request_counts),
+        'seconds': elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repos', type=int, default=3)
+    parser.add_argument('--commits', type=int, default=500, help='Commits per repository.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    fixture = make_fixture(args.repos, args.commits, args.seed)
+    total_commits = args.repos * args.commits
+    with GitHubStubServer(fixture) as stub:
+        for mode in ('rest', 'graphql'):
+            res = run_mode(stub, mode)
+            per_accepted = res['requests'] / res['accepted'] if res['accepted'] else float('nan')
+            print(f"{mode:>8}: {res['requests']} requests for {total_commits} commits, "
+                  f"{res['accepted']} accepted -> {per_accepted:.2f} requests/accepted commit "
+                  f"({res['seconds']:.2f}s) {res['per_route']}")
+
+
+if __name__ == '__main__':
+    main()
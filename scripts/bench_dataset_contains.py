@@ -0,0 +1,100 @@
+"""
+Micro-benchmark of DatasetAdapter.contains: the former implementation (exclusive lock, full reload and
+parsing of the dataset on every call) against the in-memory commit index. Synthetic datasets are written
+to a temporary directory.
+
+Usage: python -m scripts.bench_dataset_contains --sizes 1000 10000 100000 --lookups 1000
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import random
+import tempfile
+import time
+
+for var in ('OPENROUTER_API_KEY', 'OPENAI_API_KEY', 'github_access_token', 'workingdir'):
+    os.environ.setdefault(var, 'offline')
+
+import pandas as pd
+from src.data.dataset_adapter import DatasetAdapter
+
+
+def legacy_contains(adapter: DatasetAdapter, repo: str, after_commit: str) -> bool:
+    """DatasetAdapter.contains before the commit index."""
+    lock_file = adapter._get_file_lock()
+    try:
+        df = adapter._load_dataset()
+        mask = (df["repo"] == repo) & (df["after_commit"] == after_commit)
+        return mask.any()
+    finally:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        lock_file.close()
+
+
+def write_dataset(path: str, size: int, rnd: random.Random) -> list[tuple[str, str]]:
+    keys = [(f"owner{i % 500}/repo{i % 500}", '%040x' % rnd.getrandbits(160)) for i in range(size)]
+    pd.DataFrame({
+        "repo": [repo for repo, _ in keys],
+        "after_commit": [sha for _, sha in keys],
+        "issue_number": [rnd.randint(1, 10000) for _ in keys],
+        "exec_status": ["done"] * size,
+        "exec_time_improvement": [rnd.random() for _ in keys],
+        "p_value": [rnd.random() for _ in keys],
+        "test_class_improvements": [json.dumps({f"Test{j}": rnd.random() for j in range(3)}) for _ in keys],
+        "before_commit": ['%040x' % rnd.getrandbits(160) for _ in keys],
+        "pr_number": [None] * size,
+        "is_improvement_per_manual_analysis": [None] * size,
+        "modified_modules": [json.dumps(["core", "server"])] * size,
+        "changed_files": [json.dumps([f"core/src/main/java/A{j}.java" for j in range(3)])] * size,
+    }).to_csv(path, index=False)
+    return keys
+
+
+def time_calls(contains, queries: list[tuple[str, str]]) -> float:
+    started = time.perf_counter()
+    for repo, sha in queries:
+        contains(repo, sha)
+    return (time.perf_counter() - started) / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--lookups', type=int, default=1000, help='Lookups with the index, half of them misses.')
+    parser.add_argument('--legacy-lookups', type=int, default=5, help='The former implementation is slow, it gets fewer lookups.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'dataset.csv')
+            keys = write_dataset(path, size, rnd)
+
+            def sample(n):
+                return [rnd.choice(keys) if i % 2 == 0 else ('owner0/repo0', '%040x' % rnd.getrandbits(160)) for i in range(n)]
+
+            adapter = DatasetAdapter(path)
+            legacy = time_calls(lambda r, s: legacy_contains(adapter, r, s), sample(args.legacy_lookups))
+            started = time.perf_counter()
+            adapter.contains(*keys[0])
+            cold = time.perf_counter() - started
+            indexed = time_calls(adapter.contains, sample(args.lookups))
+
+            # Another process appends a commit: the next lookup reloads the index
+            DatasetAdapter(path).add_or_update_commit(
+                repo='owner0/repo0', after_commit='f' * 40, issue_number=1, exec_status=None, exec_time_improvement=None,
+                p_value=None, test_class_improvements=None, before_commit=None, pr_number=None,
+                is_improvement_per_manual_analysis=None, modified_modules=None, changed_files=None)
+            started = time.perf_counter()
+            assert adapter.contains('owner0/repo0', 'f' * 40)
+            reload = time.perf_counter() - started
+
+            print(f"{size:>7} rows: legacy {1000 * legacy:9.2f} ms/lookup, indexed {1000 * indexed:7.4f} ms/lookup "
+                  f"({legacy / indexed:,.0f}x faster), index load {1000 * cold:7.1f} ms, reload after a write {1000 * reload:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
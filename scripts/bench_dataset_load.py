@@ -0,0 +1,76 @@
+"""
+Benchmark of loading the dataset from the CSV (parsing the JSON columns of every row) against loading
+it from the Parquet sidecar (native list and map columns). The datasets are results/dataset.csv and
+copies of it grown to the given sizes by repeating its rows with new commit hashes, in a temporary
+directory. Needs pyarrow.
+
+Usage: python -m scripts.bench_dataset_load --sizes 10000 100000 --runs 5
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+for var in ('OPENROUTER_API_KEY', 'OPENAI_API_KEY', 'github_access_token', 'workingdir'):
+    os.environ.setdefault(var, 'offline')
+
+import pandas as pd
+import src.config as conf
+from src.data import dataset_parquet
+from src.data.dataset_adapter import DatasetAdapter
+
+
+def grow_dataset(source: str, path: str, size: int) -> None:
+    df = pd.read_csv(source, dtype=str, keep_default_na=False)
+    copies = -(-size // len(df))
+    grown = pd.concat([df] * copies, ignore_index=True).head(size)
+    grown["after_commit"] = [f"{i:040x}" for i in range(size)]
+    grown.to_csv(path, index=False)
+
+
+def median_seconds(load, runs: int) -> tuple[float, pd.DataFrame]:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        df = load()
+        times.append(time.perf_counter() - started)
+    return sorted(times)[len(times) // 2], df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dataset', default=conf.data['dataset-path'])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10_000, 100_000])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    if not dataset_parquet.available():
+        parser.error("pyarrow is not installed")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in [None] + args.sizes:
+            path = os.path.join(tmp_dir, f"dataset_{size or 'original'}.csv")
+            if size is None:
+                shutil.copy(args.dataset, path)
+            else:
+                grow_dataset(args.dataset, path, size)
+            adapter = DatasetAdapter(path)
+
+            conf.data['parquet-sidecar'] = False
+            csv_seconds, csv_df = median_seconds(lambda: adapter._load_dataset(), args.runs)
+            started = time.perf_counter()
+            dataset_parquet.write_sidecar(csv_df, adapter.parquet_path, adapter._file_signature())
+            write_seconds = time.perf_counter() - started
+            conf.data['parquet-sidecar'] = True
+            parquet_seconds, parquet_df = median_seconds(lambda: adapter._load_dataset(), args.runs)
+            # The sidecar holds the same dataset
+            assert parquet_df.equals(csv_df) and (parquet_df.dtypes == csv_df.dtypes).all()
+
+            print(f"{len(csv_df):>7} rows: CSV {1000 * csv_seconds:8.1f} ms ({os.path.getsize(path) / 1e6:6.1f} MB), "
+                  f"Parquet {1000 * parquet_seconds:8.1f} ms ({os.path.getsize(adapter.parquet_path) / 1e6:6.1f} MB), "
+                  f"{csv_seconds / parquet_seconds:5.1f}x faster; writing the sidecar took {1000 * write_seconds:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
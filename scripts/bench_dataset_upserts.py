@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of DatasetAdapter.add_or_update_commit with the CSV and the SQLite backends: status
+updates of existing commits of a synthetic dataset, from several worker processes at once, while one more
+process keeps reading the dataset. Datasets are written to a temporary directory.
+
+Usage: python -m scripts.bench_dataset_upserts --sizes 1000 10000 --updates 200 --processes 4
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import time
+
+for var in ('OPENROUTER_API_KEY', 'OPENAI_API_KEY', 'github_access_token', 'workingdir'):
+    os.environ.setdefault(var, 'offline')
+
+from src.data.dataset_adapter import DatasetAdapter
+from src.data.sqlite_dataset_adapter import SQLiteDatasetAdapter
+from scripts.bench_dataset_contains import write_dataset
+
+
+def update(adapter, keys: list[tuple[str, str]]) -> None:
+    for i, (repo, sha) in enumerate(keys):
+        adapter.add_or_update_commit(
+            repo=repo, after_commit=sha, issue_number=None, exec_status=f"status-{i}", exec_time_improvement=None,
+            p_value=None, test_class_improvements=None, before_commit=None, pr_number=None,
+            is_improvement_per_manual_analysis=None, modified_modules=None, changed_files=None)
+
+
+def read_until(adapter, stop, reads) -> None:
+    while not stop.is_set():
+        adapter.df = None
+        adapter.get_dataset()
+        with reads.get_lock():
+            reads.value += 1
+
+
+def run(adapter, keys: list[tuple[str, str]], processes: int) -> tuple[float, int]:
+    """Seconds to apply the updates, split over the processes, and the full reads done meanwhile."""
+    chunks = [keys[i::processes] for i in range(processes)]
+    stop, reads = mp.Event(), mp.Value('i', 0)
+    reader = mp.Process(target=read_until, args=(adapter, stop, reads))
+    reader.start()
+    started = time.perf_counter()
+    workers = [mp.Process(target=update, args=(adapter, chunk)) for chunk in chunks]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - started
+    stop.set()
+    reader.join()
+    return seconds, reads.value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000])
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'dataset.csv')
+            keys = write_dataset(csv_path, size, rnd)
+            sqlite = SQLiteDatasetAdapter(os.path.join(tmp_dir, 'dataset.sqlite'))
+            sqlite.import_csv(csv_path)
+            updated = rnd.sample(keys, min(args.updates, size))
+
+            results = {}
+            for name, adapter in (('csv', DatasetAdapter(csv_path)), ('sqlite', sqlite)):
+                results[name] = run(adapter, updated, args.processes)
+            # Both backends end with the same dataset
+            sqlite.export_csv(os.path.join(tmp_dir, 'exported.csv'))
+            exported = DatasetAdapter(os.path.join(tmp_dir, 'exported.csv')).get_dataset()
+            assert exported.equals(DatasetAdapter(csv_path).get_dataset())
+
+            line = ', '.join(f"{name} {1000 * seconds / len(updated):8.2f} ms/update ({reads / seconds:6.1f} concurrent full reads/s)"
+                             for name, (seconds, reads) in results.items())
+            print(f"{size:>7} rows, {len(updated)} updates from {args.processes} processes: {line}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark the GitHub requests spent resolving the issue references of commits and their pull requests:
+one REST get_issue per referenced number (the former extract_fixed_issues) against the batched,
+cached IssueResolver. Runs against the local GitHub stand-in server (no network access or tokens needed).
+
+Usage: python -m scripts.bench_issue_resolution --repos 3 --commits 500
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+for var in ('OPENROUTER_API_KEY', 'OPENAI_API_KEY', 'github_access_token', 'workingdir'):
+    os.environ.setdefault(var, 'offline')
+
+import src.config as conf
+from github.GithubException import UnknownObjectException
+from src.gh.client import get_github_client
+from src.gh.commit_collector import CommitCollector
+from scripts.github_stub_server import GitHubStubServer, make_fixture
+
+
+def per_number_fixed_issues(collector: CommitCollector, repo, message: str) -> set[int]:
+    """The former behaviour: one get_issue request per referenced number, cached only for this message."""
+    out = set()
+    for number in collector.extract_issue_references(message, repo.full_name):
+        try:
+            if getattr(repo.get_issue(number), 'pull_request', None) is None:
+                out.add(number)
+        except UnknownObjectException:
+            continue
+    return out
+
+
+def run_mode(stub: GitHubStubServer, mode: str) -> dict:
+    # The local server needs no pacing, and the HTTP cache would hide the requests being measured
+    conf.github['access-tokens'] = []
+    conf.github['http-cache-enabled'] = False
+    g = get_github_client('offline', base_url=stub.base_url,
+                          seconds_between_requests=None, seconds_between_writes=None)
+    collector = CommitCollector(g)
+
+    repos = [g.get_repo(name) for name in stub.fixture['repos']]
+    stub.reset_counts()
+    started = time.perf_counter()
+    references, fixed = 0, 0
+    for repo in repos:
+        for commit in repo.get_commits():
+            pulls = list(commit.get_pulls())
+            messages = [commit.commit.message or ""] + [collector._pr_message(pr) for pr in pulls]
+            references += sum(len(collector.extract_issue_references(msg, repo.full_name)) for msg in messages)
+            if mode == 'batched':
+                collector._prefetch_issue_references(repo, messages)
+                fixed += sum(len(collector.extract_fixed_issues(msg, repo)) for msg in messages)
+            else:
+                fixed += sum(len(per_number_fixed_issues(collector, repo, msg)) for msg in messages)
+    elapsed = time.perf_counter() - started
+    g.close()
+
+    counts = dict(stub.request_counts)
+    return {
+        'mode': mode,
+        'references': references,
+        'fixed': fixed,
+        'resolution_requests': counts.get('issue', 0) + counts.get('graphql', 0),
+        'per_route': counts,
+        'seconds': elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repos', type=int, default=3)
+    parser.add_argument('--commits', type=int, default=500, help='Commits per repository.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    fixture = make_fixture(args.repos, args.commits, args.seed)
+    with tempfile.TemporaryDirectory() as issue_cache_dir, GitHubStubServer(fixture) as stub:
+        conf.perf_commit['issue-cache-dir'] = issue_cache_dir
+        for mode in ('per-number', 'batched'):
+            res = run_mode(stub, mode)
+            print(f"{mode:>10}: {res['resolution_requests']} resolution requests for {res['references']} references "
+                  f"({res['fixed']} fixed issues, {res['seconds']:.2f}s) {res['per_route']}")
+
+
+if __name__ == '__main__':
+    main()
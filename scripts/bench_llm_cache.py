@@ -0,0 +1,113 @@
+"""
+Micro-benchmark of LLM cache layouts: the former flat directory scanned with os.listdir on every lookup,
+the sharded InvocationCache and the same entries compacted into an InvocationPack. For each layout, the
+lookup latency, the files and bytes on disk, and the cold-start latency (opening the cache and answering
+the first lookup) are printed. Synthetic entries are written to a temporary directory.
+
+Usage: python -m scripts.bench_llm_cache --sizes 10000 100000 1000000 --lookups 200
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from src.llm.invocation_cache import InvocationCache
+from scripts.llm_cache_pack import disk_usage
+
+# The size of a typical cached issue classification
+PAYLOAD = json.dumps({'prompt': {'messages': [{'role': 'user', 'content': 'x' * 1500}], 'temp': 0, 'sample_size': 1,
+                                 'model': 'openai/gpt-5.1-codex-mini'},
+                      'response': {'samples': [{'content': 'no'}]}, 'invocation_time': 0.0})
+
+
+def _hash(i: int) -> str:
+    return hashlib.md5(str(i).encode('utf-8')).hexdigest()
+
+
+def flat_lookup(cache_dir: str, prompt_hash: str) -> dict | None:
+    """The lookup of LLMAdapter.load_cache before the cache was sharded."""
+    cached_files = [f for f in os.listdir(cache_dir) if os.path.isfile(os.path.join(cache_dir, f)) and prompt_hash in f]
+    if cached_files:
+        with open(os.path.join(cache_dir, cached_files[0]), 'r') as f:
+            return json.load(f)
+    return None
+
+
+def populate(flat_dir: str, sharded_dir: str, size: int) -> None:
+    cache = InvocationCache(sharded_dir)
+    for i in range(size):
+        prompt_hash = _hash(i)
+        with open(os.path.join(flat_dir, f"{prompt_hash}-0.json"), 'w') as f:
+            f.write(PAYLOAD)
+        os.makedirs(cache.shard_dir(prompt_hash), exist_ok=True)
+        with open(cache.entry_path(prompt_hash, 0), 'w') as f:
+            f.write(PAYLOAD)
+
+
+def footprint(cache_dir: str) -> tuple[int, int]:
+    """Files and bytes on disk under a directory."""
+    paths = [os.path.join(root, name) for root, _, files in os.walk(cache_dir) for name in files]
+    return len(paths), disk_usage(paths)
+
+
+def cold_start(cache_dir: str, prompt_hash: str) -> float:
+    started = time.perf_counter()
+    InvocationCache(cache_dir).load(prompt_hash)
+    return time.perf_counter() - started
+
+
+def time_lookups(lookup, hashes: list[str]) -> float:
+    started = time.perf_counter()
+    for prompt_hash in hashes:
+        lookup(prompt_hash)
+    return (time.perf_counter() - started) / len(hashes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--lookups', type=int, default=200, help='Lookups per layout, half of them misses.')
+    parser.add_argument('--flat-lookups', type=int, default=20, help='The flat layout is slow, it gets fewer lookups.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    for size in args.sizes:
+        tmp_dir = tempfile.mkdtemp(prefix='bench_llm_cache_')
+        try:
+            flat_dir, sharded_dir = os.path.join(tmp_dir, 'flat'), os.path.join(tmp_dir, 'sharded')
+            packed_dir = os.path.join(tmp_dir, 'packed')
+            os.makedirs(flat_dir)
+            started = time.perf_counter()
+            populate(flat_dir, sharded_dir, size)
+            shutil.copytree(sharded_dir, packed_dir)
+            InvocationCache(packed_dir).compact()
+            populate_seconds = time.perf_counter() - started
+
+            def sample(n):
+                return [_hash(rnd.randrange(size)) if i % 2 == 0 else _hash(size + i) for i in range(n)]
+
+            print(f"{size} entries (written in {populate_seconds:.0f}s):")
+            for layout, cache_dir in (('flat', flat_dir), ('sharded', sharded_dir), ('packed', packed_dir)):
+                first = _hash(rnd.randrange(size))
+                if layout == 'flat':
+                    cold = time_lookups(lambda h: flat_lookup(flat_dir, h), [first])
+                    per_lookup = time_lookups(lambda h: flat_lookup(flat_dir, h), sample(args.flat_lookups))
+                else:
+                    cold = cold_start(cache_dir, first)
+                    cache = InvocationCache(cache_dir)
+                    per_lookup = time_lookups(cache.load, sample(args.lookups))
+                files, size_on_disk = footprint(cache_dir)
+                print(f"  {layout:>8}: {1000 * per_lookup:9.3f} ms/lookup, cold start {1000 * cold:9.3f} ms, "
+                      f"{files:>9} files, {size_on_disk / 1e6:9.1f} MB on disk")
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
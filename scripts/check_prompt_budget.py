@@ -0,0 +1,142 @@
+"""
+Regression check of the token budget of the issue classification prompts (see src/gh/issue_prompt.py).
+
+Every cached issue classification prompt is rebuilt within the budget of its model: prompts within the
+budget must be byte-identical (same hash, so their cached answers stay valid), and the tokens of the cut
+ones are reported. With --ask, the cut prompts are sent to their model and the answers compared with the
+cached answers to the full prompts. With --manual-labels, the issues of
+results/manual_analysis/precision_analysis.csv are classified by GPT_5_1_Codex_Mini with full and with
+budgeted prompts, and both accuracies against the manual labels are printed.
+
+Usage: python -m scripts.check_prompt_budget [--budget 1000] [--ask] [--manual-labels]
+"""
+
+import argparse
+import json
+import re
+
+import pandas as pd
+import src.config as conf
+from src.gh.commit_collector import ONE_WORD_ANSWER, performance_issue_prompt_text
+from src.gh.issue_prompt import render_within_budget
+from src.llm.invocation import Prompt
+from src.llm.invocation_cache import InvocationCache
+from src.llm.llm_adapter import LLMAdapter
+from src.llm.openai import GPT_5_1_Codex_Mini
+from src.llm.tokens import count_exact_tokens
+
+PROMPT_PATTERN = re.compile(r'^The following is an issue in the (?P<repo>\S+) repository:\n\n'
+                            r'###Issue Title###(?P<title>.*?)\n###Issue Title End###\n\n'
+                            r'###Issue Body###(?P<body>.*?)\n###Issue Body End###\n\n'
+                            r'The following is the commit message that fixes this issue:\n\n'
+                            r'###Commit Message###(?P<message>.*?)\n###Commit Message End###\n\n'
+                            r'Is this issue related to improving execution time\? (?P<format>.*)$', re.DOTALL)
+MANUAL_LABELS_PATH = 'results/manual_analysis/precision_analysis.csv'
+
+
+def budget_of(model: str, override: int | None) -> int:
+    if override is not None:
+        return override
+    return conf.llm['prompt-token-budgets'].get(model, conf.llm['default-prompt-token-budget'])
+
+
+def budgeted_text(model: str, budget: int, repo: str, title: str, body: str, message, answer_format: str) -> str:
+    return render_within_budget(model, budget,
+                                lambda t, b, m: performance_issue_prompt_text(repo, t, b, m, answer_format),
+                                title, body, message)
+
+
+def is_yes(content: str | None) -> bool:
+    return "yes" in (content or "").lower().strip()
+
+
+def check_cached_prompts(cache_dir: str, budget: int | None, ask: bool) -> None:
+    rows, changed = [], []
+    for serialized in InvocationCache(cache_dir).iter_serialized():
+        invocation = json.loads(serialized)
+        content = invocation['prompt']['messages'][0]['content']
+        match = PROMPT_PATTERN.match(content)
+        if match is None:
+            continue
+        model = invocation['prompt'].get('model', conf.llm['default-model'])
+        fields = match.group('repo', 'title', 'body', 'message', 'format')
+        model_budget = budget_of(model, budget)
+        text = budgeted_text(model, model_budget, *fields)
+        # Deterministic, so the hashes of cut prompts are stable across runs
+        assert text == budgeted_text(model, model_budget, *fields)
+        tokens_before, tokens_after = count_exact_tokens(model, content), count_exact_tokens(model, text)
+        if tokens_before <= model_budget and text != content:
+            raise AssertionError(f"Prompt within the budget was changed: {Prompt.load_from_json(invocation['prompt']).hash()}")
+        rows.append({'model': model, 'cut': text != content, 'tokens_before': tokens_before, 'tokens_after': tokens_after})
+        if text != content:
+            samples = invocation['response']['samples']
+            changed.append((model, Prompt([Prompt.Message("user", text)], model=model), is_yes(samples[0]['content'] if samples else None)))
+
+    if not rows:
+        print(f"No issue classification prompts found in {cache_dir}.")
+        return
+    df = pd.DataFrame(rows)
+    summary = df.groupby('model').agg(prompts=('cut', 'size'), cut=('cut', 'sum'), tokens_before=('tokens_before', 'sum'),
+                                      tokens_after=('tokens_after', 'sum'), max_tokens_before=('tokens_before', 'max'))
+    print(summary.to_string())
+    print(f"Prompts within the budget are unchanged. Tokens saved: "
+          f"{100 * (1 - df['tokens_after'].sum() / df['tokens_before'].sum()):.1f}%.")
+
+    if ask and changed:
+        agreement = []
+        for model in sorted({model for model, _, _ in changed}):
+            items = [(prompt, label) for m, prompt, label in changed if m == model]
+            adapter = LLMAdapter(read_from_cache=True, save_to_cache=True, model=model)
+            answers = adapter.get_responses([prompt for prompt, _ in items])
+            agreement += [is_yes(res.first_content) == label for res, (_, label) in zip(answers, items)]
+        print(f"Cut prompts agreeing with the answer to the full prompt: {sum(agreement)}/{len(agreement)}.")
+
+
+def check_manual_labels(budget: int | None) -> None:
+    from src.gh.client import get_github_client
+    from src.gh.issue_resolver import IssueResolver
+
+    g = get_github_client()
+    resolver = IssueResolver(g, conf.perf_commit['issue-cache-dir'], conf.perf_commit['issue-cache-max-entries'])
+    codex = GPT_5_1_Codex_Mini(read_from_cache=True, save_to_cache=True)
+    model = codex.get_model()
+    full_prompts, budgeted_prompts, labels = [], [], []
+    for _, row in pd.read_csv(MANUAL_LABELS_PATH).iterrows():
+        issue_match = re.match(r'https://github\.com/([^/]+/[^/]+)/issues/(\d+)', str(row['issue_link']))
+        commit_match = re.match(r'https://github\.com/[^/]+/[^/]+/commit/([0-9a-f]+)', str(row['ground_truth_patch']))
+        if issue_match is None or commit_match is None:
+            continue
+        issue = resolver.get(issue_match.group(1), int(issue_match.group(2)))
+        if issue is None:
+            continue
+        message = g.get_repo(issue_match.group(1)).get_commit(commit_match.group(1)).commit.message
+        fields = (issue_match.group(1), issue.title or "", issue.body or "", message, ONE_WORD_ANSWER)
+        full_prompts.append(Prompt([Prompt.Message("user", performance_issue_prompt_text(*fields))], model=model))
+        budgeted_prompts.append(Prompt([Prompt.Message("user", budgeted_text(model, budget_of(model, budget), *fields))], model=model))
+        labels.append(str(row['is_exec_improvement']).strip().lower() == 'yes')
+    resolver.flush()
+
+    cut = sum(f.hash() != b.hash() for f, b in zip(full_prompts, budgeted_prompts))
+    for name, prompts in (('full', full_prompts), ('budgeted', budgeted_prompts)):
+        verdicts = [is_yes(res.first_content) for res in codex.get_responses(prompts)]
+        accuracy = sum(v == label for v, label in zip(verdicts, labels)) / len(labels)
+        tokens = sum(count_exact_tokens(model, p.messages[0].content) for p in prompts)
+        print(f"{name:>8} prompts: accuracy {accuracy:.3f} on {len(labels)} manually labelled issues, {tokens} tokens")
+    print(f"{cut} of the prompts were cut.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cache-dir', default=conf.llm['llm-invocation-cache-dir'])
+    parser.add_argument('--budget', type=int, default=None, help='Override the configured budget of every model.')
+    parser.add_argument('--ask', action='store_true', help='Send the cut cached prompts to their model (costs API calls).')
+    parser.add_argument('--manual-labels', action='store_true', help=f'Check the accuracy on {MANUAL_LABELS_PATH} (needs GitHub and API access).')
+    args = parser.parse_args()
+
+    check_cached_prompts(args.cache_dir, args.budget, args.ask)
+    if args.manual_labels:
+        check_manual_labels(args.budget)
+
+
+if __name__ == '__main__':
+    main()
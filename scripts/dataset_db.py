@@ -0,0 +1,31 @@
+"""
+Move the dataset between the CSV file and the SQLite database of the 'sqlite' backend (see conf.data).
+
+    import  Upsert every commit of the CSV dataset into the database, e.g., before switching the backend.
+    export  Write the database to the CSV dataset, in the format read by DatasetAdapter, for publishing.
+
+Usage: python -m scripts.dataset_db {import,export} [--csv results/dataset.csv] [--db results/dataset.sqlite]
+"""
+
+import argparse
+
+import src.config as conf
+from src.data.sqlite_dataset_adapter import SQLiteDatasetAdapter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('--csv', default=conf.data['dataset-path'])
+    parser.add_argument('--db', default=conf.data['sqlite-path'])
+    args = parser.parse_args()
+
+    db = SQLiteDatasetAdapter(args.db)
+    if args.command == 'import':
+        print(f"Imported {db.import_csv(args.csv)} commits from {args.csv} into {args.db}.")
+    else:
+        print(f"Exported {db.export_csv(args.csv)} commits from {args.db} to {args.csv}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,426 @@
+"""
+Local stand-in for the GitHub REST and GraphQL APIs, serving canned responses from a synthetic fixture.
+
+It is used by the benchmark scripts to measure how many requests the collector issues without
+touching the real API. Besides commits it serves issues, pull requests, their GraphQL resolution and the
+repository search. Point a client at it with ``get_github_client('offline', base_url=stub.base_url)``.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+JAVA_SRC_DIRS = ['core/src/main/java/org/example', 'server/src/main/java/org/example/server']
+
+
+def _random_sha(rnd: random.Random) -> str:
+    return '%040x' % rnd.getrandbits(160)
+
+
+def _random_files(rnd: random.Random) -> list[str]:
+    """Draw a changed-file set resembling real histories: mostly mixed commits, some Java-only, a few huge."""
+    kind = rnd.random()
+    if kind < 0.05:
+        return [f'{rnd.choice(JAVA_SRC_DIRS)}/Gen{i}.java' for i in range(rnd.randint(21, 120))]
+    if kind < 0.35:
+        return [f'{rnd.choice(JAVA_SRC_DIRS)}/Class{rnd.randint(0, 500)}.java' for _ in range(rnd.randint(1, 5))]
+    if kind < 0.60:
+        return ([f'{rnd.choice(JAVA_SRC_DIRS)}/Class{rnd.randint(0, 500)}.java' for _ in range(rnd.randint(1, 4))]
+                + [f'core/src/test/java/org/example/Class{rnd.randint(0, 500)}Test.java'])
+    return ['pom.xml', 'README.md'][:rnd.randint(1, 2)] + [f'docs/page{rnd.randint(0, 50)}.md']
+
+
+def _add_issues(rnd: random.Random, repo: dict) -> None:
+    """
+    Add issues and pull requests to a fixture repository and reference them from its commits.
+    References are skewed towards a few popular issues, as real commits and PRs keep citing the same ones.
+    """
+    commits = repo['commits']
+    num_numbers = max(10, len(commits) // 5)
+    issues = {}
+    for number in range(1, num_numbers + 1):
+        is_pr = rnd.random() < 0.3
+        slow = rnd.random() < 0.2
+        issues[number] = {
+            'is_pr': is_pr,
+            'title': f"{'Speed up' if slow else 'Fix'} component {rnd.randint(0, 50)}",
+            'body': 'The operation is slow on large inputs.' if slow else 'Something is broken.',
+            'labels': ['performance'] if slow else ['bug'],
+        }
+    pr_numbers = [n for n, issue in issues.items() if issue['is_pr']] or [1]
+    popular = list(range(1, min(num_numbers, 10) + 1))
+
+    def draw_number() -> int:
+        return rnd.choice(popular) if rnd.random() < 0.6 else rnd.randint(1, num_numbers + 5) # Some do not exist
+
+    for commit in commits:
+        if rnd.random() < 0.4:
+            commit['message'] += '\n\nFixes ' + ' and '.join(f'#{draw_number()}' for _ in range(rnd.randint(1, 2)))
+        commit['pulls'] = [rnd.choice(pr_numbers)] if rnd.random() < 0.5 else []
+    for number in pr_numbers:
+        if number in issues:
+            issues[number]['body'] += f'\n\nCloses #{draw_number()}'
+    repo['issues'] = issues
+
+
+def make_fixture(num_repos: int = 3, commits_per_repo: int = 500, seed: int = 0) -> dict:
+    """Build a deterministic fixture of Maven repositories with synthetic commit histories, issues and PRs."""
+    rnd = random.Random(seed)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    repos = {}
+    for repo_index in range(num_repos):
+        full_name = f'stub-owner/stub-repo-{repo_index}'
+        commits = []
+        for commit_index in range(commits_per_repo):
+            date = now - timedelta(hours=6 * commit_index + rnd.randint(0, 5))
+            commits.append({
+                'sha': _random_sha(rnd),
+                'message': f'Change {commit_index} in {full_name}',
+                'date': date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'files': sorted(set(_random_files(rnd))),
+            })
+        repos[full_name] = {
+            'id': 1000 + repo_index,
+            'stars': rnd.randint(20, 5000),
+            'is_maven': True,
+            'commits': commits, # Newest first, like the GitHub API
+        }
+        # Drawn from a separate generator so that the commit histories do not depend on it
+        _add_issues(random.Random(f'{seed}-{full_name}'), repos[full_name])
+    return {'repos': repos}
+
+
+class GitHubStubServer:
+    """Threaded HTTP server answering a subset of the GitHub API from a fixture, counting every request."""
+
+    def __init__(self, fixture: dict, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.fixture = fixture
+        # Seconds every response is delayed by, to stand in for the network round trip
+        self.latency = latency
+        self.request_counts: Counter = Counter()
+        self._counts_lock = threading.Lock()
+        stub = self
+
+        class Handler(_StubRequestHandler):
+            server_stub = stub
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, route: str) -> None:
+        with self._counts_lock:
+            self.request_counts[route] += 1
+
+    def total_requests(self) -> int:
+        with self._counts_lock:
+            # 'not_modified' annotates requests already counted under their route
+            return sum(n for route, n in self.request_counts.items() if route != 'not_modified')
+
+    def reset_counts(self) -> None:
+        with self._counts_lock:
+            self.request_counts.clear()
+
+    def start(self) -> 'GitHubStubServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    server_stub: GitHubStubServer = None
+
+    ROUTES = [
+        ('GET', re.compile(r'^/search/repositories$'), 'search'),
+        ('GET', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)$'), 'repo'),
+        ('GET', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/commits$'), 'commits'),
+        ('GET', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/commits/(?P<sha>[0-9a-f]{40})$'), 'commit'),
+        ('GET', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/contents/(?P<path>.+)$'), 'contents'),
+        ('GET', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/commits/(?P<sha>[0-9a-f]{40})/pulls$'), 'commit_pulls'),
+        ('GET', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/issues/(?P<number>\d+)$'), 'issue'),
+        ('GET', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)$'), 'pull'),
+        ('GET', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)/commits$'), 'pull_commits'),
+        ('POST', re.compile(r'^/graphql$'), 'graphql'),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, verb: str) -> None:
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        for route_verb, pattern, name in self.ROUTES:
+            match = pattern.match(parsed.path)
+            if route_verb == verb and match:
+                self.server_stub.count(name)
+                if self.server_stub.latency:
+                    time.sleep(self.server_stub.latency)
+                getattr(self, f'_handle_{name}')(params=params, **match.groupdict())
+                return
+        self.server_stub.count('unknown')
+        self._send_json({'message': 'Not Found'}, status=404)
+
+    # Helpers
+
+    def _send_json(self, payload, status: int = 200, headers: dict | None = None) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if status == 200 and self.command == 'GET' and self.headers.get('If-None-Match') == etag:
+            # Conditional request for an unchanged resource, like GitHub we answer with an empty 304
+            self.server_stub.count('not_modified')
+            status, body = 304, b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.send_header('X-RateLimit-Remaining', '4999')
+        self.send_header('X-RateLimit-Reset', str(int(datetime.now(timezone.utc).timestamp()) + 3600))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _paginate(self, items: list, params: dict, path: str) -> tuple[list, dict]:
+        per_page = int(params.get('per_page', 30))
+        page = int(params.get('page', 1))
+        last_page = max(1, (len(items) + per_page - 1) // per_page)
+        headers = {}
+        if last_page > 1:
+            def link(p):
+                query = {k: v for k, v in params.items() if k not in ('page', 'per_page')}
+                # 'page' must come after another parameter, PyGithub parses it out of the full URL
+                query.update({'per_page': per_page, 'page': p})
+                return f'<{self.server_stub.base_url}{path}?{urlencode(query)}>'
+            links = []
+            if page < last_page:
+                links.append(f'{link(page + 1)}; rel="next"')
+                links.append(f'{link(last_page)}; rel="last"')
+            if page > 1:
+                links.append(f'{link(1)}; rel="first"')
+                links.append(f'{link(page - 1)}; rel="prev"')
+            headers['Link'] = ', '.join(links)
+        return items[(page - 1) * per_page:page * per_page], headers
+
+    def _repo(self, repo: str) -> dict | None:
+        return self.server_stub.fixture['repos'].get(repo)
+
+    def _repo_json(self, repo: str) -> dict:
+        data = self._repo(repo)
+        owner, name = repo.split('/', 1)
+        return {
+            'id': data['id'],
+            'name': name,
+            'full_name': repo,
+            'owner': {'login': owner},
+            'stargazers_count': data['stars'],
+            'url': f'{self.server_stub.base_url}/repos/{repo}',
+            'html_url': f'https://github.com/{repo}',
+            'default_branch': 'main',
+            'pushed_at': data['commits'][0]['date'] if data['commits'] else '2015-01-01T00:00:00Z',
+        }
+
+    def _commit_json(self, repo: str, commit: dict, with_files: bool) -> dict:
+        author = {'name': 'stub', 'email': 'stub@example.com', 'date': commit['date']}
+        payload = {
+            'sha': commit['sha'],
+            'url': f'{self.server_stub.base_url}/repos/{repo}/commits/{commit["sha"]}',
+            'html_url': f'https://github.com/{repo}/commit/{commit["sha"]}',
+            'commit': {'message': commit['message'], 'author': author, 'committer': author},
+            'parents': [],
+        }
+        if with_files:
+            payload['files'] = [{'filename': f, 'status': 'modified', 'patch': ''} for f in commit['files']]
+        return payload
+
+    def _issue_json(self, repo: str, number: int) -> dict:
+        issue = self._repo(repo)['issues'][number]
+        kind = 'pull' if issue['is_pr'] else 'issues'
+        payload = {
+            'number': number,
+            'title': issue['title'],
+            'body': issue['body'],
+            'state': 'closed',
+            'labels': [{'name': label} for label in issue['labels']],
+            'url': f'{self.server_stub.base_url}/repos/{repo}/issues/{number}',
+            'html_url': f'https://github.com/{repo}/{kind}/{number}',
+        }
+        if issue['is_pr']:
+            payload['pull_request'] = {'url': f'{self.server_stub.base_url}/repos/{repo}/pulls/{number}'}
+        return payload
+
+    def _pull_json(self, repo: str, number: int) -> dict:
+        issue = self._repo(repo)['issues'][number]
+        # Base and head are derived from the number so that they are stable across requests
+        base_sha = hashlib.sha1(f'{repo}-{number}-base'.encode()).hexdigest()
+        head_sha = hashlib.sha1(f'{repo}-{number}-head'.encode()).hexdigest()
+        return {
+            'number': number,
+            'title': issue['title'],
+            'body': issue['body'],
+            'state': 'closed',
+            'url': f'{self.server_stub.base_url}/repos/{repo}/pulls/{number}',
+            'html_url': f'https://github.com/{repo}/pull/{number}',
+            'base': {'sha': base_sha, 'ref': 'main'},
+            'head': {'sha': head_sha, 'ref': f'pr-{number}'},
+            'merge_commit_sha': None, # The fixture histories are merged without merge commits
+            'merged_at': '2020-01-01T00:00:00Z',
+        }
+
+    def _commits_since(self, repo: str, since: str | None) -> list[dict]:
+        commits = self._repo(repo)['commits']
+        if since:
+            since = since.replace('+00:00', 'Z')
+            commits = [c for c in commits if c['date'] >= since]
+        return commits
+
+    # REST handlers
+
+    def _handle_search(self, params: dict) -> None:
+        """Repository search, honouring only the pushed:FROM..TO qualifier and the stars sort of the collector."""
+        match = re.search(r'pushed:(\S+)\.\.(\S+)', params.get('q', ''))
+        repos = sorted(self.server_stub.fixture['repos'], key=lambda r: -self._repo(r)['stars'])
+        items = [self._repo_json(r) for r in repos]
+        if match:
+            items = [item for item in items if match.group(1) <= item['pushed_at'] <= match.group(2)]
+        page, headers = self._paginate(items, params, '/search/repositories')
+        self._send_json({'total_count': len(items), 'incomplete_results': False, 'items': page}, headers=headers)
+
+    def _handle_repo(self, params: dict, repo: str) -> None:
+        if self._repo(repo) is None:
+            return self._send_json({'message': 'Not Found'}, status=404)
+        self._send_json(self._repo_json(repo))
+
+    def _handle_commits(self, params: dict, repo: str) -> None:
+        if self._repo(repo) is None:
+            return self._send_json({'message': 'Not Found'}, status=404)
+        commits = self._commits_since(repo, params.get('since'))
+        page, headers = self._paginate(commits, params, f'/repos/{repo}/commits')
+        self._send_json([self._commit_json(repo, c, with_files=False) for c in page], headers=headers)
+
+    def _handle_commit(self, params: dict, repo: str, sha: str) -> None:
+        data = self._repo(repo)
+        commit = next((c for c in data['commits'] if c['sha'] == sha), None) if data else None
+        if commit is None:
+            return self._send_json({'message': 'Not Found'}, status=404)
+        self._send_json(self._commit_json(repo, commit, with_files=True))
+
+    def _handle_contents(self, params: dict, repo: str, path: str) -> None:
+        data = self._repo(repo)
+        if data is None or path != 'mvnw' or not data['is_maven']:
+            return self._send_json({'message': 'Not Found'}, status=404)
+        self._send_json({'type': 'file', 'name': 'mvnw', 'path': 'mvnw', 'encoding': 'base64', 'content': '',
+                         'url': f'{self.server_stub.base_url}/repos/{repo}/contents/mvnw'})
+
+    def _handle_commit_pulls(self, params: dict, repo: str, sha: str) -> None:
+        data = self._repo(repo)
+        commit = next((c for c in data['commits'] if c['sha'] == sha), None) if data else None
+        if commit is None:
+            return self._send_json({'message': 'Not Found'}, status=404)
+        numbers = [n for n in commit.get('pulls', []) if data['issues'].get(n, {}).get('is_pr')]
+        self._send_json([self._pull_json(repo, n) for n in numbers])
+
+    def _handle_issue(self, params: dict, repo: str, number: str) -> None:
+        data = self._repo(repo)
+        if data is None or int(number) not in data.get('issues', {}):
+            return self._send_json({'message': 'Not Found'}, status=404)
+        self._send_json(self._issue_json(repo, int(number)))
+
+    def _handle_pull(self, params: dict, repo: str, number: str) -> None:
+        data = self._repo(repo)
+        if data is None or not data.get('issues', {}).get(int(number), {}).get('is_pr'):
+            return self._send_json({'message': 'Not Found'}, status=404)
+        self._send_json(self._pull_json(repo, int(number)))
+
+    def _handle_pull_commits(self, params: dict, repo: str, number: str) -> None:
+        data = self._repo(repo)
+        if data is None or not data.get('issues', {}).get(int(number), {}).get('is_pr'):
+            return self._send_json({'message': 'Not Found'}, status=404)
+        commits = [c for c in data['commits'] if int(number) in c.get('pulls', [])]
+        page, headers = self._paginate(commits, params, f'/repos/{repo}/pulls/{number}/commits')
+        self._send_json([self._commit_json(repo, c, with_files=False) for c in page], headers=headers)
+
+    # GraphQL
+
+    def _handle_graphql(self, params: dict) -> None:
+        body = self._read_body()
+        query, variables = body.get('query', ''), body.get('variables') or {}
+        if 'history(' in query:
+            return self._send_json({'data': self._graphql_history(variables)})
+        if 'issueOrPullRequest(' in query:
+            return self._send_json(self._graphql_issues(query, variables))
+        self._send_json({'errors': [{'message': 'Unsupported query in GitHub stub'}]})
+
+    def _graphql_history(self, variables: dict) -> dict:
+        repo = f"{variables['owner']}/{variables['name']}"
+        if self._repo(repo) is None:
+            return {'repository': None}
+        commits = self._commits_since(repo, variables.get('since'))
+        start = int(variables.get('cursor') or 0)
+        end = start + int(variables.get('pageSize', 100))
+        nodes = [{
+            'oid': c['sha'],
+            'message': c['message'],
+            'committedDate': c['date'],
+            'changedFilesIfAvailable': len(c['files']),
+        } for c in commits[start:end]]
+        return {'repository': {'defaultBranchRef': {'target': {'history': {
+            'pageInfo': {'hasNextPage': end < len(commits), 'endCursor': str(end)},
+            'nodes': nodes,
+        }}}}}
+
+    def _graphql_issues(self, query: str, variables: dict) -> dict:
+        repo = f"{variables['owner']}/{variables['name']}"
+        data = self._repo(repo)
+        if data is None:
+            return {'data': {'repository': None}}
+        repository, errors = {}, []
+        for alias, number in re.findall(r'(\w+):\s*issueOrPullRequest\(number:\s*(\d+)\)', query):
+            issue = data.get('issues', {}).get(int(number))
+            if issue is None:
+                # Like GitHub, a missing number nulls its alias and adds an error next to the data
+                repository[alias] = None
+                errors.append({'type': 'NOT_FOUND', 'path': ['repository', alias],
+                               'message': f'Could not resolve to an issue or pull request with the number of {number}.'})
+                continue
+            repository[alias] = {
+                '__typename': 'PullRequest' if issue['is_pr'] else 'Issue',
+                'title': issue['title'],
+                'body': issue['body'],
+                'labels': {'nodes': [{'name': label} for label in issue['labels']]},
+            }
+        payload = {'data': {'repository': repository}}
+        if errors:
+            payload['errors'] = errors
+        return payload
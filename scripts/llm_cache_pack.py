@@ -0,0 +1,75 @@
+"""
+Maintain the packed LLM invocation cache.
+
+    compact  Move every loose invocation file (flat or sharded layout) into the pack and merge its index.
+    stats    Print the files and bytes used by the loose files and by the pack, and the cold-start lookup
+             latency (opening the cache and looking up a sample of stored prompts).
+
+Usage: python -m scripts.llm_cache_pack {compact,stats} [--cache-dir cache/llm_invocations]
+"""
+
+import argparse
+import os
+import random
+import time
+
+import src.config as conf
+from src.llm.invocation_cache import InvocationCache
+
+
+def disk_usage(paths: list[str]) -> int:
+    """Bytes allocated on disk, which for small files is well above their size."""
+    return sum(os.stat(path).st_blocks * 512 for path in paths)
+
+
+def cold_start_lookup(cache_dir: str, hashes: list[str]) -> tuple[float, float]:
+    """Seconds to open the cache and answer the first lookup, and the mean seconds of the remaining lookups."""
+    started = time.perf_counter()
+    cache = InvocationCache(cache_dir)
+    cache.load(hashes[0])
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    for prompt_hash in hashes[1:]:
+        cache.load(prompt_hash)
+    rest = (time.perf_counter() - started) / max(1, len(hashes) - 1)
+    return first, rest
+
+
+def stats(cache_dir: str, lookups: int) -> None:
+    cache = InvocationCache(cache_dir)
+    loose = list(cache.iter_loose_entries())
+    print(f"Loose files: {len(loose)} files, {disk_usage([path for _, _, path in loose]) / 1e6:.1f} MB on disk")
+
+    pack_files = []
+    if cache.pack is not None and os.path.isdir(cache.pack.pack_dir):
+        pack_files = [os.path.join(cache.pack.pack_dir, name) for name in os.listdir(cache.pack.pack_dir)]
+    print(f"Pack: {len(pack_files)} files, {disk_usage(pack_files) / 1e6:.1f} MB on disk")
+
+    # The stored keys, so every lookup is a hit
+    hashes = list(dict.fromkeys(cache.iter_hashes()))
+    if not hashes:
+        return
+    sample = random.Random(0).sample(hashes, min(lookups, len(hashes)))
+    first, rest = cold_start_lookup(cache_dir, sample)
+    print(f"Cold start: {1000 * first:.2f} ms to open the cache and answer the first lookup, "
+          f"then {1000 * rest:.3f} ms per lookup")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=['compact', 'stats'])
+    parser.add_argument('--cache-dir', default=conf.llm['llm-invocation-cache-dir'])
+    parser.add_argument('--lookups', type=int, default=200, help='Stored prompts looked up by stats.')
+    args = parser.parse_args()
+
+    if args.command == 'compact':
+        started = time.perf_counter()
+        result = InvocationCache(args.cache_dir).compact()
+        print(f"Packed {result['packed']} loose invocations ({result['duplicates']} already packed), "
+              f"{result['indexed']} invocations indexed, in {time.perf_counter() - started:.1f}s.")
+    else:
+        stats(args.cache_dir, args.lookups)
+
+
+if __name__ == '__main__':
+    main()
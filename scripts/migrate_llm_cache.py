@@ -0,0 +1,58 @@
+"""
+Move the invocations of the flat LLM cache layout ({cache_dir}/{hash}-{n}.json) into the hash-prefix shards
+used by InvocationCache ({cache_dir}/{hash[:2]}/{hash}-{n}.json). Entries keep their names, so the migration
+can be interrupted and run again; the adapters find entries in both layouts meanwhile.
+
+Usage: python -m scripts.migrate_llm_cache [--cache-dir cache/llm_invocations] [--dry-run]
+"""
+
+import argparse
+import os
+import re
+
+import src.config as conf
+from src.llm.invocation_cache import InvocationCache
+
+ENTRY_NAME = re.compile(r'^(?P<hash>[0-9a-f]{32})-(?P<n>\d+)\.json$')
+
+
+def migrate(cache_dir: str, dry_run: bool = False) -> dict:
+    cache = InvocationCache(cache_dir)
+    stats = {'moved': 0, 'skipped': 0, 'conflicts': 0}
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            match = ENTRY_NAME.match(entry.name)
+            if match is None:
+                stats['skipped'] += 1
+                continue
+            target = cache.entry_path(match.group('hash'), int(match.group('n')))
+            if os.path.exists(target):
+                # Saved again after sharding was introduced, keep both under the next free number
+                stats['conflicts'] += 1
+                if not dry_run:
+                    with open(entry.path, 'r') as f:
+                        cache.save(match.group('hash'), f.read())
+                    os.remove(entry.path)
+                continue
+            if not dry_run:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(entry.path, target)
+            stats['moved'] += 1
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cache-dir', default=conf.llm['llm-invocation-cache-dir'])
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    stats = migrate(args.cache_dir, args.dry_run)
+    print(f"{'Would move' if args.dry_run else 'Moved'} {stats['moved']} invocations into shards "
+          f"({stats['conflicts']} conflicting names renumbered, {stats['skipped']} other files left in place).")
+
+
+if __name__ == '__main__':
+    main()
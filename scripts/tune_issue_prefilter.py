@@ -0,0 +1,137 @@
+"""
+Tune the thresholds of the local issue prefilter against the accumulated LLM answers.
+
+Every cached performance-issue invocation (see CommitCollector._performance_issue_prompt) is a labelled
+example: the issue title and body from the prompt, the LLM yes/no answer as label. With --manual-labels,
+the issues of results/manual_analysis/precision_analysis.csv are resolved on GitHub and added with their
+manual label. For every threshold pair, the escalation rate, the agreement of the local decisions
+with the labels, and the precision and recall of the resulting verdicts (local decisions, label of the
+escalated issues) are printed, so a setting can be picked for conf.perf_commit['issue-prefilter'].
+
+Usage: python -m scripts.tune_issue_prefilter [--manual-labels] [--max-escalation 0.5]
+"""
+
+import argparse
+import json
+import re
+
+import pandas as pd
+import src.config as conf
+from src.gh.issue_prefilter import IssuePrefilter, YES, NO, ESCALATE
+from src.llm.invocation_cache import InvocationCache
+
+PROMPT_PATTERN = re.compile(r'###Issue Title###(?P<title>.*?)\n###Issue Title End###.*?'
+                            r'###Issue Body###(?P<body>.*?)\n###Issue Body End###.*?'
+                            r'Is this issue related to improving execution time\?', re.DOTALL)
+MANUAL_LABELS_PATH = 'results/manual_analysis/precision_analysis.csv'
+
+
+def load_llm_examples(cache_dir: str) -> list[dict]:
+    """(title, body, labels, label) examples from the cached performance-issue invocations."""
+    examples = {}
+    for serialized in InvocationCache(cache_dir).iter_serialized():
+        invocation = json.loads(serialized)
+        match = PROMPT_PATTERN.search(invocation['prompt']['messages'][0]['content'])
+        samples = invocation['response']['samples']
+        if match is None or not samples or samples[0]['content'] is None:
+            continue
+        key = (match.group('title'), match.group('body'))
+        # Prompts repeat per fixing commit, one example per issue text is enough
+        examples[key] = {
+            'title': match.group('title'),
+            'body': match.group('body'),
+            'labels': [], # Labels are not part of the prompt
+            'label': 'yes' in samples[0]['content'].lower(),
+            'source': 'llm',
+        }
+    return list(examples.values())
+
+
+def load_manual_examples() -> list[dict]:
+    from src.gh.client import get_github_client
+    from src.gh.issue_resolver import IssueResolver
+
+    resolver = IssueResolver(get_github_client(), conf.perf_commit['issue-cache-dir'],
+                             conf.perf_commit['issue-cache-max-entries'])
+    examples = []
+    for _, row in pd.read_csv(MANUAL_LABELS_PATH).iterrows():
+        match = re.match(r'https://github\.com/([^/]+/[^/]+)/issues/(\d+)', str(row['issue_link']))
+        if match is None:
+            continue
+        issue = resolver.get(match.group(1), int(match.group(2)))
+        if issue is None:
+            continue
+        examples.append({
+            'title': issue.title,
+            'body': issue.body,
+            'labels': issue.labels,
+            'label': str(row['is_exec_improvement']).strip().lower() == 'yes',
+            'source': 'manual',
+        })
+    resolver.flush()
+    return examples
+
+
+def evaluate(scores: list[float], labels: list[bool], positive_threshold: float, negative_threshold: float) -> dict:
+    prefilter = IssuePrefilter(positive_threshold, negative_threshold, audit_rate=0.0)
+    decided, agreed, escalated = 0, 0, 0
+    true_positives, false_positives, false_negatives = 0, 0, 0
+    for score, label in zip(scores, labels):
+        decision = prefilter.local_decision(score)
+        # Escalated issues get the LLM verdict, i.e., the label
+        verdict = label if decision == ESCALATE else decision == YES
+        true_positives += verdict and label
+        false_positives += verdict and not label
+        false_negatives += not verdict and label
+        if decision == ESCALATE:
+            escalated += 1
+            continue
+        decided += 1
+        agreed += (decision == YES) == label
+    return {
+        'positive': positive_threshold,
+        'negative': negative_threshold,
+        'escalation_rate': escalated / len(scores),
+        'agreement': agreed / decided if decided else float('nan'),
+        'precision': true_positives / (true_positives + false_positives) if true_positives + false_positives else float('nan'),
+        'recall': true_positives / (true_positives + false_negatives) if true_positives + false_negatives else float('nan'),
+        'decided': decided,
+        'local_yes': sum(prefilter.local_decision(s) == YES for s in scores),
+        'local_no': sum(prefilter.local_decision(s) == NO for s in scores),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cache-dir', default=conf.llm['llm-invocation-cache-dir'])
+    parser.add_argument('--manual-labels', action='store_true', help=f'Also use {MANUAL_LABELS_PATH} (needs GitHub access).')
+    parser.add_argument('--max-escalation', type=float, default=1.0, help='Only print settings escalating at most this fraction.')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    examples = load_llm_examples(args.cache_dir)
+    if args.manual_labels:
+        examples += load_manual_examples()
+    if not examples:
+        print(f"No labelled examples found in {args.cache_dir}.")
+        return
+
+    scorer = IssuePrefilter(0.0, 0.0, 0.0)
+    scores = [scorer.score(e['title'], e['body'], e['labels']) for e in examples]
+    labels = [e['label'] for e in examples]
+    print(f"{len(examples)} examples ({sum(labels)} positive, "
+          f"{sum(e['source'] == 'manual' for e in examples)} manually labelled).")
+
+    settings = conf.perf_commit['issue-prefilter']
+    current = evaluate(scores, labels, settings['positive-threshold'], settings['negative-threshold'])
+    results = [evaluate(scores, labels, p / 2, -n / 2) for p in range(2, 21) for n in range(0, 13)]
+    results = [r for r in results if r['escalation_rate'] <= args.max_escalation and r['decided']]
+    # Best agreement first, then the fewest escalations
+    results.sort(key=lambda r: (-r['agreement'], r['escalation_rate']))
+
+    df = pd.DataFrame([current] + results[:args.top], index=['configured'] + [''] * min(args.top, len(results)))
+    print(df.to_string(float_format=lambda v: f'{v:.3f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import pandas as pd
+import src.config as conf
+from src.data.dataset_events import ANALYSIS_FAILED, ANALYSIS_STARTED
+
+SUCCESS_STATUS = "maven_execution_successful"
+# States of a commit, whether they are analyzed again by default
+NEW = "new"                   # Never analyzed
+INTERRUPTED = "interrupted"   # The last analysis neither finished nor failed, e.g., the process was killed
+RETRY = "transient_failure"   # The last analysis failed transiently, attempts are left
+FAILED = "failed"             # Failed for good, or transient failures used up the attempts
+SUCCESSFUL = "successful"
+RUNNABLE_STATES = (NEW, INTERRUPTED, RETRY)
+
+
+def _last_run_states(events: pd.DataFrame, max_attempts: int) -> dict[tuple[str, str], str]:
+    """The state of each commit with events, from its last analysis run and its transient failures."""
+    states = {}
+    for key, commit_events in events.groupby(["repo", "after_commit"], sort=False):
+        commit_events = commit_events.sort_values("time", kind="stable")
+        starts = (commit_events["event"] == ANALYSIS_STARTED).to_numpy().nonzero()[0]
+        last_run = commit_events.iloc[starts[-1]:] if len(starts) else commit_events
+        failures = commit_events[commit_events["event"] == ANALYSIS_FAILED]
+        if (last_run["event"] == SUCCESS_STATUS).any():
+            states[key] = SUCCESSFUL
+        elif (last_run["event"] == ANALYSIS_FAILED).any():
+            details = last_run[last_run["event"] == ANALYSIS_FAILED]["details"].iloc[-1]
+            transient = isinstance(details, dict) and details.get("transient", False)
+            transient_failures = sum(isinstance(d, dict) and d.get("transient", False) for d in failures["details"])
+            states[key] = RETRY if transient and transient_failures < max_attempts else FAILED
+        elif len(starts):
+            states[key] = INTERRUPTED
+    return states
+
+
+def plan_analysis(df: pd.DataFrame, events: pd.DataFrame, only_status: list[str] | None = None, force: bool = False,
+                  max_attempts: int = conf.run_analysis['max-attempts']) -> pd.DataFrame:
+    """
+    The commits of the dataset with their state and whether this run analyzes them. New and interrupted
+    commits and the ones whose last analysis failed transiently (fewer than max_attempts times) are
+    analyzed; successful commits and failed ones are skipped, unless forced. A status without events is
+    from a run before the event log: its analysis is taken as failed for good. only_status restricts the
+    run to the commits with one of the given exec_status values ('none' for commits without status).
+    """
+    states = _last_run_states(events, max_attempts)
+    plan = df[["repo", "after_commit", "before_commit", "pr_number", "exec_status"]].copy()
+    plan["state"] = [
+        SUCCESSFUL if status == SUCCESS_STATUS
+        else states.get((repo, commit), NEW if pd.isna(status) else FAILED)
+        for repo, commit, status in zip(plan["repo"], plan["after_commit"], plan["exec_status"])
+    ]
+    plan["run"] = True if force else plan["state"].isin(RUNNABLE_STATES)
+    if only_status:
+        plan["run"] &= plan["exec_status"].fillna("none").isin(only_status)
+    return plan
+
+
+def describe_plan(plan: pd.DataFrame) -> str:
+    """A summary of the planned workload: the commits analyzed and skipped, by state."""
+    def by_state(rows: pd.DataFrame) -> str:
+        counts = rows["state"].value_counts()
+        return ", ".join(f"{count} {state}" for state, count in counts.items()) or "none"
+
+    planned, skipped = plan[plan["run"]], plan[~plan["run"]]
+    return (f"Planned workload: {len(planned)} of {len(plan)} commits to analyze ({by_state(planned)}); "
+            f"skipping {len(skipped)} ({by_state(skipped)}).")
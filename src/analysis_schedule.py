@@ -0,0 +1,143 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+import src.config as conf
+
+
+def _modules(value) -> int | None:
+    return len(value) if isinstance(value, list) else None
+
+
+def estimate_costs(plan: pd.DataFrame, df: pd.DataFrame, stages: pd.DataFrame,
+                   default_seconds: float = conf.run_analysis['default-job-seconds']) -> pd.DataFrame:
+    """
+    The planned jobs with an estimate of their duration in seconds, and where it comes from, from the
+    stage durations of past analyses (see DatasetAdapter.stage_durations), failed ones included:
+    - 'commit': the longest past analysis of the commit,
+    - 'repo': the median of the analyses of the other commits of the repository,
+    - 'modules': the median duration per modified module of all analyses, times the modified modules,
+    - 'default': default_seconds, without past analyses.
+    """
+    totals = stages.groupby(["repo", "after_commit", "run"])["seconds"].sum()
+    per_commit = totals.groupby(level=["repo", "after_commit"]).max()
+    per_repo = per_commit.groupby(level="repo").median()
+    modules = df.set_index(["repo", "after_commit"])["modified_modules"].map(_modules)
+    modules = modules[~modules.index.duplicated()]
+    counts = modules.reindex(per_commit.index)
+    per_module = None
+    if counts.notna().any():
+        per_module = (per_commit[counts.notna()] / counts[counts.notna()].clip(lower=1)).median()
+    elif len(per_commit):
+        per_module = per_commit.median()
+
+    estimates, sources = [], []
+    for repo, commit in zip(plan["repo"], plan["after_commit"]):
+        if (repo, commit) in per_commit.index:
+            estimate, source = per_commit[(repo, commit)], "commit"
+        elif repo in per_repo.index:
+            estimate, source = per_repo[repo], "repo"
+        elif per_module is not None:
+            count = modules.get((repo, commit))
+            estimate, source = per_module * (1 if count is None or pd.isna(count) else max(1, count)), "modules"
+        else:
+            estimate, source = default_seconds, "default"
+        estimates.append(float(estimate))
+        sources.append(source)
+    plan = plan.copy()
+    plan["estimate"] = estimates
+    plan["estimate_source"] = sources
+    return plan
+
+
+def longest_first(plan: pd.DataFrame) -> pd.DataFrame:
+    """The jobs in dispatch order: longest estimate first, so the long jobs do not end the run alone."""
+    return plan.sort_values("estimate", ascending=False, kind="stable")
+
+
+def makespan(estimates: list[float], builders: int, busy: list[float] | None = None) -> float:
+    """
+    Seconds until the jobs are done when each one goes, in the given order, to the first free builder, with
+    the builders busy for the given seconds first.
+    """
+    free = sorted((busy or []) + [0.0] * (builders - len(busy or [])))[:builders]
+    heapq.heapify(free)
+    for estimate in estimates:
+        heapq.heappush(free, heapq.heappop(free) + estimate)
+    return max(free) if free else 0.0
+
+
+def format_seconds(seconds: float) -> str:
+    return str(timedelta(seconds=round(seconds)))
+
+
+class AnalysisProgress:
+    """
+    Progress of the analysis jobs dispatched to the builders, reported periodically: the jobs done, the ETA
+    and the utilization of the builders. The estimates of the jobs left are scaled by how the finished jobs
+    compare to their own estimates.
+    """
+
+    def __init__(self, plan: pd.DataFrame, builders: int, running, interval: float = conf.run_analysis['progress-interval']):
+        self.estimates = {(repo, commit): estimate
+                          for repo, commit, estimate in zip(plan["repo"], plan["after_commit"], plan["estimate"])}
+        self.pending = list(self.estimates) # Dispatch order
+        self.builders = builders
+        # (repo, after_commit) -> start time of the jobs being analyzed, shared with the workers
+        self.running = running
+        self.interval = interval
+        self.done: set[tuple[str, str]] = set()
+        # Seconds taken by the done jobs that got a builder
+        self.finished: dict[tuple[str, str], float] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._report_periodically, daemon=True)
+
+    def start(self) -> None:
+        self.started = time.time()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._log(self.report())
+
+    def job_done(self, key: tuple[str, str], result) -> None:
+        """Pool callback of a job, with the (start, end) times returned by run_analysis."""
+        with self._lock:
+            if key in self.pending:
+                self.pending.remove(key)
+            self.done.add(key)
+            if result is not None:
+                self.finished[key] = result[1] - result[0]
+
+    def report(self, now: float | None = None) -> str:
+        now = now or time.time()
+        with self._lock:
+            running = {key: start for key, start in dict(self.running).items() if key in self.estimates}
+            pending = [key for key in self.pending if key not in running]
+            finished = dict(self.finished)
+            done = len(self.done)
+        elapsed = now - self.started
+        estimated = sum(self.estimates[key] for key in finished)
+        scale = sum(finished.values()) / estimated if finished and estimated > 0 else 1.0
+        busy = [max(0.0, self.estimates[key] * scale - (now - start)) for key, start in running.items()]
+        remaining = makespan([self.estimates[key] * scale for key in pending], self.builders, busy)
+        busy_seconds = sum(finished.values()) + sum(now - start for start in running.values())
+        utilization = busy_seconds / (elapsed * self.builders) if elapsed > 0 else 0.0
+        return (f"Analysis progress: {done}/{len(self.estimates)} jobs done, {len(running)} running, "
+                f"elapsed {format_seconds(elapsed)}, ETA {format_seconds(remaining)} "
+                f"(~{datetime.fromtimestamp(now + remaining):%Y-%m-%d %H:%M}), "
+                f"builder utilization {100 * utilization:.0f}%, jobs took {scale:.2f}x their estimates")
+
+    def _report_periodically(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._log(self.report())
+
+    @staticmethod
+    def _log(message: str) -> None:
+        logging.info(message)
+        print(message, flush=True)
@@ -2,6 +2,7 @@ import os
 from datetime import datetime
 llm = {
     'llm-invocation-cache-dir': 'cache/llm_invocations',
+    'llm-invocation-cache-packed': True, # Append new invocations to compressed segments instead of one file each
     'api-url': 'https://openrouter.ai/api/v1',
     'openrouter-api-key': os.environ['OPENROUTER_API_KEY'],
     'default-temp': 0,
@@ -9,10 +10,32 @@ llm = {
     'default-improvement-iterations': 0,
     'default-model': 'openai/gpt-4.1-nano',
     'max-o4-tokens': 10000,
+    'max-in-flight': 8, # Concurrent API requests per adapter
+    'request-timeout': 120, # Seconds, a timed out request is retried
+    'max-retries': 5, # On rate limits and transient API errors
+    'retry-initial-backoff': 2.0, # Seconds, doubled on every retry
+    'prompt-token-budgets': { # Per model, longer issue classification prompts are cut, see src/gh/issue_prompt.py
+        'openai/gpt-5-nano': 4000,
+        'openai/gpt-5.1-codex-mini': 4000,
+    },
+    'default-prompt-token-budget': 8000,
+    'telemetry-report-path': 'logs/llm_telemetry_{:%Y-%m-%d-%H-%M}.csv'.format(datetime.now()), # Per-run report by stage and model
+    'prices': { # USD per 1M (input, output) tokens, used for cost estimates
+        'openai/gpt-5-nano': (0.05, 0.40),
+        'openai/gpt-5.1-codex-mini': (0.25, 2.00),
+    },
 }
 
 github = {
     'access-token': os.environ['github_access_token'],
+    # Pool of tokens the requests are rotated across, comma-separated in github_access_tokens, always with github_access_token
+    'access-tokens': list(dict.fromkeys(
+        [os.environ['github_access_token']]
+        + [t.strip() for t in os.environ.get('github_access_tokens', '').split(',') if t.strip()])),
+    'requests-per-second': {'core': 1.35, 'search': 0.45, 'graphql': 1.35}, # Per token, below the hourly/minutely quotas
+    'burst': 20,
+    'http-cache-enabled': True,
+    'http-cache-dir': 'cache/http',
 }
 
 perf_commit = {
@@ -23,6 +46,32 @@ perf_commit = {
     'start-date': '2015-01-01',
     'min-stars': 20,
     'max-stars': -1,
+    'num-workers': 1, # Number of repositories scanned concurrently by the collector
+    'checkpoint-path': 'cache/checkpoints/static_collection.json', # Delete it to start the collection from scratch
+    'search-window-target': 500, # Repositories the adaptive search aims for per window, well below the 1,000 cap
+    'search-min-window-hours': 1,
+    'search-max-window-days': 365,
+    'commit-fetch-mode': 'rest', # 'rest' (one request per commit) or 'graphql' (bulk history pages, filters applied locally)
+    'local-prefilter': False, # Apply the max-files and Java-source-only filters on a blobless partial clone of each repository
+    'prefilter-clone-dir': 'cache/clones',
+    'prefilter-git-timeout': 1800, # Seconds a clone or fetch of the local prefilter may take
+    'issue-cache-dir': 'cache/issues', # Persistent issue/PR resolution per repository
+    'issue-cache-max-entries': 5000, # Per repository, least recently used entries are evicted
+    'pr-cache-dir': 'cache/pulls', # Performance issue fixed by each evaluated pull request, and the pull requests of each commit
+    'classification-wave-size': 4, # Issues of a commit classified concurrently while looking for its first performance issue
+    'issue-prefilter': { # Local keyword/label scorer deciding clear cases before the LLM, tune with scripts/tune_issue_prefilter.py
+        # Off until the thresholds are validated against the LLM verdicts, it changes how issues are classified
+        'enabled': False,
+        'positive-threshold': 6.0,
+        'negative-threshold': -3.0,
+        'audit-rate': 0.05, # Fraction of local decisions also sent to the LLM to measure agreement
+    },
+    'model-cascade': { # Ask GPT5_Nano first and escalate to GPT_5_1_Codex_Mini only if its answer is not confident
+        # Off until its savings and disagreement with codex are measured on real data, confident nano verdicts replace codex's
+        'enabled': False,
+        'min-confidence': 80,
+        'audit-rate': 0.05, # Fraction of confident nano answers also sent to codex to measure disagreement
+    },
 }
 
 def get_mvnw_log_file_name(version: str, exec_time: int) -> str:
@@ -44,6 +93,12 @@ docker = {
 
 run_analysis = {
     'num-processes': 1,
+    # Analyses of a commit that failed transiently (see test_analyzer.is_transient_failure) before it is given up
+    'max-attempts': 3,
+    # Estimated duration of an analysis when no past analysis is logged, see analysis_schedule.estimate_costs
+    'default-job-seconds': 3600,
+    # Seconds between the progress reports (jobs done, ETA, builder utilization) of a run
+    'progress-interval': 300,
     'log-file': 'logs/logging_{:%Y-%m-%d-%H-%M}.log'.format(datetime.now()),
     'log-format': '%(asctime)s,%(msecs)d %(name)s %(levelname)s %(message)s',
     'log-datefmt': '%H:%M:%S',
@@ -52,6 +107,11 @@ run_analysis = {
 
 data = {
     'dataset-path': 'results/dataset.csv',
+    # 'csv' or 'sqlite'; the SQLite database upserts single rows, export it with scripts/dataset_db.py
+    'backend': 'csv',
+    'sqlite-path': 'results/dataset.sqlite',
+    # Keep results/dataset.parquet, loaded much faster than the CSV, up to date (needs pyarrow)
+    'parquet-sidecar': True,
 }
 
 utils = {
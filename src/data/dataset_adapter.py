@@ -2,21 +2,54 @@ import json
 import ast
 import os
 import fcntl
+import threading
 import pandas as pd
 import src.config as conf
 from tempfile import NamedTemporaryFile
 import shutil
+from typing import Iterable
+from src.data import dataset_parquet
+from src.data.dataset_events import DatasetEventLog, fold_events, make_event, stage_durations
 
 DATASET_PATH = conf.data["dataset-path"]
+COLUMNS = ["repo", "after_commit", "issue_number", "exec_status", "exec_time_improvement", "p_value",
+           "test_class_improvements", "before_commit", "pr_number", "is_improvement_per_manual_analysis",
+           "modified_modules", "changed_files"]
 LOCK_FILE_PATH = DATASET_PATH + ".lock"
 
+def check_columns(row: dict):
+    unknown = row.keys() - set(COLUMNS)
+    if unknown:
+        raise TypeError(f"Unknown dataset columns: {', '.join(sorted(unknown))}")
+
+
 class DatasetAdapter:
     """Process-safe adapter for managing performance dataset with file-based locking."""
 
-    def __init__(self):
+    def __init__(self, dataset_path: str = DATASET_PATH):
+        self.dataset_path = dataset_path
+        self.lock_file_path = dataset_path + ".lock"
+        # Parsed copy of the CSV, written by get_dataset when enabled and pyarrow is installed
+        self.parquet_path = os.path.splitext(dataset_path)[0] + ".parquet"
+        # Status transitions, appended without rewriting the dataset, see compact
+        self.events = DatasetEventLog(os.path.splitext(dataset_path)[0] + "_events.jsonl")
         # Each process gets its own instance
         # We'll reload from disk when needed to ensure we have the latest data
         self.df = None
+        # (repo, after_commit) pairs of the file, valid while its signature is unchanged
+        self._commit_index: set[tuple[str, str]] | None = None
+        self._index_signature = None
+        self._index_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Instances are passed to worker processes, which load their own index
+        state = self.__dict__.copy()
+        state.update(_commit_index=None, _index_signature=None, _index_lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._index_lock = threading.Lock()
 
     @staticmethod
     def _parse_serialized_field(value, expected_type):
@@ -77,20 +110,25 @@ class DatasetAdapter:
 
         return None
 
-    def _get_file_lock(self):
-        """Get a file lock for cross-process synchronization."""
+    def _get_file_lock(self, shared: bool = False):
+        """Get a file lock for cross-process synchronization, shared for readers and exclusive for writers."""
         # Ensure directory exists
-        lock_dir = os.path.dirname(LOCK_FILE_PATH)
+        lock_dir = os.path.dirname(self.lock_file_path)
         if lock_dir:
             os.makedirs(lock_dir, exist_ok=True)
-        lock_file = open(LOCK_FILE_PATH, 'w')
-        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        lock_file = open(self.lock_file_path, 'a')
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
         return lock_file
     
-    def _load_dataset(self) -> pd.DataFrame:
-        """Load existing dataset or create an empty one."""
-        if os.path.exists(DATASET_PATH):
-            df = pd.read_csv(DATASET_PATH)
+    def _load_dataset(self, use_sidecar: bool = True) -> pd.DataFrame:
+        """Load existing dataset or create an empty one, from the Parquet sidecar if it is up to date."""
+        signature = self._file_signature()
+        if use_sidecar and conf.data["parquet-sidecar"]:
+            df = dataset_parquet.read_sidecar(self.parquet_path, signature)
+            if df is not None:
+                return df
+        if signature is not None:
+            df = pd.read_csv(self.dataset_path)
             df["test_class_improvements"] = df["test_class_improvements"].apply(
                 lambda value: self._parse_serialized_field(value, dict)
             )
@@ -119,12 +157,21 @@ class DatasetAdapter:
                 "changed_files": pd.Series(dtype="object"),
             })
             # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(DATASET_PATH), exist_ok=True)
-            df.to_csv(DATASET_PATH, index=False)
+            os.makedirs(os.path.dirname(self.dataset_path), exist_ok=True)
+            df.to_csv(self.dataset_path, index=False)
         return df
     
     def get_dataset(self) -> pd.DataFrame:
         """Get the dataset, loading it if not already loaded."""
+        if self.df is None and conf.data["parquet-sidecar"]:
+            signature = self._file_signature()
+            self.df = dataset_parquet.read_sidecar(self.parquet_path, signature)
+            if self.df is None:
+                self.df = self._load_dataset(use_sidecar=False)
+                if signature is not None and signature == self._file_signature():
+                    # Written from the parsed CSV only, so both load the same frame. Saves outdate it, the
+                    # next reader writes it again.
+                    dataset_parquet.write_sidecar(self.df, self.parquet_path, signature)
         if self.df is None:
             self.df = self._load_dataset()
         return self.df
@@ -145,7 +192,7 @@ class DatasetAdapter:
         changed_files: list[str] | None,
     ):
         """Process-safe add or update of a commit record using file locking."""
-        new_row = {
+        self.add_or_update_commits([{
             "repo": repo,
             "after_commit": after_commit,
             "issue_number": issue_number,
@@ -158,37 +205,92 @@ class DatasetAdapter:
             "is_improvement_per_manual_analysis": is_improvement_per_manual_analysis,
             "modified_modules": modified_modules,
             "changed_files": changed_files,
-        }
+        }])
+
+    def add_or_update_commits(self, rows: Iterable[dict]):
+        """
+        Add or update several commit records with a single locked write. Every row has the arguments of
+        add_or_update_commit, missing ones are None; the rows are applied in order, and None values keep the
+        stored ones.
+        """
+        # Rows of the same commit are merged first
+        merged: dict[tuple[str, str], dict] = {}
+        for row in rows:
+            check_columns(row)
+            key = (row["repo"], row["after_commit"])
+            values = merged.setdefault(key, {column: None for column in COLUMNS})
+            values.update({column: value for column, value in row.items() if value is not None})
+        if not merged:
+            return
 
         # Acquire file lock for cross-process synchronization
         lock_file = self._get_file_lock()
         try:
             # Reload from disk to get the latest data (important for multiprocessing)
+            signature = self._file_signature()
             df = self._load_dataset()
-            
-            # Check if record exists
-            mask = (df["repo"] == repo) & (df["after_commit"] == after_commit)
-            if mask.any():
-                for key, value in new_row.items():
+
+            positions = {key: i for i, key in enumerate(zip(df["repo"], df["after_commit"]))}
+            new_rows = []
+            for key, values in merged.items():
+                if key not in positions:
+                    new_rows.append(values)
+                    continue
+                for column, value in values.items():
                     if value is not None:
-                        df.loc[mask, key] = value
-            else:
-                df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+                        if df[column].dtype != object and not isinstance(value, (int, float)):
+                            # Lists and strings in a column read as numbers, e.g., when it was empty
+                            df[column] = df[column].astype(object)
+                        df.at[df.index[positions[key]], column] = value
+            if new_rows:
+                df = pd.concat([df, pd.DataFrame(new_rows, columns=COLUMNS)], ignore_index=True)
 
             # Save atomically
             self._atomic_save(df)
-            
+
             # Update in-memory copy
             self.df = df
+            with self._index_lock:
+                if self._commit_index is not None and signature is not None and self._index_signature == signature:
+                    # The index was up to date with the file this save was based on
+                    self._commit_index.update(merged)
+                    self._index_signature = self._file_signature()
         finally:
             # Release lock
             fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
             lock_file.close()
 
+    def batch(self) -> "DatasetBatch":
+        """Collect the updates of a with block, written with add_or_update_commits when it exits."""
+        return DatasetBatch(self)
+
+    def record_event(self, repo: str, after_commit: str, event: str, details: dict | None = None, **values):
+        """Append a timestamped event of a commit to the event log. Its values are written to the dataset by compact."""
+        check_columns(values)
+        self.events.append(make_event(repo, after_commit, event, values, details))
+
+    def record_status(self, repo: str, after_commit: str, status: str, **values):
+        """Record a status transition of a commit, which sets its exec_status and the given values."""
+        self.record_event(repo, after_commit, status, exec_status=status, **values)
+
+    def compact(self) -> int:
+        """Apply the values of the logged events to the dataset, with a single write. Returns the number of events applied."""
+        rows = fold_events(self.get_events())
+        self.add_or_update_commits(rows)
+        return len(rows)
+
+    def get_events(self) -> pd.DataFrame:
+        """The logged events, in the order they were recorded."""
+        return self.events.to_frame()
+
+    def stage_durations(self) -> pd.DataFrame:
+        """The duration of every analysis stage in the event log, see dataset_events.stage_durations."""
+        return stage_durations(self.get_events())
+
     def _atomic_save(self, df: pd.DataFrame):
         """Safely save DataFrame to CSV using a temporary file and rename."""
         # Ensure directory exists
-        os.makedirs(os.path.dirname(DATASET_PATH), exist_ok=True)
+        os.makedirs(os.path.dirname(self.dataset_path), exist_ok=True)
         
         # Prepare DataFrame for CSV (convert test_class_improvements back to JSON string)
         df_to_save = df.copy()
@@ -205,22 +307,78 @@ class DatasetAdapter:
             for val in df_to_save["changed_files"]
         ]
         
-        tmp_file = NamedTemporaryFile(delete=False, dir=os.path.dirname(DATASET_PATH), mode="w", suffix=".csv")
+        tmp_file = NamedTemporaryFile(delete=False, dir=os.path.dirname(self.dataset_path), mode="w", suffix=".csv")
         try:
             df_to_save.to_csv(tmp_file.name, index=False)
             tmp_file.flush()
             os.fsync(tmp_file.fileno())
         finally:
             tmp_file.close()
-        shutil.move(tmp_file.name, DATASET_PATH)
+        shutil.move(tmp_file.name, self.dataset_path)
     
-    def contains(self, repo: str, after_commit: str) -> bool:
-        """Check if a after_commit exists in the dataset (reads latest from disk)."""
-        lock_file = self._get_file_lock()
+    def _file_signature(self) -> tuple[int, int, int] | None:
+        """Changes whenever the file is written: saves replace it, so its inode changes too."""
         try:
-            df = self._load_dataset()
-            mask = (df["repo"] == repo) & (df["after_commit"] == after_commit)
-            return mask.any()
+            stat = os.stat(self.dataset_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load_commit_index(self) -> None:
+        """Must be called with the index lock held."""
+        lock_file = self._get_file_lock(shared=True)
+        try:
+            self._index_signature = self._file_signature()
+            if self._index_signature is None:
+                self._commit_index = set()
+                return
+            # Only the key columns, the serialized ones are not parsed
+            keys = pd.read_csv(self.dataset_path, usecols=["repo", "after_commit"], dtype=str)
+            self._commit_index = set(zip(keys["repo"], keys["after_commit"]))
         finally:
             fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
-            lock_file.close()
\ No newline at end of file
+            lock_file.close()
+
+    def contains(self, repo: str, after_commit: str) -> bool:
+        """
+        Check if a after_commit exists in the dataset. The commits are indexed in memory, the index is
+        reloaded only when the file was written since, e.g., by another process.
+        """
+        with self._index_lock:
+            if self._commit_index is None or self._file_signature() != self._index_signature:
+                self._load_commit_index()
+            return (repo, after_commit) in self._commit_index
+
+
+class DatasetBatch:
+    """
+    Updates of commit records collected in memory and written together, e.g., the status transitions of
+    an analysis. The updates are written when the with block exits, also on an exception.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.rows: list[dict] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+    def add_or_update_commit(self, repo: str, after_commit: str, **values):
+        """Like DatasetAdapter.add_or_update_commit, the omitted values are None."""
+        self.rows.append({"repo": repo, "after_commit": after_commit, **values})
+
+    def flush(self):
+        rows, self.rows = self.rows, []
+        if rows:
+            self.dataset.add_or_update_commits(rows)
+
+
+def create_dataset_adapter():
+    """The DatasetAdapter of the configured backend."""
+    if conf.data["backend"] == "sqlite":
+        from src.data.sqlite_dataset_adapter import SQLiteDatasetAdapter
+        return SQLiteDatasetAdapter(conf.data["sqlite-path"])
+    return DatasetAdapter()
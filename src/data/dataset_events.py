@@ -0,0 +1,100 @@
+import fcntl
+import json
+import logging
+import os
+import time
+from typing import Iterator
+import pandas as pd
+
+ANALYSIS_STARTED = "analysis_started"
+ANALYSIS_FAILED = "analysis_failed"
+EVENT_COLUMNS = ["time", "repo", "after_commit", "event", "values", "details"]
+
+
+def plain_value(value):
+    """Numpy scalars and pandas NA, e.g., of a dataset row, as Python values, for JSON and SQLite."""
+    if value is pd.NA:
+        return None
+    if hasattr(value, "item") and not isinstance(value, (str, list, dict)):
+        return value.item()
+    return value
+
+
+def make_event(repo: str, after_commit: str, event: str, values: dict, details: dict | None = None) -> dict:
+    """
+    An event of a commit, with the dataset values it sets, e.g., exec_status for a status transition, and
+    details that are only logged, e.g., the error of a failed analysis.
+    """
+    return {"time": time.time(), "repo": repo, "after_commit": after_commit, "event": event, "values": values,
+            "details": details}
+
+
+def fold_events(events: pd.DataFrame) -> list[dict]:
+    """The dataset rows updated by the events, in the order of the events, for add_or_update_commits."""
+    return [{"repo": event.repo, "after_commit": event.after_commit, **event.values}
+            for event in events.sort_values("time", kind="stable").itertuples() if event.values]
+
+
+def stage_durations(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    The duration of every analysis stage: the time from the previous event of the commit to the event
+    ending the stage, e.g., from analysis_started to clone_and_checkout_repo. The stages of each analysis
+    run of a commit, which starts with analysis_started, are numbered by run.
+    """
+    columns = ["repo", "after_commit", "run", "stage", "started", "seconds"]
+    if events.empty:
+        return pd.DataFrame(columns=columns)
+    events = events.sort_values(["repo", "after_commit", "time"], kind="stable").copy()
+    commit = [events["repo"], events["after_commit"]]
+    events["run"] = (events["event"] == ANALYSIS_STARTED).astype(int).groupby(commit).cumsum()
+    events["started"] = events.groupby(commit + [events["run"]])["time"].shift()
+    stages = events[events["started"].notna()].rename(columns={"event": "stage"})
+    stages["seconds"] = stages["time"] - stages["started"]
+    stages["started"] = pd.to_datetime(stages["started"], unit="s")
+    return stages[columns].reset_index(drop=True)
+
+
+class DatasetEventLog:
+    """Append-only JSONL log of dataset events, one line per event, safe for concurrent writers."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, event: dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        line = (json.dumps(event, default=plain_value) + "\n").encode("utf-8")
+        with open(self.path, "a+b") as f:
+            # Lines of concurrent writers must not interleave
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                # A writer killed mid-line leaves an incomplete last line, the event goes on a line of its own
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line
+                f.write(line)
+                f.flush()
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def __iter__(self) -> Iterator[dict]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+            try:
+                lines = f.readlines()
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        for number, line in enumerate(lines, 1):
+            # The last line is incomplete if its writer was killed
+            if not line.endswith("\n") or not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                # The incomplete line of a writer killed mid-line, ended by the next append
+                logging.warning(f"Skipping undecodable line {number} of {self.path}: {e}")
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(list(self), columns=EVENT_COLUMNS)
@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+from tempfile import NamedTemporaryFile
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Optional, without pyarrow the dataset is loaded from the CSV only
+    pa = pq = None
+
+# Columns serialized as JSON in the CSV, stored with native types
+NESTED_COLUMNS = ["test_class_improvements", "modified_modules", "changed_files"]
+SIGNATURE_KEY = b"dataset_csv_signature"
+COLUMNS_KEY = b"dataset_columns"
+
+
+def _arrow_type(name: str):
+    return {
+        "test_class_improvements": pa.map_(pa.string(), pa.list_(pa.string())),
+        "modified_modules": pa.list_(pa.string()),
+        "changed_files": pa.list_(pa.string()),
+    }[name]
+
+
+def _to_python(column) -> list:
+    """The values of a list or map column as lists and dicts. Through numpy, several times faster than to_pylist."""
+    values = column.to_pandas(maps_as_pydicts="strict")
+    if pa.types.is_map(column.type):
+        return [None if d is None else {k: v.tolist() for k, v in d.items()} for d in values]
+    return [None if v is None else v.tolist() for v in values]
+
+
+def available() -> bool:
+    return pq is not None
+
+
+def write_sidecar(df: pd.DataFrame, path: str, signature: tuple) -> None:
+    """
+    Write the parsed dataset to a Parquet file next to the CSV, with the signature of the CSV it was loaded
+    from. The nested columns are stored as native list and map columns, the others keep their pandas dtypes.
+    """
+    if not available():
+        return
+    try:
+        table = pa.Table.from_pandas(df.drop(columns=NESTED_COLUMNS), preserve_index=False)
+        for name in NESTED_COLUMNS:
+            table = table.append_column(name, pa.array(df[name].tolist(), type=_arrow_type(name)))
+        table = table.replace_schema_metadata({**table.schema.metadata,
+                                               SIGNATURE_KEY: json.dumps(list(signature)).encode(),
+                                               COLUMNS_KEY: json.dumps(list(df.columns)).encode()})
+    except (pa.ArrowException, TypeError, ValueError) as e:
+        # e.g., values of another shape than the native types, the CSV stays the only copy
+        logging.info(f"Dataset not written to {path}: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    tmp_file = NamedTemporaryFile(delete=False, dir=os.path.dirname(path) or '.', suffix=".parquet")
+    tmp_file.close()
+    try:
+        pq.write_table(table, tmp_file.name)
+        os.replace(tmp_file.name, path)
+    except BaseException:
+        os.remove(tmp_file.name)
+        raise
+
+
+def read_sidecar(path: str, signature: tuple) -> pd.DataFrame | None:
+    """The dataset of the Parquet file, or None if it is missing or was not written from the CSV with that signature."""
+    if not available() or signature is None or not os.path.exists(path):
+        return None
+    try:
+        table = pq.read_table(path)
+    except (pa.ArrowException, OSError):
+        return None
+    metadata = table.schema.metadata or {}
+    if json.loads(metadata.get(SIGNATURE_KEY, b"null")) != list(signature):
+        return None
+
+    nested = {name: _to_python(table.column(name)) for name in NESTED_COLUMNS}
+    df = table.drop_columns(NESTED_COLUMNS).to_pandas()
+    for name, values in nested.items():
+        df[name] = pd.Series(values, dtype="object")
+    return df[json.loads(metadata[COLUMNS_KEY])]
@@ -0,0 +1,216 @@
+import json
+import os
+import sqlite3
+import threading
+import fcntl
+import pandas as pd
+import src.config as conf
+from typing import Iterable
+from src.data.dataset_adapter import DatasetAdapter, DatasetBatch, check_columns
+from src.data.dataset_events import EVENT_COLUMNS, make_event, plain_value, stage_durations
+
+COLUMNS = [
+    ("repo", "TEXT NOT NULL"),
+    ("after_commit", "TEXT NOT NULL"),
+    ("issue_number", "INTEGER"),
+    ("exec_status", "TEXT"),
+    ("exec_time_improvement", "REAL"),
+    ("p_value", "REAL"),
+    ("test_class_improvements", "TEXT"),
+    ("before_commit", "TEXT"),
+    ("pr_number", "INTEGER"),
+    ("is_improvement_per_manual_analysis", "INTEGER"),
+    ("modified_modules", "TEXT"),
+    ("changed_files", "TEXT"),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+# Stored as JSON text, like in the CSV
+JSON_COLUMNS = {"test_class_improvements": dict, "modified_modules": list, "changed_files": list}
+# Stored as 0/1, databases created before were storing the text written to the CSV
+BOOL_COLUMNS = ["is_improvement_per_manual_analysis"]
+
+UPSERT = (f"INSERT INTO commits ({', '.join(COLUMN_NAMES)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+          f"ON CONFLICT (repo, after_commit) DO UPDATE SET "
+          # Like the CSV backend, only the given (non-None) values overwrite the stored ones
+          + ', '.join(f"{name} = COALESCE(excluded.{name}, {name})" for name in COLUMN_NAMES[2:]))
+
+
+def _parse_bool(value) -> bool | None:
+    """A stored or given boolean: a bool, 0/1, or the 'True'/'False' text of the CSV."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1")
+    return bool(value)
+
+
+class SQLiteDatasetAdapter:
+    """
+    DatasetAdapter backed by an SQLite database in WAL mode, for large datasets and many concurrent writers.
+
+    Commits are upserted row by row on the (repo, after_commit) primary key instead of rewriting the
+    whole file, and readers are not blocked by writers. The database can be exported to the CSV format
+    of DatasetAdapter for publishing, and an existing CSV dataset can be imported.
+    """
+
+    def __init__(self, db_path: str = conf.data["sqlite-path"]):
+        self.db_path = db_path
+        # The CSV it is imported from and exported to, results/dataset.csv for the default database
+        self.csv_path = os.path.splitext(db_path)[0] + ".csv"
+        self.df = None
+        # sqlite3 connections must stay in the thread that opened them
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS commits ({', '.join(f'{name} {kind}' for name, kind in COLUMNS)}, "
+                         f"PRIMARY KEY (repo, after_commit))")
+            # Append-only, like the event log of DatasetAdapter
+            conn.execute("CREATE TABLE IF NOT EXISTS events (time REAL NOT NULL, repo TEXT NOT NULL, "
+                         "after_commit TEXT NOT NULL, event TEXT NOT NULL, \"values\" TEXT NOT NULL, details TEXT)")
+
+    def __getstate__(self):
+        # Instances are passed to worker processes, which open their own connections
+        state = self.__dict__.copy()
+        state['_local'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        # A forked process must not use the connections of its parent
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Durable at checkpoints; a crash loses at most the last transactions, never corrupts the database
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_dataset(self) -> pd.DataFrame:
+        """Get the dataset, loading it if not already loaded."""
+        if self.df is None:
+            self.df = self._load_dataset()
+        return self.df
+
+    def _load_dataset(self) -> pd.DataFrame:
+        df = pd.read_sql_query(f"SELECT {', '.join(COLUMN_NAMES)} FROM commits ORDER BY rowid", self._connection())
+        for name, expected_type in JSON_COLUMNS.items():
+            df[name] = df[name].apply(lambda value: DatasetAdapter._parse_serialized_field(value, expected_type))
+        df["issue_number"] = pd.to_numeric(df["issue_number"], errors="coerce").astype("Int64")
+        df["pr_number"] = pd.to_numeric(df["pr_number"], errors="coerce").astype("Int64")
+        for name in BOOL_COLUMNS:
+            values = df[name].map(_parse_bool)
+            # Like pandas reading the CSV: a bool column without missing values, object otherwise
+            df[name] = values.astype(bool) if values.notna().all() else values.astype(object)
+        return df
+
+    @staticmethod
+    def _row(row: dict) -> tuple:
+        values = []
+        for name in COLUMN_NAMES:
+            value = plain_value(row.get(name))
+            if value is not None and name in JSON_COLUMNS:
+                value = json.dumps(value)
+            elif name in BOOL_COLUMNS:
+                value = _parse_bool(value)
+                value = None if value is None else int(value)
+            values.append(value)
+        return tuple(values)
+
+    def add_or_update_commit(
+        self,
+        repo: str,
+        after_commit: str,
+        issue_number: int | None,
+        exec_status: str | None,
+        exec_time_improvement: float | None,
+        p_value: float | None,
+        test_class_improvements: dict[str, float] | None,
+        before_commit: str | None,
+        pr_number: int | None,
+        is_improvement_per_manual_analysis: bool | None,
+        modified_modules: list[str] | None,
+        changed_files: list[str] | None,
+    ):
+        """Process-safe add or update of a commit record, as a single-row upsert."""
+        self.add_or_update_commits([{name: value for name, value in locals().items() if name in COLUMN_NAMES}])
+
+    def add_or_update_commits(self, rows: Iterable[dict]):
+        """Add or update several commit records in a single transaction, see DatasetAdapter.add_or_update_commits."""
+        values = []
+        for row in rows:
+            check_columns(row)
+            values.append(self._row(row))
+        with self._connection() as conn:
+            conn.executemany(UPSERT, values)
+        # The in-memory copy is reloaded on the next get_dataset
+        self.df = None
+
+    def batch(self) -> DatasetBatch:
+        """Collect the updates of a with block, written with add_or_update_commits when it exits."""
+        return DatasetBatch(self)
+
+    def record_event(self, repo: str, after_commit: str, event: str, details: dict | None = None, **values):
+        """Record a timestamped event of a commit and upsert its values, in one transaction."""
+        check_columns(values)
+        event = make_event(repo, after_commit, event, values, details)
+        with self._connection() as conn:
+            conn.execute("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                         (event["time"], repo, after_commit, event["event"], json.dumps(values, default=plain_value),
+                          None if details is None else json.dumps(details, default=plain_value)))
+            if values:
+                conn.execute(UPSERT, self._row({"repo": repo, "after_commit": after_commit, **values}))
+        self.df = None
+
+    def record_status(self, repo: str, after_commit: str, status: str, **values):
+        """Record a status transition of a commit, which sets its exec_status and the given values."""
+        self.record_event(repo, after_commit, status, exec_status=status, **values)
+
+    def compact(self, csv_path: str | None = None) -> int:
+        """The events are applied when recorded, compaction writes the CSV snapshot of the database. Returns its number of rows."""
+        return self.export_csv(csv_path)
+
+    def get_events(self) -> pd.DataFrame:
+        """The recorded events, in the order they were recorded."""
+        events = pd.read_sql_query("SELECT time, repo, after_commit, event, \"values\", details FROM events ORDER BY rowid",
+                                   self._connection())
+        for name in ("values", "details"):
+            events[name] = [json.loads(value) if isinstance(value, str) else None for value in events[name]]
+        return events[EVENT_COLUMNS]
+
+    def stage_durations(self) -> pd.DataFrame:
+        """The duration of every analysis stage, see dataset_events.stage_durations."""
+        return stage_durations(self.get_events())
+
+    def contains(self, repo: str, after_commit: str) -> bool:
+        """Check if a after_commit exists in the dataset, with a primary key lookup."""
+        cursor = self._connection().execute("SELECT 1 FROM commits WHERE repo = ? AND after_commit = ?",
+                                            (repo, after_commit))
+        return cursor.fetchone() is not None
+
+    def import_csv(self, csv_path: str | None = None) -> int:
+        """Upsert every row of a CSV dataset. Returns the number of rows."""
+        df = DatasetAdapter(csv_path or self.csv_path).get_dataset()
+        rows = [self._row({name: (None if not isinstance(value, (dict, list)) and pd.isna(value) else value)
+                           for name, value in record.items()})
+                for record in df.to_dict('records')]
+        with self._connection() as conn:
+            conn.executemany(UPSERT, rows)
+        self.df = None
+        return len(rows)
+
+    def export_csv(self, csv_path: str | None = None) -> int:
+        """Write the dataset in the CSV format of DatasetAdapter, atomically. Returns the number of rows."""
+        df = self._load_dataset()
+        csv_adapter = DatasetAdapter(csv_path or self.csv_path)
+        lock_file = csv_adapter._get_file_lock()
+        try:
+            csv_adapter._atomic_save(df)
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+        return len(df)
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+from datetime import datetime
+from tempfile import NamedTemporaryFile
+
+
+class CollectionCheckpoint:
+    """
+    Persistent progress of the static collection, so that a restarted run resumes where it stopped.
+
+    It records:
+        - the search windows that were fully handed out, merged into contiguous intervals,
+        - the newest scanned commit (SHA and committer date) of every finished repository,
+        - the repositories that were handed out but not finished yet, which are resumed first.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {
+            'scan_origin': None,
+            'completed_windows': [],
+            'repos': {},
+            'in_progress_repos': [],
+        }
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.state.update(json.load(f))
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_file = NamedTemporaryFile(delete=False, dir=directory, mode='w', suffix='.tmp')
+        try:
+            json.dump(self.state, tmp_file, indent=1)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        finally:
+            tmp_file.close()
+        os.replace(tmp_file.name, self.path)
+
+    # Search windows
+
+    def start_scan(self, origin: datetime, start_boundary: datetime) -> datetime:
+        """
+        Return the end of the first window to search. A scan that did not reach start_boundary is
+        resumed below its last completed window; otherwise a new scan starting at origin is begun.
+        """
+        with self._lock:
+            windows = self.state['completed_windows']
+            if self.state['scan_origin'] is not None and windows:
+                resume_at = datetime.fromisoformat(min(start for start, _ in windows))
+                if resume_at > start_boundary:
+                    return resume_at
+            self.state['scan_origin'] = origin.isoformat()
+            self.state['completed_windows'] = []
+            self._save()
+            return origin
+
+    def mark_window_done(self, window_start: datetime, window_end: datetime) -> None:
+        with self._lock:
+            start, end = window_start.isoformat(), window_end.isoformat()
+            merged = []
+            for other_start, other_end in self.state['completed_windows']:
+                if other_start <= end and start <= other_end:
+                    start, end = min(start, other_start), max(end, other_end)
+                else:
+                    merged.append([other_start, other_end])
+            merged.append([start, end])
+            self.state['completed_windows'] = sorted(merged)
+            self._save()
+
+    # Repositories
+
+    def start_repo(self, repo_name: str) -> None:
+        with self._lock:
+            if repo_name not in self.state['in_progress_repos']:
+                self.state['in_progress_repos'].append(repo_name)
+                self._save()
+
+    def finish_repo(self, repo_name: str, newest_sha: str | None, newest_date: datetime | None) -> None:
+        with self._lock:
+            if newest_sha is not None:
+                self.state['repos'][repo_name] = {'sha': newest_sha, 'date': newest_date.isoformat()}
+            if repo_name in self.state['in_progress_repos']:
+                self.state['in_progress_repos'].remove(repo_name)
+            self._save()
+
+    def in_progress_repos(self) -> list[str]:
+        with self._lock:
+            return list(self.state['in_progress_repos'])
+
+    def repo_head(self, repo_name: str) -> tuple[str, datetime] | None:
+        """The newest commit scanned in an earlier run, as (sha, committer date)."""
+        with self._lock:
+            head = self.state['repos'].get(repo_name)
+        if head is None:
+            return None
+        return head['sha'], datetime.fromisoformat(head['date'])
@@ -0,0 +1,170 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from github import Auth, Github
+from github.Requester import Requester, RequestsResponse
+import src.config as conf
+from src.gh.http_cache import CachedResponse, HttpCache
+from src.gh.rate_limit import RateLimitScheduler, resource_for_url
+
+
+class _SharedSessionConnection:
+    """
+    Drop-in replacement for PyGithub's requests-based connection classes.
+
+    PyGithub sends a call as ``request()`` followed by ``getresponse()`` on the same connection
+    object, which breaks as soon as several threads share one ``Github`` instance. This class keeps
+    the pending request in thread-local storage and sends it over one pooled ``requests.Session``
+    per host, so concurrent workers can safely share a single client. GET requests go through the
+    persistent HTTP cache (see ``HttpCache``) when it is enabled, and requests made with one of the
+    configured access tokens are paced and rotated by the ``RateLimitScheduler``.
+    """
+    protocol = "https"
+    _sessions: dict[tuple[str, str, int], requests.Session] = {}
+    _sessions_lock = threading.Lock()
+
+    def __init__(self, host: str, port: int | None = None, strict: bool = False, timeout: int | None = None,
+                 retry=None, pool_size: int | None = None, **kwargs):
+        self.host = host
+        self.port = port if port else (443 if self.protocol == "https" else 80)
+        self.timeout = timeout
+        self.verify = kwargs.get("verify", True)
+        self.session = self._get_session(retry, pool_size)
+        self._pending = threading.local()
+
+    def _get_session(self, retry, pool_size: int | None) -> requests.Session:
+        key = (self.protocol, self.host, self.port)
+        with self._sessions_lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                # Like PyGithub, keep requests from falling back to credentials in ~/.netrc
+                session.auth = Requester.noopAuth
+                pool_maxsize = max(pool_size or 10, conf.perf_commit['num-workers'])
+                adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+                session.mount(f"{self.protocol}://", adapter)
+                self._sessions[key] = session
+        return session
+
+    def request(self, verb: str, url: str, input, headers: dict, stream: bool = False) -> None:
+        self._pending.request = (verb, url, input, dict(headers), stream)
+
+    def _send_raw(self, verb: str, url: str, input, headers: dict, stream: bool = False) -> requests.Response:
+        return self.session.request(
+            verb,
+            f"{self.protocol}://{self.host}:{self.port}{url}",
+            headers=headers,
+            data=input,
+            timeout=self.timeout,
+            verify=self.verify,
+            allow_redirects=False,
+            stream=stream,
+        )
+
+    def _send(self, verb: str, url: str, input, headers: dict, stream: bool = False) -> requests.Response:
+        """Send the request with the pool token picked by the rate-limit scheduler, if it manages this client's token."""
+        scheduler = get_rate_limit_scheduler()
+        auth_key = next((k for k in headers if k.lower() == 'authorization'), None)
+        token = headers[auth_key].split(' ', 1)[-1] if auth_key else None
+        if scheduler is None or token is None or not scheduler.manages(token):
+            return self._send_raw(verb, url, input, headers, stream)
+
+        resource = resource_for_url(url)
+        token = scheduler.acquire(resource)
+        headers[auth_key] = f"token {token}"
+        r = self._send_raw(verb, url, input, headers, stream)
+        # The message is the only sign of a secondary rate limit without Retry-After
+        rate_limited = r.status_code == 403 and not stream and 'rate limit' in r.text.lower()
+        scheduler.update(token, resource, r.status_code, r.headers, rate_limited)
+        return r
+
+    def getresponse(self) -> RequestsResponse | CachedResponse:
+        verb, url, input, headers, stream = self._pending.request
+        self._pending.request = None
+
+        cache = get_http_cache()
+        if cache is None or verb != "GET" or stream:
+            return RequestsResponse(self._send(verb, url, input, headers, stream))
+
+        key = cache.key(self.host, self.port, url, headers)
+        entry = cache.get(key)
+        if entry is not None and cache.is_immutable(url):
+            cache.record('hits')
+            return CachedResponse(entry)
+        if entry is not None:
+            headers.update(cache.conditional_headers(entry))
+
+        r = self._send(verb, url, input, headers)
+        if r.status_code == 304 and entry is not None:
+            cache.record('revalidations')
+            return CachedResponse(entry, fresh_headers=r.headers)
+
+        # Only a new version of the resource refreshes a stale entry, errors (e.g., 403, 404) leave it as is
+        refreshed = entry is not None and r.status_code == 200
+        cache.record('updates' if refreshed else 'misses')
+        if r.status_code == 200:
+            cache.put(key, url, r.status_code, r.headers, r.text)
+        return RequestsResponse(r)
+
+    def close(self) -> None:
+        # The session is shared between connections and lives as long as the process.
+        pass
+
+
+class SharedSessionHTTPConnection(_SharedSessionConnection):
+    protocol = "http"
+
+
+class SharedSessionHTTPSConnection(_SharedSessionConnection):
+    protocol = "https"
+
+
+_install_lock = threading.Lock()
+_installed = False
+_http_cache: HttpCache | None = None
+_rate_limit_scheduler: RateLimitScheduler | None = None
+
+
+def get_http_cache() -> HttpCache | None:
+    """The process-wide HTTP cache shared by all GitHub clients, or None if it is disabled."""
+    return _http_cache
+
+
+def get_rate_limit_scheduler() -> RateLimitScheduler | None:
+    """The process-wide scheduler rotating the configured access tokens, or None before any client is created."""
+    return _rate_limit_scheduler
+
+
+def _install_connection_classes() -> None:
+    global _installed, _http_cache, _rate_limit_scheduler
+    with _install_lock:
+        if not _installed:
+            if conf.github['http-cache-enabled']:
+                _http_cache = HttpCache(conf.github['http-cache-dir'])
+            _rate_limit_scheduler = RateLimitScheduler(conf.github['access-tokens'],
+                                                       conf.github['requests-per-second'],
+                                                       conf.github['burst'])
+            Requester.injectConnectionClasses(SharedSessionHTTPConnection, SharedSessionHTTPSConnection)
+            _installed = True
+
+
+def log_github_client_stats() -> None:
+    if _http_cache is not None:
+        _http_cache.log_stats()
+    if _rate_limit_scheduler is not None:
+        _rate_limit_scheduler.log_stats()
+
+
+def get_github_client(access_token: str | None = None, **kwargs) -> Github:
+    """Create a ``Github`` client that is safe to share between threads and goes through the HTTP cache."""
+    _install_connection_classes()
+    token = access_token if access_token is not None else conf.github['access-token']
+    if _rate_limit_scheduler.manages(token):
+        # The scheduler paces these requests per token, PyGithub's global throttle would only serialize the workers
+        kwargs.setdefault('seconds_between_requests', None)
+        kwargs.setdefault('seconds_between_writes', None)
+    else:
+        logging.warning("The access token of this GitHub client is not in the token pool, "
+                        "its requests are neither paced nor rotated by the rate-limit scheduler.")
+    return Github(auth=Auth.Token(token), **kwargs)
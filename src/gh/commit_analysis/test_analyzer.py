@@ -3,6 +3,7 @@ import os
 import json
 import pandas as pd
 import re
+import subprocess
 from src.utils import run_cmd
 from src.gh.commit_analysis.commit_static_analyzer import RepoAnalyzer
 from src.gh.commit_analysis.utils.pom_manipulator import add_tia_to_pom
@@ -12,8 +13,21 @@ import numpy as np
 from scipy import stats
 from src.gh.commit_analysis.utils.mvn_log_analyzer import MvnwExecResults
 from src.data.dataset_adapter import DatasetAdapter
+from src.data.dataset_events import ANALYSIS_FAILED, ANALYSIS_STARTED
 from src.reproducibility.dockerizer import CommitDockerizer
 
+def is_transient_failure(stage: str, e: Exception) -> bool:
+    """
+    Whether an analysis that failed while working towards stage may succeed when retried: failures of git
+    (cloning and fetching over the network) and of the docker daemon (creating the container and copying
+    the logs out of it), and network errors. The docker build, which compiles and runs the tests, an
+    unsuccessful maven execution and missing or unreadable logs fail the same way again.
+    """
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return True
+    return isinstance(e, subprocess.CalledProcessError) and stage != "docker_image_built"
+
+
 class CommitPerfImprovementAnalyzer:
     class TestResult:
         def __init__(self, test_path: str, passed: bool, duration: float, covered_lines: dict[str, list[int]]):
@@ -355,36 +369,49 @@ class CommitPerfImprovementAnalyzer:
     def run_analysis(self) -> AnalysisResult | None:
         logging.info(f"{self.repo} - {self.commit} - Running analysis")
 
-        # clone the repo & checkout the commit & before commit
-        logging.info(f"{self.repo} - {self.commit} - Cloning and checking out the repo")
-        patched_clone_path = self._clone_and_checkout_repo()
-        original_clone_path = self._clone_and_checkout_original_commit(patched_clone_path)
-        logging.info(f"{self.repo} - {self.commit} - Cloned and checked out the repo")
-        self.dataset.add_or_update_commit(self.repo, self.commit, None, "clone_and_checkout_repo", None, None, None, self.before_commit, self.pr_number, None)
-
-
-        # identify modified modules
-        modified_modules = self._get_modified_modules(patched_clone_path)
-
-        # build docker image containing the modified repos and run tests in docker
-        self.dockerizer = CommitDockerizer(self.working_dir, self.repo, self.commit, patched_clone_path, original_clone_path, modified_modules, self.builder_name, conf.docker[f'exec-times'], conf.docker[f'timeout'])
-        if self.dockerizer.image_exists():
-            logging.info(f"{self.repo} - {self.commit} - Docker image already exists")
-        else:
-            self.dockerizer.build_commit_docker_image()
-        logging.info(f"{self.repo} - {self.commit} - Built docker image")
-        self.dataset.add_or_update_commit(self.repo, self.commit, None, "docker_image_built", None, None, None, self.before_commit, self.pr_number, None)
-
-        # get the results of executing maven
-        mvnw_exec_results = self.dockerizer.get_mvnw_exec_results()
-        logging.info(f"{self.repo} - {self.commit} - Got the results of executing maven")
-
-        # check if maven runs successfully on both versions
-        if not mvnw_exec_results.is_successful():
-            logging.error(f"{self.repo} - {self.commit} - Maven execution failed")
-            raise Exception(f"{self.repo} - {self.commit} - Maven execution failed")
-        logging.info(f"{self.repo} - {self.commit} - Maven execution successful")
-        self.dataset.add_or_update_commit(self.repo, self.commit, None, "maven_execution_successful", mvnw_exec_results.get_execution_improvement(), mvnw_exec_results.get_execution_improvement_p_value(), mvnw_exec_results.get_significant_test_class_improvements(), self.before_commit, self.pr_number, None)
+        # The status transitions are appended to the event log of the dataset, with their time
+        self.dataset.record_event(self.repo, self.commit, ANALYSIS_STARTED)
+        # The status the analysis is working towards, recorded with a failure
+        stage = "clone_and_checkout_repo"
+        try:
+            # clone the repo & checkout the commit & before commit
+            logging.info(f"{self.repo} - {self.commit} - Cloning and checking out the repo")
+            patched_clone_path = self._clone_and_checkout_repo()
+            original_clone_path = self._clone_and_checkout_original_commit(patched_clone_path)
+            logging.info(f"{self.repo} - {self.commit} - Cloned and checked out the repo")
+            self.dataset.record_status(self.repo, self.commit, "clone_and_checkout_repo", before_commit=self.before_commit, pr_number=self.pr_number)
+            stage = "docker_image_built"
+
+            # identify modified modules
+            modified_modules = self._get_modified_modules(patched_clone_path)
+
+            # build docker image containing the modified repos and run tests in docker
+            self.dockerizer = CommitDockerizer(self.working_dir, self.repo, self.commit, patched_clone_path, original_clone_path, modified_modules, self.builder_name, conf.docker[f'exec-times'], conf.docker[f'timeout'])
+            if self.dockerizer.image_exists():
+                logging.info(f"{self.repo} - {self.commit} - Docker image already exists")
+            else:
+                self.dockerizer.build_commit_docker_image()
+            logging.info(f"{self.repo} - {self.commit} - Built docker image")
+            self.dataset.record_status(self.repo, self.commit, "docker_image_built", modified_modules=sorted(modified_modules))
+            stage = "maven_execution_successful"
+
+            # get the results of executing maven
+            mvnw_exec_results = self.dockerizer.get_mvnw_exec_results()
+            logging.info(f"{self.repo} - {self.commit} - Got the results of executing maven")
+
+            # check if maven runs successfully on both versions
+            if not mvnw_exec_results.is_successful():
+                logging.error(f"{self.repo} - {self.commit} - Maven execution failed")
+                raise Exception(f"{self.repo} - {self.commit} - Maven execution failed")
+            logging.info(f"{self.repo} - {self.commit} - Maven execution successful")
+            self.dataset.record_status(self.repo, self.commit, "maven_execution_successful",
+                                       exec_time_improvement=mvnw_exec_results.get_execution_improvement(),
+                                       p_value=mvnw_exec_results.get_execution_improvement_p_value(),
+                                       test_class_improvements=mvnw_exec_results.get_significant_test_class_improvements())
+        except Exception as e:
+            self.dataset.record_event(self.repo, self.commit, ANALYSIS_FAILED,
+                                      details={"stage": stage, "transient": is_transient_failure(stage, e), "error": str(e)[:500]})
+            raise
 
         logging.info(f"{self.repo} - {self.commit} - Running analysis complete")
         return self.AnalysisResult(self.repo, self.commit, self.dockerizer.image_name, mvnw_exec_results)
\ No newline at end of file
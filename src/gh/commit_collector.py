@@ -2,56 +2,135 @@ from pathlib import Path
 import time
 import re
 import pandas as pd
-from src.data.dataset_adapter import DatasetAdapter
+from src.data.dataset_adapter import create_dataset_adapter
 from src.llm.openai import *
-from src.llm.invocation import Prompt
+from src.llm.cascade import ModelCascade
+from src.llm.invocation import Prompt, Response
+from src.llm.llm_adapter import LLMAdapter
+from src.llm.telemetry import telemetry, log_llm_telemetry
 import src.config as conf
-from github import Github, Issue
-from github import Auth
-from github.GithubException import UnknownObjectException
+from src.gh.client import get_github_client, get_rate_limit_scheduler, log_github_client_stats
+from src.gh.checkpoint import CollectionCheckpoint
+from src.gh.commit_history import CommitHistoryFetcher
+from src.gh.issue_prefilter import IssuePrefilter
+from src.gh.issue_prompt import render_within_budget
+from src.gh.issue_resolver import IssueResolver, ResolvedIssue
+from src.gh.partial_clone import PartialCloneHistory
+from src.gh.pr_cache import PullRequestCache
+from github import Github
+from github.GithubException import RateLimitExceededException, UnknownObjectException
 from github.Repository import Repository
 from github.Commit import Commit
+import contextvars
+import itertools
 import logging
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta, timezone
-from typing import Set, Optional
+from typing import Iterable, Iterator, Set, Optional
+
+ONE_WORD_ANSWER = ("Answer by only one word: 'yes' or 'no' (without any other text or punctuation). "
+                   "If you do not have enough information to decide, say 'no'.")
+CONFIDENT_ANSWER = ("Answer with 'yes' or 'no' followed by your confidence in that answer from 0 to 100, e.g., 'no 90' "
+                    "(without any other text or punctuation). If you do not have enough information to decide, say 'no' "
+                    "with a low confidence.")
+
+
+def performance_issue_prompt_text(repo_full_name: str, title: str, body: str, message, answer_format: str) -> str:
+    return (f"The following is an issue in the {repo_full_name} repository:\n\n###Issue Title###{title}\n###Issue Title End###\n\n###Issue Body###{body}\n###Issue Body End###"
+            + f"\n\nThe following is the commit message that fixes this issue:\n\n###Commit Message###{message}\n###Commit Message End###"
+            + f"\n\nIs this issue related to improving execution time? {answer_format}")
+
+
+SEARCH_RESULT_CAP = 1000 # The Search API never returns more results than this for one query
+SEARCH_WINDOW_MAX_GROWTH = 4.0
 
 class CommitCollector:
-    def __init__(self):
-        access_token = conf.github['access-token']
-        auth = Auth.Token(access_token)
-        self.g = Github(auth=auth)
-        self.gpt5_nano = GPT5_Nano(read_from_cache=True, save_to_cache=True)
-        self.gpt5_codex = GPT_5_1_Codex_Mini(read_from_cache=True, save_to_cache=True)
+    def __init__(self, g: Github | None = None, nano: LLMAdapter | None = None, codex: LLMAdapter | None = None):
+        self.num_workers = conf.perf_commit['num-workers']
+        self.g = g if g is not None else get_github_client(pool_size=self.num_workers, per_page=100)
+        # Other adapters, like ReplayLLMAdapter for offline benchmarks, can stand in for the two models
+        self.gpt5_nano = nano if nano is not None else GPT5_Nano(read_from_cache=True, save_to_cache=True)
+        self.gpt5_codex = codex if codex is not None else GPT_5_1_Codex_Mini(read_from_cache=True, save_to_cache=True)
         self.start_date = conf.perf_commit['start-date']
         self.min_stars = conf.perf_commit['min-stars']
         self.max_stars = conf.perf_commit['max-stars']
         self.max_commit_files = conf.perf_commit['max-files']
-        self.dataset = DatasetAdapter()
+        self.commit_fetch_mode = conf.perf_commit['commit-fetch-mode']
+        self.local_prefilter = conf.perf_commit['local-prefilter']
+        self.partial_clones = PartialCloneHistory(conf.perf_commit['prefilter-clone-dir'])
+        self.search_window_target = conf.perf_commit['search-window-target']
+        self.search_min_window = timedelta(hours=conf.perf_commit['search-min-window-hours'])
+        self.search_max_window = timedelta(days=conf.perf_commit['search-max-window-days'])
+        self.issue_resolver = IssueResolver(self.g, conf.perf_commit['issue-cache-dir'],
+                                            conf.perf_commit['issue-cache-max-entries'])
+        self.issue_prefilter = None
+        if conf.perf_commit['issue-prefilter']['enabled']:
+            self.issue_prefilter = IssuePrefilter(conf.perf_commit['issue-prefilter']['positive-threshold'],
+                                                  conf.perf_commit['issue-prefilter']['negative-threshold'],
+                                                  conf.perf_commit['issue-prefilter']['audit-rate'])
+        self.model_cascade = None
+        if conf.perf_commit['model-cascade']['enabled']:
+            self.model_cascade = ModelCascade(self.gpt5_nano, self.gpt5_codex,
+                                              conf.perf_commit['model-cascade']['min-confidence'],
+                                              conf.perf_commit['model-cascade']['audit-rate'])
+        self.pr_cache = PullRequestCache(conf.perf_commit['pr-cache-dir'])
+        self.dataset = create_dataset_adapter()
         self.processed_commits = set()
+        self.processed_commits_lock = threading.Lock()
+        self.checkpoint = CollectionCheckpoint(conf.perf_commit['checkpoint-path'])
+        # Newest commit seen while scanning each repository, stored in the checkpoint once the repository is done
+        self._scan_heads: dict[str, tuple[str, datetime]] = {}
+
+    def _search_query(self, window_start: datetime, window_end: datetime) -> str:
+        # Construct segmented query for this window (inclusive timestamps)
+        pushed_range = f"pushed:{window_start.strftime('%Y-%m-%dT%H:%M:%SZ')}..{window_end.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+        if self.max_stars != -1:
+            return f"{pushed_range} language:Java stars:{self.min_stars}..{self.max_stars} archived:false"
+        return f"{pushed_range} language:Java stars:>={self.min_stars} archived:false"
+
+    def _next_window_size(self, window_size: timedelta, total_count: int) -> timedelta:
+        """Size the next window so that it is expected to hold about search-window-target repositories."""
+        if total_count == 0:
+            scale = SEARCH_WINDOW_MAX_GROWTH
+        else:
+            scale = min(SEARCH_WINDOW_MAX_GROWTH, self.search_window_target / total_count)
+        return min(self.search_max_window, max(self.search_min_window, window_size * scale))
 
     def iter_popular_repos_segmented(self):
         """
         Work around GitHub Search API's 1,000 result cap by segmenting the search
         across pushed-date windows and deduplicating repositories across windows.
+        The window size adapts to the totalCount of each window: sparse windows are widened and
+        windows hitting the cap are split, so every repository is covered with few search requests.
+        Windows completed by an earlier, interrupted run are not searched again.
         """
         # Build rolling windows from now backwards to start_date
         start_boundary = datetime.strptime(self.start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        window_end = datetime.now(timezone.utc)
+        window_end = self.checkpoint.start_scan(datetime.now(timezone.utc), start_boundary)
         window_size = timedelta(days=1)
         seen_repo_ids: Set[int] = set()
+        windows, splits, search_requests, repos_found = 0, 0, 0, 0
 
         while window_end > start_boundary:
             window_start = max(start_boundary, window_end - window_size)
-
-            # Construct segmented query for this window (inclusive dates)
-            pushed_range = f"pushed:{window_start.date()}..{window_end.date()}"
-            if self.max_stars != -1:
-                query = f"{pushed_range} language:Java stars:{self.min_stars}..{self.max_stars} archived:false"
-            else:
-                query = f"{pushed_range} language:Java stars:>={self.min_stars} archived:false"
-            logging.info(f"Segmented fetch for {query}.")
+            query = self._search_query(window_start, window_end)
 
             repos_window = self.g.search_repositories(query=query, sort="stars", order="desc")
+            total_count = repos_window.totalCount
+            search_requests += 1
+
+            if total_count >= SEARCH_RESULT_CAP and window_end - window_start > self.search_min_window:
+                # Results beyond the cap cannot be paged through, search the two halves instead
+                window_size = max(self.search_min_window, (window_end - window_start) / 2)
+                splits += 1
+                logging.info(f"Splitting window {query} with {total_count} results.")
+                continue
+
+            logging.info(f"Segmented fetch for {query} ({total_count} results).")
+            windows += 1
+            search_requests += -(-min(total_count, SEARCH_RESULT_CAP) // self.g.per_page)
 
             # Iterate this window and deduplicate
             for repo in repos_window:
@@ -59,11 +138,20 @@ class CommitCollector:
                     continue
                 if getattr(repo, 'id', None) is not None:
                     seen_repo_ids.add(repo.id)
+                repos_found += 1
+                # Registered before it is handed out, so a crash before it is finished resumes it
+                self.checkpoint.start_repo(repo.full_name)
                 yield repo
 
+            self.checkpoint.mark_window_done(window_start, window_end)
+
             # Move window backwards
+            window_size = self._next_window_size(window_end - window_start, total_count)
             window_end = window_start
 
+        logging.info(f"Repository search finished: {windows} windows ({splits} splits), "
+                     f"about {search_requests} search requests, {repos_found} repositories found.")
+
     def get_diff(self, commit: Commit) -> str:
         diff = ""
         for f in commit.files:
@@ -72,30 +160,30 @@ class CommitCollector:
                 diff += f.patch + '\n'
         return diff
 
-    def extract_fixed_issues(self, message: str, repo: Repository) -> Set[int]:
+    def extract_issue_references(self, message: str, repo_full_name: str) -> list[int]:
         """
-        Extract issue numbers from message that are explicitly closed/fixed.
+        Extract the numbers that message explicitly closes/fixes, without checking whether they are issues.
         
         Args:
             message: The message to parse
-            repo: The GitHub repository object
+            repo_full_name: The full name of the repository the message belongs to
             
         Returns:
-            Set of issue numbers that are explicitly closed by this commit
+            List of referenced numbers, in order of appearance and without duplicates
             
         Examples:
             - "Fixes #123" -> {123}
             - "Closes #456 and resolves #789" -> {456, 789}
             - "Fix GH-123" -> {123}
             - "Resolves owner/repo#456" -> {456} (if matches current repo)
-            - "HAL-2028: fix attribute processing" -> {2028} (if GitHub issue #2028 exists)
-            - "Issue: [HAL-2028]" -> {2028} (if GitHub issue #2028 exists)
+            - "HAL-2028: fix attribute processing" -> {2028}
+            - "Issue: [HAL-2028]" -> {2028}
         """
         if not message:
-            return set()
+            return []
             
         msg = message.strip()
-        out: Set[int] = set()
+        out: dict[int, None] = {}
 
         # Enhanced regex patterns to catch more formats
         closing_prefix = r'(?:(?<![A-Za-z])(?:fix|fixes|fixed|close|closes|closed|resolve|resolves|resolved|address|addresses|addressed))(?:\s*[:\-])?\s+'
@@ -138,30 +226,6 @@ class CommitCollector:
             re.IGNORECASE | re.MULTILINE
         )
 
-        # Cache for API calls to avoid duplicate requests
-        issue_cache = {}
-        
-        def is_issue(n: int) -> bool:
-            """Check if the number refers to an issue (not a PR)."""
-            # Check cache first
-            if n in issue_cache:
-                return issue_cache[n]
-                
-            try:
-                issue = repo.get_issue(n)
-                is_issue_result = getattr(issue, "pull_request", None) is None
-                issue_cache[n] = is_issue_result
-                return is_issue_result
-            except UnknownObjectException:
-                # Issue doesn't exist or is private
-                issue_cache[n] = False
-                return False
-            except Exception as e:
-                # Handle rate limiting and other API errors
-                logging.warning(f"Error checking issue #{n} in {repo.full_name}: {e}")
-                issue_cache[n] = False  # Assume it's an issue to be safe
-                return False
-
         try:
             # Find all fix blocks in the commit message
             for block in fix_block.finditer(msg):
@@ -179,12 +243,11 @@ class CommitCollector:
                         elif len(match.groups()) == 2:
                             # Full repo patterns like owner/repo#123 or full URLs
                             repo_name = match.group(1)
-                            if repo_name.lower() == repo.full_name.lower():
+                            if repo_name.lower() == repo_full_name.lower():
                                 issue_number = int(match.group(2))
                         
                         if issue_number is not None and issue_number > 0:
-                            if is_issue(issue_number):
-                                out.add(issue_number)
+                            out[issue_number] = None
                 
                 # Check for PR references to skip them
                 for pr_pattern in compiled_pr_patterns:
@@ -200,68 +263,188 @@ class CommitCollector:
                     # The second group captures just the number
                     if len(match.groups()) >= 2:
                         issue_number = int(match.group(2))
-                        if issue_number > 0 and is_issue(issue_number):
+                        if issue_number > 0:
                             logging.debug(f"Found project-prefixed issue: {match.group(1)} -> #{issue_number}")
-                            out.add(issue_number)
+                            out[issue_number] = None
                             
         except Exception as e:
             logging.error(f"Error parsing commit message for issues: {e}")
             # Return what we found so far rather than failing completely
-            return out
+            return list(out)
 
-        return out
-
-    def is_performance_issue(self, repo: Repository, commit: Commit, issue: Issue) -> bool:
-        if issue.pull_request is not None:
-            return False
+        return list(out)
 
+    def extract_fixed_issues(self, message: str, repo: Repository) -> Set[int]:
+        """
+        Extract issue numbers from message that are explicitly closed/fixed.
+        References to pull requests and to numbers that do not exist are dropped using the issue resolver.
+        """
+        refs = self.extract_issue_references(message, repo.full_name)
+        resolved = self.issue_resolver.resolve(repo.full_name, refs)
+        return {n for n in refs if resolved[n] is not None and not resolved[n].is_pull_request}
+
+    def _prefetch_issue_references(self, repo: Repository, messages: Iterable[str]) -> None:
+        """Resolve the numbers referenced by all messages of a commit (and its pull requests) in one batch."""
+        refs = [n for msg in messages for n in self.extract_issue_references(msg, repo.full_name)]
+        if refs:
+            self.issue_resolver.resolve(repo.full_name, refs)
+
+    def _pr_message(self, pr) -> str:
+        return (pr.title or "") + "\n" + (pr.body or "")
+
+    def _performance_issue_prompt(self, repo: Repository, commit: Commit, issue: ResolvedIssue,
+                                  adapter: LLMAdapter | None = None, answer_format: str = ONE_WORD_ANSWER,
+                                  budget: int | None = None) -> Prompt:
         title = issue.title or ""
         body = issue.body or ""
+        adapter = adapter or self.gpt5_codex
+
+        # Huge stack traces and logs are cut to the model's token budget, prompts within it are unchanged
+        model = adapter.get_model()
+        if budget is None:
+            budget = conf.llm['prompt-token-budgets'].get(model, conf.llm['default-prompt-token-budget'])
+        content = render_within_budget(model, budget,
+                                       lambda t, b, m: performance_issue_prompt_text(repo.full_name, t, b, m, answer_format),
+                                       title, body, commit.commit.message)
+        return Prompt(messages=[Prompt.Message("user", content)], model=model)
+
+    def _is_yes(self, res: Response) -> bool:
+        return "yes" in res.first_content.lower().strip()
+
+    def is_performance_issue(self, repo: Repository, commit: Commit, issue: ResolvedIssue) -> bool:
+        if issue.is_pull_request:
+            return False
 
-        p = Prompt(messages=[Prompt.Message("user",
-                            f"The following is an issue in the {repo.full_name} repository:\n\n###Issue Title###{title}\n###Issue Title End###\n\n###Issue Body###{body}\n###Issue Body End###"
-                            + f"\n\nThe following is the commit message that fixes this issue:\n\n###Commit Message###{commit.commit.message}\n###Commit Message End###"
-                            + f"\n\nIs this issue related to improving execution time? Answer by only one word: 'yes' or 'no' (without any other text or punctuation). If you do not have enough information to decide, say 'no'.")], model=self.gpt5_codex.get_model())
-        res = self.gpt5_codex.get_response(p)
+        res = self.gpt5_codex.get_response(self._performance_issue_prompt(repo, commit, issue))
+        return self._is_yes(res)
 
-        if "yes" in res.first_content.lower().strip():
-            return True
-        
+    def classify_performance_issues(self, repo: Repository, commit: Commit, numbers: list[int],
+                                    first_only: bool = False) -> dict[int, bool]:
+        """
+        Classify several issues fixed by a commit at once. Clear cases are decided by the local prefilter,
+        the others are sent to the LLM concurrently. With first_only, only the first performance issue of the
+        numbers is needed: they are classified in order, in waves of perf_commit['classification-wave-size'],
+        until a wave has a positive one, and the numbers after that wave are left out of the verdicts.
+        """
+        numbers = list(dict.fromkeys(numbers))
+        wave_size = conf.perf_commit['classification-wave-size'] if first_only else len(numbers)
+        verdicts = {}
+        for i in range(0, len(numbers), max(1, wave_size)):
+            verdicts.update(self._classify_wave(repo, commit, numbers[i:i + wave_size]))
+            if first_only and any(verdicts.values()):
+                break
+        return verdicts
+
+    def _classify_wave(self, repo: Repository, commit: Commit, numbers: list[int]) -> dict[int, bool]:
+        resolved = self.issue_resolver.resolve(repo.full_name, numbers)
+        issues = [resolved[n] for n in numbers if resolved[n] is not None and not resolved[n].is_pull_request]
+
+        verdicts = {n: False for n in numbers}
+        decisions = {}
+        to_llm = issues
+        if self.issue_prefilter is not None:
+            to_llm = []
+            for issue in issues:
+                decision, escalate = self.issue_prefilter.decide(repo.full_name, issue)
+                decisions[issue.number] = decision
+                verdicts[issue.number] = decision == 'yes'
+                if escalate:
+                    to_llm.append(issue)
+
+        codex_prompts = [self._performance_issue_prompt(repo, commit, issue) for issue in to_llm]
+        if self.model_cascade is not None:
+            nano_prompts = [self._performance_issue_prompt(repo, commit, issue, self.gpt5_nano, CONFIDENT_ANSWER)
+                            for issue in to_llm]
+            llm_verdicts = self.model_cascade.classify([f"{repo.full_name}#{issue.number}@{commit.sha}" for issue in to_llm],
+                                                       nano_prompts, codex_prompts, self._is_yes)
         else:
-            return False
+            llm_verdicts = [self._is_yes(res) for res in self.gpt5_codex.get_responses(codex_prompts)]
 
-    def fixed_performance_issue(self, repo: Repository, commit: Commit) -> int | None:
-        msg = commit.commit.message or ""
+        for issue, verdict in zip(to_llm, llm_verdicts):
+            verdicts[issue.number] = verdict
+            if issue.number in decisions:
+                self.issue_prefilter.record_llm_verdict(decisions[issue.number], verdicts[issue.number])
+        return verdicts
 
-        issue_refs = self.extract_fixed_issues(msg, repo)
+    def _first_performance_issue(self, repo: Repository, commit: Commit, numbers: list[int]) -> int | None:
+        """The first of the numbers that is a performance issue."""
+        verdicts = self.classify_performance_issues(repo, commit, numbers, first_only=True)
+        return next((n for n in numbers if verdicts.get(n)), None)
 
-        if issue_refs:
-            for number in issue_refs:
-                try:
-                    if self.is_performance_issue(repo, commit, repo.get_issue(number)):
-                        return number
+    def _linked_pull_request_numbers(self, repo: Repository, commit: Commit) -> tuple[list[int], list]:
+        """
+        Numbers of the pull requests linked to a commit, from the pull request cache when they were already
+        listed. Also returns the pull request objects if they were listed now.
+        """
+        numbers = self.pr_cache.commit_pulls(repo.full_name, commit.sha)
+        if numbers is not None:
+            return numbers, []
+        pulls = list(commit.get_pulls())
+        numbers = [pr.number for pr in pulls]
+        self.pr_cache.set_commit_pulls(repo.full_name, commit.sha, numbers)
+        return numbers, pulls
+
+    def _evaluate_pull_requests(self, repo: Repository, commit: Commit, numbers: list[int], pulls: list,
+                                message_numbers: list[int] = ()) -> tuple[dict[int, bool], dict[int, dict]]:
+        """
+        Find the performance issue fixed by the linked pull requests that have no cached result yet, and record it
+        if the pull request is merged (an open one can still change). Only the first performance issue is
+        needed, of message_numbers first and then of each pull request in order, so the issues are classified
+        in that order until it is found (see classify_performance_issues), and the pull requests after it are
+        left unevaluated. Returns the verdicts of the classified issues and the results of the pull requests,
+        cached or evaluated now, as recorded by PullRequestCache.put_pull.
+        """
+        listed = {pr.number: pr for pr in pulls}
+        results, new_pulls = {}, []
+        for n in numbers:
+            cached = self.pr_cache.get_pull(repo.full_name, n)
+            if cached is None:
+                new_pulls.append(listed.get(n) or repo.get_pull(n))
+                continue
+            results[n] = cached
+            if cached['issue'] is not None:
+                # The pull requests after it are not needed
+                break
+        # Numbers referenced by the commit and by its new pull requests are resolved together
+        self._prefetch_issue_references(repo, [commit.commit.message or ""] + [self._pr_message(pr) for pr in new_pulls])
+
+        pr_issues = {pr.number: sorted(self.extract_fixed_issues(self._pr_message(pr), repo)) for pr in new_pulls}
+        verdicts = self.classify_performance_issues(
+            repo, commit, list(message_numbers) + [n for issues in pr_issues.values() for n in issues], first_only=True)
+
+        for pr in new_pulls:
+            issues = pr_issues[pr.number]
+            issue = next((n for n in issues if verdicts.get(n)), None)
+            if issue is None and any(n not in verdicts for n in issues):
+                # Left unclassified after an earlier performance issue
+                break
+            results[pr.number] = {'issue': issue, 'base': pr.base.sha, 'head': pr.head.sha}
+            if pr.merged_at is not None:
+                # The other commits of the pull request will reuse this result
+                self.pr_cache.put_pull(repo.full_name, pr.number, issue, pr.base.sha, pr.head.sha)
+        return verdicts, results
+
+    def fixed_performance_issue(self, repo: Repository, commit: Commit) -> int | None:
+        msg = commit.commit.message or ""
 
-                except UnknownObjectException:
-                    continue
-        
-        # If no fixed performance issue is found in the message, check if the commit is linked to a pull request and if the pull request fixes an a performance issue
         try:
-            pulls = commit.get_pulls()
-            for pr in pulls:
-                # Extract issues fixed by the PR from its body and title
-                pr_message = (pr.title or "") + "\n" + (pr.body or "")
-                pr_issue_refs = self.extract_fixed_issues(pr_message, repo)
-                
-                if pr_issue_refs:
-                    for number in pr_issue_refs:
-                        try:
-                            if self.is_performance_issue(repo, commit, repo.get_issue(number)):
-                                return number
-                        except UnknownObjectException:
-                            continue
+            pr_numbers, pulls = self._linked_pull_request_numbers(repo, commit)
         except Exception as e:
             logging.warning(f"Error checking pull requests for commit {commit.sha}: {e}")
-
+            pr_numbers, pulls = [], []
+
+        # Issues fixed by the commit message come first. If none of them is a performance issue,
+        # the issue fixed by the first pull request linked to the commit (from its title and body) is used
+        numbers = sorted(self.extract_fixed_issues(msg, repo))
+        verdicts, results = self._evaluate_pull_requests(repo, commit, pr_numbers, pulls, numbers)
+
+        number = next((n for n in numbers if verdicts.get(n)), None)
+        if number is not None:
+            return number
+        for pr_number in pr_numbers:
+            result = results.get(pr_number)
+            if result is not None and result['issue'] is not None:
+                return result['issue']
         return None
 
     def is_mvnw_repo(self, repo: Repository) -> bool:
@@ -271,72 +454,282 @@ class CommitCollector:
         except UnknownObjectException:
             return False
 
-    def collect_repo_perf_commits(self, repo: Repository):
-        # Fetch and filter commits
-        since = datetime.strptime(self.start_date, "%Y-%m-%d")
+    def _is_new_commit(self, repo: Repository, sha: str) -> bool:
+        """Whether the commit still has to be evaluated: no worker evaluated it and it is not in the dataset."""
+        with self.processed_commits_lock:
+            if sha in self.processed_commits:
+                return False
+        return not self.dataset.contains(repo.full_name, sha)
+
+    def _is_java_src_only(self, filenames: list[str]) -> bool:
+        return all(f.endswith(".java") and not 'test' in f.lower() for f in filenames)
+
+    def _iter_rest_candidate_commits(self, repo: Repository, since: datetime) -> Iterator[Commit]:
         fetched_commits = repo.get_commits(since=since)
         logging.info(f"Fetched {fetched_commits.totalCount} commits for {repo.full_name} since {since.isoformat()}")
 
         for commit in fetched_commits:
-            if commit.sha in self.processed_commits:
-                continue
-            
-            if self.dataset.contains(repo.full_name, commit.sha):
-                continue
+            if repo.full_name not in self._scan_heads:
+                self._scan_heads[repo.full_name] = (commit.sha, commit.commit.committer.date)
 
-            self.processed_commits.add(commit.sha)
+            if not self._is_new_commit(repo, commit.sha):
+                continue
 
             if commit.files.totalCount > self.max_commit_files:
                 logging.info(f"Skipping commit {commit.sha} in {repo.full_name} due to too many files ({commit.files.totalCount}).")
+                self._claim_commit(commit.sha)
                 continue
             
             # Skip if the commit does not contain changes in Java source files or contains anything other than Java source files
-            if not all(f.filename.endswith(".java") and not 'test' in f.filename.lower() for f in commit.files):
+            if not self._is_java_src_only([f.filename for f in commit.files]):
                 logging.info(f"Commit {commit.sha} in {repo.full_name} does not contain Java files or contains non Java source files.")
+                self._claim_commit(commit.sha)
                 continue
 
-            
-            issue_number = self.fixed_performance_issue(repo, commit)
-            if issue_number is None:
-                logging.info(f"Commit {commit.sha} in {repo.full_name} is not fixing performance issues.")
+            yield commit
+
+    def _iter_graphql_candidate_commits(self, repo: Repository, since: datetime) -> Iterator[Commit]:
+        """
+        Fetch the history in pages of 100 commits with GraphQL and apply the max-files filter locally.
+        Only commits that survive it are fetched over REST (one request each) to check their file paths.
+        """
+        history = CommitHistoryFetcher(self.g)
+        fetched = 0
+        for record in history.iter_commits(repo.full_name, since):
+            fetched += 1
+            if repo.full_name not in self._scan_heads:
+                self._scan_heads[repo.full_name] = (record.sha, datetime.fromisoformat(record.committed_date))
+
+            if not self._is_new_commit(repo, record.sha):
                 continue
 
-            logging.info(f"Found performance commit: {commit.html_url} (#{issue_number})")
+            if record.changed_files is not None and record.changed_files > self.max_commit_files:
+                logging.info(f"Skipping commit {record.sha} in {repo.full_name} due to too many files ({record.changed_files}).")
+                self._claim_commit(record.sha)
+                continue
 
-            self.dataset.add_or_update_commit(
-                repo=repo.full_name,
-                commit_hash=commit.sha,
-                issue_number=issue_number,
-                exec_status=None,
-                exec_time_improvement=None,
-                p_value=None,
-                test_class_improvements=None,
-            )
+            commit = repo.get_commit(record.sha)
+            # The fully loaded commit already contains its files, so listing them costs no extra request
+            filenames = [f.filename for f in commit.files]
+            if len(filenames) > self.max_commit_files:
+                logging.info(f"Skipping commit {record.sha} in {repo.full_name} due to too many files ({len(filenames)}).")
+                self._claim_commit(record.sha)
+                continue
 
-    def collect_commits(self):
-        # Iterate using segmented search to bypass 1k cap
+            # Skip if the commit does not contain changes in Java source files or contains anything other than Java source files
+            if not self._is_java_src_only(filenames):
+                logging.info(f"Commit {record.sha} in {repo.full_name} does not contain Java files or contains non Java source files.")
+                self._claim_commit(record.sha)
+                continue
+
+            yield commit
 
-        repos = self.iter_popular_repos_segmented()
-        for repo in repos:
+        logging.info(f"Fetched {fetched} commits for {repo.full_name} since {since.isoformat()} with {history.requests_issued} GraphQL requests")
+
+    def _iter_local_candidate_commits(self, repo: Repository, since: datetime) -> Iterator[Commit]:
+        """
+        Apply the max-files and Java-source-only filters on a blobless partial clone of the repository,
+        so that only the surviving commits are fetched from the API (one request each).
+        """
+        fetched, survivors = 0, 0
+        for record in self.partial_clones.iter_commits(repo.full_name, repo.default_branch, since):
+            fetched += 1
+            if repo.full_name not in self._scan_heads:
+                self._scan_heads[repo.full_name] = (record.sha, record.committed_date)
+
+            if not self._is_new_commit(repo, record.sha):
+                continue
 
-            logging.info(f"Processing repository {repo.full_name} with {repo.stargazers_count} stars.")
+            if len(record.filenames) > self.max_commit_files:
+                logging.debug(f"Skipping commit {record.sha} in {repo.full_name} due to too many files ({len(record.filenames)}).")
+                self._claim_commit(record.sha)
+                continue
 
-            if not self.is_mvnw_repo(repo):
-                logging.info(f"Skipping repository {repo.full_name} as it is not a Maven project.")
+            if not self._is_java_src_only(record.filenames):
+                logging.debug(f"Commit {record.sha} in {repo.full_name} does not contain Java files or contains non Java source files.")
+                self._claim_commit(record.sha)
                 continue
 
-            repo_tries = 0
-            while True:
-                try:
-                    self.collect_repo_perf_commits(repo)
-                    break # Successfully processed the repository
-                except Exception as e:
-                    logging.info(f"Error processing repository {repo.full_name}: {e}")
-                    time.sleep(300)  # Sleep to avoid hitting rate limits
-                    repo_tries += 1
-                    if repo_tries >= 6: # Do not wait more than one hour for a repo
-                        logging.info(f"Too many errors, stopping processing {repo.full_name}.")
-                        break
+            survivors += 1
+            yield repo.get_commit(record.sha)
+
+        logging.info(f"Prefiltered {fetched} commits for {repo.full_name} since {since.isoformat()} locally, {survivors} left for issue linking")
+
+    def iter_candidate_commits(self, repo: Repository) -> Iterator[Commit]:
+        """
+        Yield the new commits of a repository that pass the max-files and Java-source-only filters.
+        Only commits newer than the checkpoint of an earlier run are fetched.
+        """
+        since = datetime.strptime(self.start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        head = self.checkpoint.repo_head(repo.full_name)
+        if head is not None:
+            head_sha, head_date = head
+            self._claim_commit(head_sha)
+            since = max(since, head_date.astimezone(timezone.utc))
+        if self.local_prefilter:
+            return self._iter_prefiltered_candidate_commits(repo, since)
+        if self.commit_fetch_mode == 'graphql':
+            return self._iter_graphql_candidate_commits(repo, since)
+        return self._iter_rest_candidate_commits(repo, since)
+
+    def _iter_prefiltered_candidate_commits(self, repo: Repository, since: datetime) -> Iterator[Commit]:
+        try:
+            # Cloning, and a git log failing before it lists any commit, raise before the first commit is
+            # yielded, so a failure here loses no candidate
+            commits = self._iter_local_candidate_commits(repo, since)
+            first = next(commits, None)
+        except subprocess.SubprocessError as e:
+            logging.warning(f"Partial clone of {repo.full_name} failed ({e}), falling back to the API filters.")
+            yield from (self._iter_graphql_candidate_commits(repo, since) if self.commit_fetch_mode == 'graphql'
+                        else self._iter_rest_candidate_commits(repo, since))
+            return
+        if first is not None:
+            yield first
+            yield from commits
+
+    def collect_repo_perf_commits(self, repo: Repository):
+        try:
+            self._collect_repo_perf_commits(repo)
+        finally:
+            self.pr_cache.flush(repo.full_name)
+            self.issue_resolver.flush(repo.full_name)
+
+    def _collect_repo_perf_commits(self, repo: Repository):
+        # The performance commits of the repository are written together, also when its scan is interrupted
+        with self.dataset.batch() as batch:
+            for commit in self.iter_candidate_commits(repo):
+                issue_number = self.fixed_performance_issue(repo, commit)
+                if issue_number is None:
+                    logging.info(f"Commit {commit.sha} in {repo.full_name} is not fixing performance issues.")
+                else:
+                    logging.info(f"Found performance commit: {commit.html_url} (#{issue_number})")
+                    batch.add_or_update_commit(repo.full_name, commit.sha, issue_number=issue_number)
+                # Only claimed once evaluated, so an attempt that fails before leaves it to the retry
+                self._claim_commit(commit.sha)
+
+    def _claim_commit(self, sha: str) -> bool:
+        """
+        Mark a commit as evaluated, once it was filtered out or classified. Returns False if it was already
+        claimed (possibly by another worker).
+        """
+        with self.processed_commits_lock:
+            if sha in self.processed_commits:
+                return False
+            self.processed_commits.add(sha)
+            return True
+
+    def collect_repo(self, repo: Repository) -> float:
+        """Collect the performance commits of a single repository. Returns the time spent on it in seconds."""
+        started = time.perf_counter()
+        logging.info(f"Processing repository {repo.full_name} with {repo.stargazers_count} stars.")
+
+        if not self.is_mvnw_repo(repo):
+            logging.info(f"Skipping repository {repo.full_name} as it is not a Maven project.")
+            self.checkpoint.finish_repo(repo.full_name, None, None)
+            return time.perf_counter() - started
+
+        repo_tries = 0
+        rate_limit_hits, rate_limit_waits = 0, 0
+        while True:
+            # The newest commit of the attempt that evaluates them all is checkpointed
+            self._scan_heads.pop(repo.full_name, None)
+            try:
+                self.collect_repo_perf_commits(repo)
+                # Every commit up to the newest one was evaluated, by this worker or another one
+                newest_sha, newest_date = self._scan_heads.pop(repo.full_name, (None, None))
+                self.checkpoint.finish_repo(repo.full_name, newest_sha, newest_date)
+                break # Successfully processed the repository
+            except RateLimitExceededException as e:
+                # The scheduler marked the token that hit the limit; the repository is retried at once if
+                # another pooled token can go on, otherwise once the first one is available again
+                wait = self._rate_limit_wait_seconds(e)
+                rate_limit_hits += 1
+                if wait > 0:
+                    rate_limit_waits += 1
+                if rate_limit_waits >= 6 or rate_limit_hits >= 6 + len(conf.github['access-tokens']):
+                    logging.info(f"Rate limit keeps being exceeded, stopping processing {repo.full_name}.")
+                    break
+                logging.info(f"Rate limit exceeded while processing {repo.full_name}, retrying in {wait:.0f}s.")
+                if wait > 0:
+                    time.sleep(wait)
+                    scheduler = get_rate_limit_scheduler()
+                    if scheduler is not None:
+                        scheduler.record_idle_wait(wait)
+            except Exception as e:
+                logging.info(f"Error processing repository {repo.full_name}: {e}")
+                repo_tries += 1
+                if repo_tries >= 3:
+                    logging.info(f"Too many errors, stopping processing {repo.full_name}.")
+                    break
+                time.sleep(10 * 2 ** (repo_tries - 1))  # Short backoff for transient errors
+
+        return time.perf_counter() - started
+
+    def _rate_limit_wait_seconds(self, e: RateLimitExceededException) -> float:
+        """
+        Seconds until a request can be sent again: until any pooled token is available when the rate-limit
+        scheduler manages the client's token, otherwise until the limit that raised the exception is lifted,
+        based on its response headers.
+        """
+        headers = {k.lower(): v for k, v in (e.headers or {}).items()}
+        scheduler = get_rate_limit_scheduler()
+        if scheduler is not None and scheduler.manages(getattr(self.g.requester.auth, 'token', None)):
+            resource = headers.get('x-ratelimit-resource', 'core')
+            return min(scheduler.seconds_until_available(resource), 3600.0)
+        if 'retry-after' in headers:
+            wait = float(headers['retry-after'])
+        elif 'x-ratelimit-reset' in headers:
+            wait = float(headers['x-ratelimit-reset']) - time.time() + 1
+        else:
+            wait = 60.0
+        return min(max(wait, 1.0), 3600.0)
+
+    def _collect_repos_concurrently(self, repos: Iterable[Repository]) -> float:
+        """
+        Run collect_repo for several repositories at once on a bounded thread pool.
+        The GitHub client, the LLM adapters and processed_commits are shared by all workers.
+        At most two repositories per worker are queued, so the search is not paged far ahead of the workers.
+
+        Returns:
+            The summed per-repository processing time, i.e., the time the sequential path would have taken
+        """
+        busy_time = 0.0
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="collector") as executor:
+            for repo in repos:
+                if len(pending) >= 2 * self.num_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    busy_time += sum(f.result() for f in done)
+                # Each worker runs in a copy of the context, so its LLM calls are attributed to the current stage
+                pending.add(executor.submit(contextvars.copy_context().run, self.collect_repo, repo))
+
+            done, _ = wait(pending)
+            busy_time += sum(f.result() for f in done)
+        return busy_time
+
+    def _iter_resumed_repos(self) -> Iterator[Repository]:
+        """Repositories an interrupted run handed out but did not finish."""
+        for repo_name in self.checkpoint.in_progress_repos():
+            try:
+                yield self.g.get_repo(repo_name)
+            except UnknownObjectException:
+                self.checkpoint.finish_repo(repo_name, None, None)
+
+    def collect_commits(self):
+        # Iterate using segmented search to bypass 1k cap
+        started = time.perf_counter()
+
+        repos = itertools.chain(self._iter_resumed_repos(), self.iter_popular_repos_segmented())
+        with telemetry.stage('static-collection'):
+            if self.num_workers > 1:
+                busy_time = self._collect_repos_concurrently(repos)
+            else:
+                busy_time = sum(self.collect_repo(repo) for repo in repos)
+
+        wall_time = time.perf_counter() - started
+        speedup = busy_time / wall_time if wall_time > 0 else 1.0
+        logging.info(f"Collection finished with {self.num_workers} worker(s) in {wall_time:.1f}s "
+                     f"(repository processing time {busy_time:.1f}s, speedup over sequential {speedup:.2f}x).")
 
     def __enter__(self):
         print("Entering context")
@@ -348,61 +741,50 @@ class CommitCollector:
 
     def close(self):
         self.g.close()
+        self.pr_cache.flush()
+        self.issue_resolver.flush()
+        log_github_client_stats()
+        self.issue_resolver.log_stats()
+        if self.issue_prefilter is not None:
+            self.issue_prefilter.log_stats()
+        if self.model_cascade is not None:
+            self.model_cascade.log_stats()
+        log_llm_telemetry()
     
     def is_source_of_perf_message(self, repo_name: str, commit_hash: str) -> bool:
         repo = self.g.get_repo(repo_name)
         commit = repo.get_commit(commit_hash)
         msg = commit.commit.message or ""
 
-        issue_refs = self.extract_fixed_issues(msg, repo)
-
-        if issue_refs:
-            for number in issue_refs:
-                try:
-                    if self.is_performance_issue(repo, commit, repo.get_issue(number)):
-                        return True
-
-                except UnknownObjectException:
-                    continue
-        
-        return False
+        is_source = self._first_performance_issue(repo, commit, sorted(self.extract_fixed_issues(msg, repo))) is not None
+        self.issue_resolver.flush(repo.full_name)
+        return is_source
     
     def get_pr_before_after_commits(self, repo_name: str, commit_hash: str) -> Optional[tuple[int, tuple[str, str]]]:
         repo = self.g.get_repo(repo_name)
         commit = repo.get_commit(commit_hash)
-        pulls = commit.get_pulls()
-
-        relevant_pr = None
-        for pr in pulls:
-            # Extract issues fixed by the PR from its body and title
-            pr_message = (pr.title or "") + "\n" + (pr.body or "")
-            pr_issue_refs = self.extract_fixed_issues(pr_message, repo)
-            
-            if pr_issue_refs:
-                for number in pr_issue_refs:
-                    try:
-                        if self.is_performance_issue(repo, commit, repo.get_issue(number)):
-                            relevant_pr = pr
-                            break
-                    except UnknownObjectException:
-                        continue
-
-            if relevant_pr is not None:
-                break
-
-        if relevant_pr is None:
-            return None
-
-        return (relevant_pr.number, (relevant_pr.base.sha, relevant_pr.head.sha))
+        pr_numbers, pulls = self._linked_pull_request_numbers(repo, commit)
+        _, results = self._evaluate_pull_requests(repo, commit, pr_numbers, pulls)
+        self.pr_cache.flush(repo.full_name)
+        self.issue_resolver.flush(repo.full_name)
+
+        for pr_number in pr_numbers:
+            result = results.get(pr_number)
+            if result is not None and result['issue'] is not None:
+                return (pr_number, (result['base'], result['head']))
+        return None
 
     def get_issue_number_from_commit(self, repo_name: str, commit_hash: str) -> Optional[int]:
         repo = self.g.get_repo(repo_name)
         commit = repo.get_commit(commit_hash)
         issue_number = self.fixed_performance_issue(repo, commit)
+        self.pr_cache.flush(repo.full_name)
+        self.issue_resolver.flush(repo.full_name)
         return issue_number
     
     def get_commit_linked_prs(self, repo_name: str, commit_hash: str) -> list[int]:
         repo = self.g.get_repo(repo_name)
         commit = repo.get_commit(commit_hash)
-        pulls = commit.get_pulls()
-        return [pr.number for pr in pulls]
\ No newline at end of file
+        pr_numbers, _ = self._linked_pull_request_numbers(repo, commit)
+        self.pr_cache.flush(repo.full_name)
+        return pr_numbers
\ No newline at end of file
@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Iterator
+from github import Github
+
+HISTORY_PAGE_SIZE = 100 # Maximum page size allowed by the GraphQL API
+
+HISTORY_QUERY = """
+query($owner: String!, $name: String!, $since: GitTimestamp, $cursor: String, $pageSize: Int!) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          history(first: $pageSize, since: $since, after: $cursor) {
+            pageInfo { hasNextPage endCursor }
+            nodes {
+              oid
+              message
+              committedDate
+              changedFilesIfAvailable
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class HistoryCommit:
+    """Lightweight view of a commit as returned by one page of the GraphQL history query."""
+    def __init__(self, sha: str, message: str, committed_date: str, changed_files: int | None):
+        self.sha = sha
+        self.message = message
+        self.committed_date = committed_date
+        # None if GitHub could not compute the number of changed files (e.g., due to a timeout)
+        self.changed_files = changed_files
+
+
+class CommitHistoryFetcher:
+    """
+    Page through the default-branch history of a repository with one GraphQL query per 100 commits.
+
+    The GraphQL API does not expose the changed file paths of a commit, but it does expose the number
+    of changed files, so the max-files filter can be applied locally before any per-commit REST request.
+    """
+    def __init__(self, g: Github):
+        self.g = g
+        self.requests_issued = 0
+
+    def iter_commits(self, repo_full_name: str, since: datetime) -> Iterator[HistoryCommit]:
+        owner, name = repo_full_name.split('/', 1)
+        variables = {
+            'owner': owner,
+            'name': name,
+            'since': since.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'cursor': None,
+            'pageSize': HISTORY_PAGE_SIZE,
+        }
+
+        while True:
+            _, data = self.g.requester.graphql_query(HISTORY_QUERY, variables)
+            self.requests_issued += 1
+
+            repository = (data.get('data') or {}).get('repository') or {}
+            branch = repository.get('defaultBranchRef')
+            if branch is None:
+                # Empty repository
+                return
+            history = branch['target']['history']
+
+            for node in history['nodes']:
+                yield HistoryCommit(
+                    sha=node['oid'],
+                    message=node['message'],
+                    committed_date=node['committedDate'],
+                    changed_files=node.get('changedFilesIfAvailable'),
+                )
+
+            if not history['pageInfo']['hasNextPage']:
+                return
+            variables['cursor'] = history['pageInfo']['endCursor']
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from tempfile import NamedTemporaryFile
+
+# Objects addressed by a full commit SHA never change, so they can be served without revalidation.
+IMMUTABLE_PATH_PATTERNS = [
+    re.compile(r'^/repos/[^/]+/[^/]+/commits/[0-9a-f]{40}$'),
+    re.compile(r'^/repos/[^/]+/[^/]+/git/(?:commits|trees|blobs)/[0-9a-f]{40}$'),
+]
+
+# Headers of a 304 response that describe the current request rather than the cached resource
+FRESH_HEADER_PREFIXES = ('x-ratelimit-', 'date', 'x-github-request-id')
+
+
+class CachedResponse:
+    """Mimics the response objects PyGithub reads (status, getheaders(), read()) for a cached entry."""
+    def __init__(self, entry: dict, fresh_headers: dict | None = None):
+        self.status = entry['status']
+        self.headers = dict(entry['headers'])
+        for key, value in (fresh_headers or {}).items():
+            if key.lower().startswith(FRESH_HEADER_PREFIXES):
+                self.headers[key.lower()] = value
+        self._body = entry['body']
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self._body
+
+
+class HttpCache:
+    """
+    Persistent on-disk cache for GET responses of the GitHub API.
+
+    Entries keep the ETag/Last-Modified validators of the response. A cached URL is revalidated with
+    a conditional request, and a 304 answer (which GitHub does not count against the rate limit) is
+    served from disk. Responses for immutable, SHA-addressed objects are served without any request.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def key(host: str, port: int, url: str, headers: dict) -> str:
+        # The token is deliberately not part of the key, all tokens see the same public data
+        accept = next((v for k, v in headers.items() if k.lower() == 'accept'), '')
+        return hashlib.sha256(f"{host}:{port}{url}|{accept}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def is_immutable(url: str) -> bool:
+        path = url.split('?', 1)[0]
+        return any(pattern.match(path) for pattern in IMMUTABLE_PATH_PATTERNS)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> dict | None:
+        try:
+            with open(self._entry_path(key), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, url: str, status: int, headers: dict, body: str) -> None:
+        headers = {k.lower(): v for k, v in headers.items()}
+        if 'etag' not in headers and 'last-modified' not in headers and not self.is_immutable(url):
+            # Nothing to revalidate with
+            return
+        entry = {
+            'url': url,
+            'status': status,
+            'headers': headers,
+            'body': body,
+            'stored_at': time.time(),
+        }
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = NamedTemporaryFile(delete=False, dir=os.path.dirname(path), mode='w', suffix='.tmp')
+        try:
+            json.dump(entry, tmp_file)
+        finally:
+            tmp_file.close()
+        os.replace(tmp_file.name, path)
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        headers = {}
+        if 'etag' in entry['headers']:
+            headers['If-None-Match'] = entry['headers']['etag']
+        if 'last-modified' in entry['headers']:
+            headers['If-Modified-Since'] = entry['headers']['last-modified']
+        return headers
+
+    def record(self, event: str) -> None:
+        with self._stats_lock:
+            self.stats[event] += 1
+
+    def summary(self) -> str:
+        with self._stats_lock:
+            hits, revalidated = self.stats['hits'], self.stats['revalidations']
+            misses, updated = self.stats['misses'], self.stats['updates']
+        total = hits + revalidated + misses + updated
+        served = hits + revalidated
+        ratio = served / total * 100 if total else 0.0
+        return (f"GitHub HTTP cache: {total} GET requests, {hits} hits, {revalidated} revalidations (304), "
+                f"{misses} misses, {updated} stale entries refreshed ({ratio:.1f}% served from cache).")
+
+    def log_stats(self) -> None:
+        logging.info(self.summary())
@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import Counter
+from src.gh.issue_resolver import ResolvedIssue
+
+YES, NO, ESCALATE = 'yes', 'no', 'escalate'
+
+# (pattern, weight) pairs matched against the lower-cased issue title and body. Matches in the title count twice.
+KEYWORD_WEIGHTS = [
+    (r'\bperformance\b|\bperf\b', 2.0),
+    (r'\bslow(er|ness|ly|s)?\b|\bsluggish\b|takes? (too|very) long', 2.0),
+    (r'\bspeed ?up\b|\bfaster\b|\bquicker\b', 2.0),
+    (r'\blatency\b|\bthroughput\b|\bops/s\b|\bqps\b', 1.5),
+    (r'\boptimi[sz](e|ed|es|ing|ation)\b|\binefficien(t|cy)\b', 1.5),
+    (r'\bcpu\b|\bhot ?(path|spot)\b|\bbottleneck\b', 1.5),
+    (r'\bquadratic\b|o\(n\^?2\)|o\(n\s*\*\s*n\)|\bexponential time\b', 2.0),
+    (r'\bjmh\b|\bbenchmarks?\b|\bprofil(e|er|ing)\b|\bflame ?graph\b', 1.5),
+    (r'\bexecution time\b|\bresponse time\b|\bruntime overhead\b|\boverhead\b', 1.0),
+    (r'\ballocations?\b|\bgc (pressure|pauses?)\b|\bcontention\b', 1.0),
+    (r'\btypos?\b|\bspelling\b|\bgrammar\b', -3.0),
+    (r'\bdocs?\b|\bdocumentation\b|\bjavadoc\b|\breadme\b', -2.0),
+    (r'\bnullpointerexception\b|\bnpe\b', -2.5),
+    (r'\bexception\b|\bcrash(es|ed)?\b|\bstack ?trace\b|\berror message\b', -1.0),
+    (r'\b(wrong|incorrect|invalid) (result|value|output|behaviou?r)\b', -1.5),
+    (r'\btranslations?\b|\bi18n\b|\blocali[sz]ation\b', -2.0),
+    (r'\b(bump|upgrade|update) (dependency|dependencies|version)\b|\bdependabot\b', -2.0),
+    (r'\bsecurity\b|\bcve-\d+', -1.5),
+    (r'\bflaky tests?\b|\btest failures?\b', -1.5),
+]
+
+# Issue labels, compared lower-cased
+LABEL_WEIGHTS = {
+    'performance': 4.0,
+    'perf': 4.0,
+    'type: performance': 4.0,
+    'optimization': 3.0,
+    'documentation': -3.0,
+    'docs': -3.0,
+    'type: documentation': -3.0,
+    'dependencies': -3.0,
+    'good first issue': -0.5,
+}
+
+
+class IssuePrefilter:
+    """
+    Cheap first stage of the performance-issue classification, run before the LLM.
+
+    An issue is scored from weighted keywords in its title and body and from its labels. Scores at
+    or above positive-threshold are accepted and scores at or below negative-threshold are rejected
+    without an LLM request; everything in between is escalated. A deterministic sample of the local
+    decisions (audit-rate) is escalated as well, so that the agreement with the LLM can be measured.
+    """
+
+    def __init__(self, positive_threshold: float, negative_threshold: float, audit_rate: float):
+        self.positive_threshold = positive_threshold
+        self.negative_threshold = negative_threshold
+        self.audit_rate = audit_rate
+        self.keywords = [(re.compile(pattern), weight) for pattern, weight in KEYWORD_WEIGHTS]
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def score(self, title: str, body: str, labels: list[str]) -> float:
+        title, body = (title or "").lower(), (body or "").lower()
+        score = 0.0
+        for pattern, weight in self.keywords:
+            if pattern.search(title):
+                score += 2 * weight
+            elif pattern.search(body):
+                score += weight
+        score += sum(LABEL_WEIGHTS.get(label.lower(), 0.0) for label in labels)
+        return score
+
+    def local_decision(self, score: float) -> str:
+        if score >= self.positive_threshold:
+            return YES
+        if score <= self.negative_threshold:
+            return NO
+        return ESCALATE
+
+    def _is_audited(self, repo_full_name: str, number: int) -> bool:
+        # Hash-based, so the same issues are audited in every run and their LLM answers come from the cache
+        digest = hashlib.md5(f"{repo_full_name}#{number}".encode('utf-8')).hexdigest()
+        return int(digest[:8], 16) / 0xFFFFFFFF < self.audit_rate
+
+    def decide(self, repo_full_name: str, issue: ResolvedIssue) -> tuple[str, bool]:
+        """
+        Returns:
+            The local decision (yes, no or escalate), and whether the issue must be sent to the LLM,
+            which is the case for escalated and audited issues
+        """
+        decision = self.local_decision(self.score(issue.title, issue.body, issue.labels))
+        audited = decision != ESCALATE and self._is_audited(repo_full_name, issue.number)
+        with self._lock:
+            self.stats[decision] += 1
+            if audited:
+                self.stats['audited'] += 1
+        return decision, decision == ESCALATE or audited
+
+    def record_llm_verdict(self, decision: str, llm_verdict: bool) -> None:
+        """Record the LLM answer for an audited local decision, to measure their agreement."""
+        if decision == ESCALATE:
+            return
+        with self._lock:
+            agrees = (decision == YES) == llm_verdict
+            self.stats[f"{decision}_{'agree' if agrees else 'disagree'}"] += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            total = self.stats[YES] + self.stats[NO] + self.stats[ESCALATE]
+            if total == 0:
+                return "Issue prefilter: no issues classified."
+            escalation_rate = 100.0 * self.stats[ESCALATE] / total
+            agreement = []
+            for decision in (YES, NO):
+                audited = self.stats[f'{decision}_agree'] + self.stats[f'{decision}_disagree']
+                if audited:
+                    agreement.append(f"{decision} {100.0 * self.stats[f'{decision}_agree'] / audited:.1f}% of {audited}")
+            return (f"Issue prefilter: {total} issues, {self.stats[YES]} accepted and {self.stats[NO]} rejected locally, "
+                    f"{self.stats[ESCALATE]} escalated ({escalation_rate:.1f}%); agreement with the LLM on audited "
+                    f"local decisions: {', '.join(agreement) if agreement else 'none audited'}.")
+
+    def log_stats(self) -> None:
+        logging.info(self.summary())
@@ -0,0 +1,158 @@
+import re
+from typing import Callable
+
+from src.gh.issue_prefilter import KEYWORD_WEIGHTS
+from src.llm.tokens import count_exact_tokens, fits_in_tokens, truncate_to_tokens
+
+OMITTED = "[...]"
+# Paragraphs kept first, whatever their content
+LEADING_PARAGRAPHS = 2
+# Code and log blocks longer than this are cut before paragraphs are selected
+CODE_BLOCK_MAX_TOKENS = 200
+CODE_HEAD_LINES = 5
+TITLE_MAX_TOKENS = 100
+# Share of the available tokens reserved for the commit message when both texts are too long
+MESSAGE_SHARE = 0.25
+
+PERFORMANCE_PATTERN = re.compile('|'.join(f'(?:{pattern})' for pattern, weight in KEYWORD_WEIGHTS if weight > 0))
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+# Stack trace frames, log records and indented code
+CODE_LINE_PATTERN = re.compile(r'^(\s*at [\w$.<>/]+\(.*\)\s*$|\s*\.\.\. \d+ more|\s*Caused by:|'
+                               r'\s*\[?\d{4}-\d\d-\d\d[ T]\d\d:\d\d|\s*\[?(INFO|WARN|WARNING|ERROR|DEBUG|TRACE)\]?\s|'
+                               r'    |\t)')
+
+
+def split_blocks(text: str) -> list[tuple[str, bool]]:
+    """The paragraphs and code blocks of a markdown text, in order, as (block, is_code) pairs."""
+    blocks = []
+    lines: list[str] = []
+    in_fence = False
+
+    def close_block(is_code: bool | None = None):
+        if lines:
+            if is_code is None:
+                is_code = sum(bool(CODE_LINE_PATTERN.match(line)) for line in lines) * 2 > len(lines)
+            blocks.append(('\n'.join(lines), is_code))
+            lines.clear()
+
+    for line in text.splitlines():
+        if FENCE_PATTERN.match(line):
+            if in_fence:
+                lines.append(line)
+                close_block(True)
+            else:
+                close_block()
+                lines.append(line)
+            in_fence = not in_fence
+        elif in_fence:
+            lines.append(line)
+        elif not line.strip():
+            close_block()
+        else:
+            lines.append(line)
+    close_block(True if in_fence else None)
+    return blocks
+
+
+def shorten_code_block(model: str, block: str, max_tokens: int) -> str:
+    """The first lines of a code or log block within max_tokens, and its performance-relevant lines."""
+    lines = block.split('\n')
+    fenced = len(lines) > 1 and FENCE_PATTERN.match(lines[0]) and FENCE_PATTERN.match(lines[-1])
+    body = lines[1:-1] if fenced else lines
+    budget = max_tokens - count_exact_tokens(model, f"{OMITTED}\n") * 2
+    if fenced:
+        budget -= count_exact_tokens(model, f"{lines[0]}\n{lines[-1]}\n")
+
+    # The head (exception messages, the first records) is kept first, then the lines with performance keywords,
+    # then the following lines
+    head = list(range(min(len(body), CODE_HEAD_LINES)))
+    relevant = [i for i, line in enumerate(body) if i >= CODE_HEAD_LINES and PERFORMANCE_PATTERN.search(line.lower())]
+    order = head + relevant + [i for i in range(CODE_HEAD_LINES, len(body)) if i not in relevant]
+    kept = set()
+    for i in order:
+        cost = count_exact_tokens(model, body[i] + '\n')
+        if cost <= budget:
+            kept.add(i)
+            budget -= cost
+    shortened = _join_with_gaps([(i, body[i]) for i in sorted(kept)], len(body), '\n')
+    return f"{lines[0]}\n{shortened}\n{lines[-1]}" if fenced else shortened
+
+
+def _join_with_gaps(parts: list[tuple[int, str]], count: int, separator: str) -> str:
+    """Join the kept (index, text) parts of a sequence of count parts, with a marker where parts are left out."""
+    joined, previous = [], -1
+    for i, text in parts:
+        if i > previous + 1:
+            joined.append(OMITTED)
+        joined.append(text)
+        previous = i
+    if previous < count - 1:
+        joined.append(OMITTED)
+    return separator.join(joined)
+
+
+def fit_text(model: str, text: str, max_tokens: int) -> str:
+    """
+    The text unchanged if it fits in max_tokens, otherwise a deterministic excerpt of it: long code and log
+    blocks are cut, then the leading paragraphs, the paragraphs with performance keywords and the other
+    paragraphs are kept, in that priority and in their original order, as long as they fit.
+    """
+    if fits_in_tokens(model, text, max_tokens):
+        return text
+
+    blocks = []
+    for block, is_code in split_blocks(text):
+        if is_code and count_exact_tokens(model, block) > CODE_BLOCK_MAX_TOKENS:
+            block = shorten_code_block(model, block, CODE_BLOCK_MAX_TOKENS)
+        blocks.append((block, is_code))
+
+    leading = [i for i, (_, is_code) in enumerate(blocks) if not is_code][:LEADING_PARAGRAPHS]
+    relevant = [i for i, (block, _) in enumerate(blocks) if i not in leading and PERFORMANCE_PATTERN.search(block.lower())]
+    others = [i for i in range(len(blocks)) if i not in leading and i not in relevant]
+
+    budget = max_tokens - count_exact_tokens(model, OMITTED)
+    separator = count_exact_tokens(model, f"\n\n{OMITTED}\n\n")
+    kept = set()
+    for i in leading + relevant + others:
+        # Every kept block may add a separator and a marker
+        cost = count_exact_tokens(model, blocks[i][0]) + separator
+        if cost <= budget:
+            kept.add(i)
+            budget -= cost
+        elif i in leading and budget > 2 * separator:
+            # A long leading paragraph is cut instead of left out
+            blocks[i] = (truncate_to_tokens(model, blocks[i][0], budget - 2 * separator) + f" {OMITTED}", False)
+            kept.add(i)
+            budget -= count_exact_tokens(model, blocks[i][0]) + separator
+
+    excerpt = _join_with_gaps([(i, blocks[i][0]) for i in sorted(kept)], len(blocks), '\n\n')
+    if not kept or count_exact_tokens(model, excerpt) > max_tokens:
+        # A single long paragraph, or the token counts of the blocks do not add up exactly
+        marker = f"\n{OMITTED}"
+        return truncate_to_tokens(model, text if not kept else excerpt, max_tokens - count_exact_tokens(model, marker)) + marker
+    return excerpt
+
+
+def render_within_budget(model: str, budget: int, render: Callable[[str, str, str], str],
+                         title: str, body: str, message) -> str:
+    """
+    Render an issue classification prompt from the issue title and body and the fixing commit message,
+    within budget tokens of the model. A prompt that fits is rendered from the unchanged texts, so its
+    hash is that of the prompt without a budget. Otherwise the title is capped, and the body and the
+    message share the remaining tokens, the message getting at least its MESSAGE_SHARE. Prompts are only
+    cut with the tiktoken encoding of the model, never with an estimate, so the cut prompt and its hash do
+    not depend on whether the encoding could be downloaded: without it, a prompt to cut is an error.
+    """
+    prompt = render(title, body, message)
+    if fits_in_tokens(model, prompt, budget):
+        return prompt
+
+    message = str(message)
+    available = budget - count_exact_tokens(model, render("", "", ""))
+    title = fit_text(model, title, min(TITLE_MAX_TOKENS, available // 4))
+    available -= count_exact_tokens(model, title)
+
+    body = fit_text(model, body, available - min(count_exact_tokens(model, message), int(available * MESSAGE_SHARE)))
+    # Tokens the body does not use go to the message
+    message = fit_text(model, message, available - count_exact_tokens(model, body))
+    return render(title, body, message)
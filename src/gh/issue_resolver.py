@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict
+from tempfile import NamedTemporaryFile
+from typing import Iterable
+from github import Github
+from github.GithubException import GithubException
+
+RESOLVE_BATCH_SIZE = 50 # Aliased issueOrPullRequest lookups per GraphQL query
+
+ISSUE_FIELDS = """
+      __typename
+      ... on Issue { title body labels(first: 20) { nodes { name } } }
+      ... on PullRequest { title body labels(first: 20) { nodes { name } } }
+"""
+
+
+class ResolvedIssue:
+    """An issue or pull request number of a repository, resolved with the fields needed to classify it."""
+    def __init__(self, number: int, is_pull_request: bool, title: str, body: str, labels: list[str]):
+        self.number = number
+        self.is_pull_request = is_pull_request
+        self.title = title
+        self.body = body
+        self.labels = labels
+
+    def to_json(self) -> dict:
+        return {'is_pull_request': self.is_pull_request, 'title': self.title, 'body': self.body, 'labels': self.labels}
+
+    @staticmethod
+    def from_json(number: int, data: dict) -> 'ResolvedIssue':
+        return ResolvedIssue(number, data['is_pull_request'], data['title'], data['body'], data['labels'])
+
+
+class IssueResolver:
+    """
+    Resolve the issue numbers referenced by commits and pull requests of a repository.
+
+    Numbers that are not cached yet are resolved together with one aliased ``issueOrPullRequest``
+    GraphQL query per 50 numbers, which also returns the title, body and labels used by the LLM
+    classification. Answers, including numbers that do not exist, are kept in a persistent LRU per
+    repository (one JSON file each), so issues referenced again by later commits, their pull requests
+    or a later run cost no request. Changes are written when a repository is flushed.
+    """
+
+    def __init__(self, g: Github, cache_dir: str, max_entries_per_repo: int):
+        self.g = g
+        self.cache_dir = cache_dir
+        self.max_entries_per_repo = max_entries_per_repo
+        self.stats = Counter()
+        self._repos: dict[str, OrderedDict] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _cache_path(self, repo_full_name: str) -> str:
+        return os.path.join(self.cache_dir, repo_full_name.replace('/', '__') + '.json')
+
+    def _repo_cache(self, repo_full_name: str) -> OrderedDict:
+        """The LRU of a repository, least recently used first. Must be called with the lock held."""
+        entries = self._repos.get(repo_full_name)
+        if entries is None:
+            entries = OrderedDict()
+            path = self._cache_path(repo_full_name)
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    for number, data in json.load(f):
+                        entries[int(number)] = data
+            self._repos[repo_full_name] = entries
+        return entries
+
+    def _save(self, repo_full_name: str) -> None:
+        """Persist the LRU of a repository. Must be called with the lock held."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # A list of pairs keeps the recency order across runs
+        entries = list(self._repos[repo_full_name].items())
+        tmp_file = NamedTemporaryFile(delete=False, dir=self.cache_dir, mode='w', suffix='.tmp')
+        try:
+            json.dump(entries, tmp_file)
+        finally:
+            tmp_file.close()
+        os.replace(tmp_file.name, self._cache_path(repo_full_name))
+
+    def _query(self, repo_full_name: str, numbers: list[int]) -> dict[int, dict | None]:
+        owner, name = repo_full_name.split('/', 1)
+        fields = '\n'.join(f"  i{n}: issueOrPullRequest(number: {n}) {{{ISSUE_FIELDS}  }}" for n in numbers)
+        query = f"query($owner: String!, $name: String!) {{\n repository(owner: $owner, name: $name) {{\n{fields}\n }}\n}}"
+        try:
+            _, data = self.g.requester.graphql_query(query, {'owner': owner, 'name': name})
+        except GithubException as e:
+            # Numbers that do not exist come back as NOT_FOUND errors next to the data of the others
+            data = e.data if isinstance(e.data, dict) else {}
+            if not data.get('data'):
+                raise
+        self.stats['requests'] += 1
+
+        # Aliases GitHub reported as not existing; other errors (FORBIDDEN, RESOURCE_LIMITS, timeouts) are transient
+        not_found = {error['path'][-1] for error in data.get('errors') or []
+                     if error.get('type') == 'NOT_FOUND' and error.get('path')}
+        repository = (data.get('data') or {}).get('repository') or {}
+        resolved = {}
+        for n in numbers:
+            node = repository.get(f"i{n}")
+            if node is None:
+                if f"i{n}" in not_found:
+                    resolved[n] = None
+                # Otherwise left out, so a later call retries it
+                continue
+            resolved[n] = ResolvedIssue(
+                number=n,
+                is_pull_request=node['__typename'] == 'PullRequest',
+                title=node.get('title') or "",
+                body=node.get('body') or "",
+                labels=[label['name'] for label in ((node.get('labels') or {}).get('nodes') or [])],
+            ).to_json()
+        return resolved
+
+    def resolve(self, repo_full_name: str, numbers: Iterable[int]) -> dict[int, ResolvedIssue | None]:
+        """Resolve the given numbers of a repository; numbers that do not exist map to None."""
+        numbers = list(dict.fromkeys(n for n in numbers if n > 0))
+        with self._lock:
+            entries = self._repo_cache(repo_full_name)
+            missing = [n for n in numbers if n not in entries]
+            self.stats['hits'] += len(numbers) - len(missing)
+            self.stats['misses'] += len(missing)
+
+        fetched = {}
+        for i in range(0, len(missing), RESOLVE_BATCH_SIZE):
+            batch = missing[i:i + RESOLVE_BATCH_SIZE]
+            try:
+                fetched.update(self._query(repo_full_name, batch))
+            except Exception as e:
+                # Left unresolved and not cached, so a later call retries them
+                logging.warning(f"Error resolving issues {batch} in {repo_full_name}: {e}")
+
+        out = {}
+        with self._lock:
+            entries = self._repo_cache(repo_full_name)
+            entries.update(fetched)
+            for n in numbers:
+                if n in entries:
+                    entries.move_to_end(n)
+                    out[n] = ResolvedIssue.from_json(n, entries[n]) if entries[n] is not None else None
+                else:
+                    out[n] = None
+            while len(entries) > self.max_entries_per_repo:
+                entries.popitem(last=False)
+            if fetched:
+                self._dirty.add(repo_full_name)
+        return out
+
+    def flush(self, repo_full_name: str | None = None) -> None:
+        """Write the changes of one repository, or of all repositories if none is given."""
+        with self._lock:
+            for name in [repo_full_name] if repo_full_name is not None else list(self._dirty):
+                if name in self._dirty:
+                    self._save(name)
+                    self._dirty.discard(name)
+
+    def get(self, repo_full_name: str, number: int) -> ResolvedIssue | None:
+        return self.resolve(repo_full_name, [number])[number]
+
+    def summary(self) -> str:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            hit_rate = 100.0 * self.stats['hits'] / lookups if lookups else 0.0
+            return (f"Issue resolver: {lookups} lookups, {hit_rate:.1f}% from cache, "
+                    f"{self.stats['requests']} GraphQL requests.")
+
+    def log_stats(self) -> None:
+        logging.info(self.summary())
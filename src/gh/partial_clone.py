@@ -0,0 +1,107 @@
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from typing import Iterator
+import src.config as conf
+
+COMMIT_MARKER = '\x00' # Written by git for the %x00 placeholder of the log format
+
+
+class LocalCommit:
+    """A commit read from a local clone, with the paths it changes relative to its first parent."""
+    def __init__(self, sha: str, committed_date: datetime, filenames: list[str]):
+        self.sha = sha
+        self.committed_date = committed_date
+        self.filenames = filenames
+
+
+class PartialCloneHistory:
+    """
+    Read the history of a repository from a blobless partial clone (``--filter=blob:none``).
+
+    Trees and commits are enough to list the files changed by every commit, so a single
+    ``git log --name-status`` pass replaces one or more API requests per commit. Renames are not
+    detected, as that would require fetching blobs. Clones are kept and updated incrementally.
+
+    git never prompts for credentials: a renamed, private or removed repository fails with
+    ``CalledProcessError`` instead of blocking, and a clone or fetch taking longer than the timeout
+    raises ``TimeoutExpired``.
+    """
+
+    def __init__(self, clone_dir: str, timeout: float | None = conf.perf_commit['prefilter-git-timeout']):
+        self.clone_dir = clone_dir
+        self.timeout = timeout
+
+    @staticmethod
+    def _env() -> dict[str, str]:
+        return {**os.environ, 'GIT_TERMINAL_PROMPT': '0', 'GCM_INTERACTIVE': 'never'}
+
+    def _run_git(self, cmd: list[str], path: str) -> None:
+        try:
+            subprocess.run(cmd, cwd=path, env=self._env(), capture_output=True, text=True, check=True,
+                           stdin=subprocess.DEVNULL, timeout=self.timeout)
+        except subprocess.CalledProcessError as e:
+            sys.stderr.write(e.stderr or f"{e}\n")
+            raise
+
+    def _clone_path(self, repo_full_name: str) -> str:
+        return os.path.join(self.clone_dir, repo_full_name.replace('/', '__') + '.git')
+
+    def sync(self, repo_full_name: str, branch: str) -> str:
+        """Create or update the partial clone of a repository's default branch and return its path."""
+        clone_path = self._clone_path(repo_full_name)
+        if not os.path.exists(clone_path):
+            os.makedirs(self.clone_dir, exist_ok=True)
+            logging.info(f"Creating partial clone of {repo_full_name} in {clone_path}")
+            try:
+                self._run_git(["git", "clone", "--quiet", "--bare", "--filter=blob:none", "--single-branch",
+                               "--branch", branch, f"https://github.com/{repo_full_name}.git", clone_path], self.clone_dir)
+            except subprocess.SubprocessError:
+                # A clone killed by the timeout must not be taken for a complete one by the next fetch
+                shutil.rmtree(clone_path, ignore_errors=True)
+                raise
+        else:
+            self._run_git(["git", "fetch", "--quiet", "--filter=blob:none", "origin",
+                           f"+refs/heads/{branch}:refs/heads/{branch}"], clone_path)
+        return clone_path
+
+    def iter_commits(self, repo_full_name: str, branch: str, since: datetime) -> Iterator[LocalCommit]:
+        """
+        Yield the commits of the branch committed since the given date, newest first. The output of git log
+        is read as it is written, the history of a large repository is never held in memory at once.
+        """
+        clone_path = self.sync(repo_full_name, branch)
+        cmd = ["git", "-c", "core.quotepath=off", "log", f"refs/heads/{branch}",
+               f"--since={since.isoformat()}", "--no-renames", "--diff-merges=first-parent",
+               "--name-status", "--format=%x00%H %cI"]
+        with tempfile.TemporaryFile(mode='w+') as stderr, \
+                subprocess.Popen(cmd, cwd=clone_path, env=self._env(), stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.PIPE, stderr=stderr, text=True) as process:
+            try:
+                header, filenames = None, []
+                for line in process.stdout:
+                    if line.startswith(COMMIT_MARKER):
+                        if header is not None:
+                            yield self._commit(header, filenames)
+                        header, filenames = line[len(COMMIT_MARKER):].strip(), []
+                    elif '\t' in line:
+                        # Lines look like 'M\tpath'; without rename detection there is a single path per line
+                        filenames.append(line.rstrip('\n').split('\t', 1)[1])
+                if header is not None:
+                    yield self._commit(header, filenames)
+            finally:
+                # Also when the caller stops early
+                if process.poll() is None:
+                    process.kill()
+            if process.wait() != 0:
+                stderr.seek(0)
+                raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr.read())
+
+    @staticmethod
+    def _commit(header: str, filenames: list[str]) -> LocalCommit:
+        sha, committed_date = header.split(' ', 1)
+        return LocalCommit(sha, datetime.fromisoformat(committed_date), filenames)
@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+from tempfile import NamedTemporaryFile
+
+# Files of an older format are discarded, version 1 linked commits to only some of their pull requests
+CACHE_VERSION = 2
+
+
+class PullRequestCache:
+    """
+    Persistent results of the pull-request stage of the collection, one JSON file per repository.
+
+    It records, per merged pull request number, the performance issue the pull request fixes (or None) and
+    its base and head commits, and per commit SHA, the numbers of all the pull requests it belongs to, as
+    listed by GitHub. Every commit of an evaluated pull request reuses its result instead of parsing and
+    classifying the same pull request again. Changes are written when a repository is flushed.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._repos: dict[str, dict] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _cache_path(self, repo_full_name: str) -> str:
+        return os.path.join(self.cache_dir, repo_full_name.replace('/', '__') + '.json')
+
+    def _repo_cache(self, repo_full_name: str) -> dict:
+        """Must be called with the lock held."""
+        entries = self._repos.get(repo_full_name)
+        if entries is None:
+            entries = {'version': CACHE_VERSION, 'pulls': {}, 'commits': {}}
+            path = self._cache_path(repo_full_name)
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    saved = json.load(f)
+                if saved.get('version') == CACHE_VERSION:
+                    entries.update(saved)
+            self._repos[repo_full_name] = entries
+        return entries
+
+    def _save(self, repo_full_name: str) -> None:
+        """Must be called with the lock held."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = NamedTemporaryFile(delete=False, dir=self.cache_dir, mode='w', suffix='.tmp')
+        try:
+            json.dump(self._repos[repo_full_name], tmp_file)
+        finally:
+            tmp_file.close()
+        os.replace(tmp_file.name, self._cache_path(repo_full_name))
+
+    def commit_pulls(self, repo_full_name: str, sha: str) -> list[int] | None:
+        """Numbers of the pull requests a commit belongs to, or None if they were not listed yet."""
+        with self._lock:
+            return self._repo_cache(repo_full_name)['commits'].get(sha)
+
+    def set_commit_pulls(self, repo_full_name: str, sha: str, numbers: list[int]) -> None:
+        with self._lock:
+            self._repo_cache(repo_full_name)['commits'][sha] = list(numbers)
+            self._dirty.add(repo_full_name)
+
+    def get_pull(self, repo_full_name: str, number: int) -> dict | None:
+        """The recorded result of a pull request: {'issue': int | None, 'base': sha, 'head': sha}."""
+        with self._lock:
+            # JSON object keys are strings
+            return self._repo_cache(repo_full_name)['pulls'].get(str(number))
+
+    def put_pull(self, repo_full_name: str, number: int, issue: int | None, base_sha: str, head_sha: str) -> None:
+        """
+        Record the result of a merged pull request. Its commits are not linked to it: the pull requests of a
+        commit are only known once they are all listed (see set_commit_pulls).
+        """
+        with self._lock:
+            self._repo_cache(repo_full_name)['pulls'][str(number)] = {'issue': issue, 'base': base_sha, 'head': head_sha}
+            self._dirty.add(repo_full_name)
+
+    def flush(self, repo_full_name: str | None = None) -> None:
+        """Write the changes of one repository, or of all repositories if none is given."""
+        with self._lock:
+            for name in [repo_full_name] if repo_full_name is not None else list(self._dirty):
+                if name in self._dirty:
+                    self._save(name)
+                    self._dirty.discard(name)
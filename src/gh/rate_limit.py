@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+# GitHub asks to wait at least a minute after a secondary rate limit without Retry-After
+SECONDARY_LIMIT_WAIT = 60.0
+
+
+def resource_for_url(url: str) -> str:
+    """The GitHub rate-limit bucket a request path is charged against."""
+    if url.startswith('/search/'):
+        return 'search'
+    if url.startswith('/graphql'):
+        return 'graphql'
+    return 'core'
+
+
+class _TokenState:
+    def __init__(self, token: str, rates: dict[str, float], burst: int):
+        self.token = token
+        self.requests = 0
+        # Token bucket per resource, refilled at the configured rate
+        self.bucket = {resource: float(burst) for resource in rates}
+        self.last_refill = {resource: time.monotonic() for resource in rates}
+        # Last quota reported by GitHub per resource: (remaining, reset epoch seconds)
+        self.quota: dict[str, tuple[int, float]] = {}
+        self.blocked_until = 0.0
+
+    def seconds_until_available(self, resource: str, rate: float, burst: int, now: float, epoch: float) -> float:
+        elapsed = now - self.last_refill[resource]
+        self.bucket[resource] = min(float(burst), self.bucket[resource] + elapsed * rate)
+        self.last_refill[resource] = now
+
+        wait = max(0.0, self.blocked_until - epoch)
+        remaining, reset = self.quota.get(resource, (1, 0.0))
+        if remaining <= 0 and reset > epoch:
+            wait = max(wait, reset - epoch)
+        if self.bucket[resource] < 1.0:
+            wait = max(wait, (1.0 - self.bucket[resource]) / rate)
+        return wait
+
+
+class RateLimitScheduler:
+    """
+    Paces GitHub requests across a pool of access tokens.
+
+    Each token has a token bucket per rate-limit resource (core, search, graphql) and remembers the
+    X-RateLimit-Remaining/Reset values and secondary-limit Retry-After (a minute without it) of its last
+    responses, so a token that hit a limit is skipped until it is lifted.
+    A request is sent with the token that can go first; if none can, the caller sleeps until the
+    earliest one becomes available and the time is accounted as idle wait.
+    """
+
+    def __init__(self, tokens: list[str], rates: dict[str, float], burst: int):
+        self.rates = rates
+        self.burst = burst
+        self.tokens = {token: _TokenState(token, rates, burst) for token in dict.fromkeys(tokens)}
+        self.idle_wait = 0.0
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def manages(self, token: str) -> bool:
+        return token in self.tokens
+
+    def acquire(self, resource: str) -> str:
+        """Block until some token may send a request for this resource and return it."""
+        while True:
+            with self._lock:
+                now, epoch = time.monotonic(), time.time()
+                waits = [(state.seconds_until_available(resource, self.rates[resource], self.burst, now, epoch), state)
+                         for state in self.tokens.values()]
+                wait, state = min(waits, key=lambda w: (w[0], -w[1].bucket[resource]))
+                if wait <= 0:
+                    state.bucket[resource] -= 1.0
+                    state.requests += 1
+                    self.stats[resource] += 1
+                    return state.token
+                self.idle_wait += wait
+            time.sleep(wait)
+
+    def seconds_until_available(self, resource: str) -> float:
+        """Seconds until some token may send a request for this resource, 0 if one may now."""
+        with self._lock:
+            now, epoch = time.monotonic(), time.time()
+            return min(state.seconds_until_available(resource, self.rates[resource], self.burst, now, epoch)
+                       for state in self.tokens.values())
+
+    def update(self, token: str, resource: str, status: int, headers, rate_limited: bool = False) -> None:
+        """
+        Record the rate-limit headers of a response sent with the given token. rate_limited tells a 403 of a
+        secondary rate limit without Retry-After from other errors, by its message.
+        """
+        headers = {k.lower(): v for k, v in headers.items()}
+        with self._lock:
+            state = self.tokens.get(token)
+            if state is None:
+                return
+            resource = headers.get('x-ratelimit-resource', resource)
+            if 'x-ratelimit-remaining' in headers and 'x-ratelimit-reset' in headers:
+                state.quota[resource] = (int(headers['x-ratelimit-remaining']), float(headers['x-ratelimit-reset']))
+            if status in (403, 429):
+                if 'retry-after' in headers:
+                    # Secondary rate limit
+                    state.blocked_until = time.time() + float(headers['retry-after'])
+                    self.stats['secondary_limits'] += 1
+                elif state.quota.get(resource, (1, 0.0))[0] <= 0:
+                    self.stats['primary_limits'] += 1
+                elif status == 429 or rate_limited:
+                    state.blocked_until = time.time() + SECONDARY_LIMIT_WAIT
+                    self.stats['secondary_limits'] += 1
+
+    def record_idle_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.idle_wait += seconds
+
+    def summary(self) -> str:
+        with self._lock:
+            per_token = ', '.join(f"token{i}={state.requests}" for i, state in enumerate(self.tokens.values()))
+            return (f"GitHub rate-limit scheduler: {len(self.tokens)} token(s), requests core={self.stats['core']} "
+                    f"search={self.stats['search']} graphql={self.stats['graphql']} ({per_token}), "
+                    f"{self.stats['primary_limits']} primary and {self.stats['secondary_limits']} secondary limit hits, "
+                    f"idle wait {self.idle_wait:.1f}s (summed over workers).")
+
+    def log_stats(self) -> None:
+        logging.info(self.summary())
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from src.llm.invocation import Prompt, Response
+from src.llm.llm_adapter import LLMAdapter
+
+CONFIDENT_ANSWER_PATTERN = re.compile(r'^\W*(yes|no)\W+(\d{1,3})\b', re.IGNORECASE)
+
+
+def parse_confident_answer(res: Response) -> tuple[bool, int] | None:
+    """Parse an answer like 'yes 85' into (verdict, confidence), or None if it does not follow the format."""
+    match = CONFIDENT_ANSWER_PATTERN.match(res.first_content or "")
+    if match is None:
+        return None
+    return match.group(1).lower() == 'yes', min(int(match.group(2)), 100)
+
+
+class ModelCascade:
+    """
+    Yes/no classification that asks a cheap model first and escalates to a strong model only if needed.
+
+    The cheap model answers with a verdict and a confidence from 0 to 100. Answers that do not follow
+    that format or are less confident than min-confidence are escalated to the strong model, which gets
+    the original one-word prompt, so its cached answers stay valid. A deterministic sample of the
+    confident answers (audit-rate) is escalated as well to measure how often the two models disagree.
+    """
+
+    def __init__(self, cheap: LLMAdapter, strong: LLMAdapter, min_confidence: int, audit_rate: float):
+        self.cheap = cheap
+        self.strong = strong
+        self.min_confidence = min_confidence
+        self.audit_rate = audit_rate
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def _is_audited(self, key: str) -> bool:
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return int(digest[:8], 16) / 0xFFFFFFFF < self.audit_rate
+
+    def classify(self, keys: list[str], cheap_prompts: list[Prompt], strong_prompts: list[Prompt],
+                 is_yes) -> list[bool]:
+        """
+        Args:
+            keys: Stable identifiers of the items, used to pick the audited ones
+            cheap_prompts: Prompts asking for a 'yes/no confidence' answer
+            strong_prompts: Prompts for the strong model, answered by is_yes
+            is_yes: Maps a response of the strong model to a verdict
+
+        Returns:
+            The verdicts, in the order of the items
+        """
+        started = time.perf_counter()
+        cheap_answers = [parse_confident_answer(res) for res in self.cheap.get_responses(cheap_prompts)]
+
+        verdicts: list[bool | None] = [None] * len(keys)
+        escalated, audited = [], []
+        for i, answer in enumerate(cheap_answers):
+            if answer is None or answer[1] < self.min_confidence:
+                escalated.append(i)
+                continue
+            verdicts[i] = answer[0]
+            if self._is_audited(keys[i]):
+                audited.append(i)
+
+        to_strong = escalated + audited
+        strong_verdicts = [is_yes(res) for res in self.strong.get_responses([strong_prompts[i] for i in to_strong])]
+        with self._lock:
+            self.stats['items'] += len(keys)
+            self.stats['unparsable'] += sum(answer is None for answer in cheap_answers)
+            self.stats['escalated'] += len(escalated)
+            self.stats['audited'] += len(audited)
+            for i, verdict in zip(to_strong, strong_verdicts):
+                if verdicts[i] is not None:
+                    self.stats['audit_disagreements'] += verdicts[i] != verdict
+                else:
+                    verdicts[i] = verdict
+            self.stats['wall_seconds'] += time.perf_counter() - started
+        return verdicts
+
+    def summary(self) -> str:
+        with self._lock:
+            items = self.stats['items']
+            if items == 0:
+                return "Model cascade: no items classified."
+            escalation_rate = 100.0 * self.stats['escalated'] / items
+            # Audited items are sent to the strong model too
+            strong_rate = (self.stats['escalated'] + self.stats['audited']) / items
+            disagreement = (f"{100.0 * self.stats['audit_disagreements'] / self.stats['audited']:.1f}% of "
+                            f"{self.stats['audited']} audited answers" if self.stats['audited'] else "none audited")
+            report = (f"Model cascade {self.cheap.get_model()} -> {self.strong.get_model()}: {items} items, "
+                      f"{self.stats['escalated']} escalated ({escalation_rate:.1f}%, {self.stats['unparsable']} unparsable), "
+                      f"disagreement {disagreement}.")
+
+        # Savings per 1,000 items against sending every item to the strong model, from the measured API calls
+        cheap_seconds, strong_seconds = self.cheap.mean_call_seconds(), self.strong.mean_call_seconds()
+        if cheap_seconds is not None and strong_seconds is not None:
+            saved = strong_seconds - (cheap_seconds + strong_rate * strong_seconds)
+            report += f" Latency saved per 1,000 items: {1000 * saved:.0f}s (sequential)."
+        cheap_cost, strong_cost = self.cheap.mean_call_cost(), self.strong.mean_call_cost()
+        if cheap_cost is not None and strong_cost is not None:
+            saved = strong_cost - (cheap_cost + strong_rate * strong_cost)
+            report += f" Estimated cost saved per 1,000 items: ${1000 * saved:.4f}."
+        return report
+
+    def log_stats(self) -> None:
+        logging.info(self.summary())
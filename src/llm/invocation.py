@@ -28,7 +28,8 @@ class Prompt:
     def load_from_json(j):
         return Prompt([Prompt.Message.load_from_json(m) for m in j['messages']],
                       j['temp'],
-                      j['sample_size'])
+                      j['sample_size'],
+                      j.get('model', llm['default-model']))
 
 class Response:
     class Sample:
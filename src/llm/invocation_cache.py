@@ -0,0 +1,137 @@
+import json
+import os
+import re
+from tempfile import NamedTemporaryFile
+from typing import Iterator
+from src.llm.invocation_pack import InvocationPack
+
+LOOSE_ENTRY_NAME = re.compile(r'^(?P<hash>[0-9a-f]{32})-(?P<n>\d+)\.json$')
+
+
+class InvocationCache:
+    """
+    Content-addressed storage of LLM invocations.
+
+    An invocation is stored as ``{cache_dir}/{hash[:2]}/{hash}-{n}.json``, where hash is the prompt hash and n
+    counts the invocations saved for the same prompt. Lookups open the file directly instead of scanning the
+    directory. Files of the former flat layout (``{cache_dir}/{hash}-{n}.json``) are still found, and can be
+    moved into the shards with ``python -m scripts.migrate_llm_cache``.
+
+    With packed enabled, new invocations are appended to an ``InvocationPack`` in ``{cache_dir}/pack``
+    instead, and ``compact`` moves the loose files into it. An existing pack is always read.
+    """
+
+    def __init__(self, cache_dir: str, packed: bool = False):
+        self.cache_dir = cache_dir
+        self.packed = packed
+        pack_dir = os.path.join(cache_dir, 'pack')
+        self.pack = InvocationPack(pack_dir) if packed or os.path.isdir(pack_dir) else None
+
+    def shard_dir(self, prompt_hash: str) -> str:
+        return os.path.join(self.cache_dir, prompt_hash[:2])
+
+    def entry_path(self, prompt_hash: str, n: int) -> str:
+        return os.path.join(self.shard_dir(prompt_hash), f"{prompt_hash}-{n}.json")
+
+    def _flat_entry_path(self, prompt_hash: str, n: int) -> str:
+        return os.path.join(self.cache_dir, f"{prompt_hash}-{n}.json")
+
+    def load(self, prompt_hash: str) -> dict | None:
+        """The first invocation saved for the prompt, as JSON, or None."""
+        if self.pack is not None:
+            packed = self.pack.load(prompt_hash)
+            if packed is not None:
+                return json.loads(packed)
+        for path in (self.entry_path(prompt_hash, 0), self._flat_entry_path(prompt_hash, 0)):
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                continue
+        return None
+
+    def contains(self, prompt_hash: str) -> bool:
+        if self.pack is not None and self.pack.contains(prompt_hash):
+            return True
+        return os.path.exists(self.entry_path(prompt_hash, 0)) or os.path.exists(self._flat_entry_path(prompt_hash, 0))
+
+    def _loose_count(self, prompt_hash: str) -> int:
+        n = 0
+        while os.path.exists(self.entry_path(prompt_hash, n)) or os.path.exists(self._flat_entry_path(prompt_hash, n)):
+            n += 1
+        return n
+
+    def save(self, prompt_hash: str, serialized: str) -> str:
+        """Store one more invocation for the prompt and return where it was stored."""
+        if self.packed:
+            n = self.pack.append(prompt_hash, serialized, min_n=self._loose_count(prompt_hash))
+            return f"{self.pack.pack_dir}:{prompt_hash}-{n}"
+        shard_dir = self.shard_dir(prompt_hash)
+        os.makedirs(shard_dir, exist_ok=True)
+        tmp_file = NamedTemporaryFile(delete=False, dir=shard_dir, mode='w', suffix='.tmp')
+        try:
+            with tmp_file:
+                tmp_file.write(serialized)
+            n = 0
+            while True:
+                if not os.path.exists(self._flat_entry_path(prompt_hash, n)):
+                    path = self.entry_path(prompt_hash, n)
+                    try:
+                        # Fails if the entry exists, so concurrent writers never overwrite each other and
+                        # readers never see a partially written entry
+                        os.link(tmp_file.name, path)
+                        return path
+                    except FileExistsError:
+                        pass
+                n += 1
+        finally:
+            os.unlink(tmp_file.name)
+
+    def iter_loose_entries(self) -> Iterator[tuple[str, int, str]]:
+        """(hash, n, path) of every invocation stored as a file, in the flat or the sharded layout."""
+        for root, dirs, files in os.walk(self.cache_dir):
+            if root == self.cache_dir:
+                dirs[:] = [d for d in dirs if d != 'pack']
+            for name in files:
+                match = LOOSE_ENTRY_NAME.match(name)
+                if match is not None:
+                    yield match.group('hash'), int(match.group('n')), os.path.join(root, name)
+
+    def iter_hashes(self) -> Iterator[str]:
+        """The prompt hash of every stored invocation, packed ones first, without reading the invocations."""
+        if self.pack is not None:
+            yield from self.pack.iter_hashes()
+        for prompt_hash, _, _ in self.iter_loose_entries():
+            yield prompt_hash
+
+    def iter_serialized(self) -> Iterator[str]:
+        """Every stored invocation, serialized, packed ones first."""
+        if self.pack is not None:
+            yield from self.pack.iter_payloads()
+        for _, _, path in self.iter_loose_entries():
+            with open(path, 'r') as f:
+                yield f.read()
+
+    def compact(self) -> dict:
+        """Move every loose invocation into the pack and merge its index."""
+        if self.pack is None:
+            self.pack = InvocationPack(os.path.join(self.cache_dir, 'pack'))
+        stats = {'packed': 0, 'duplicates': 0}
+        for prompt_hash, n, path in list(self.iter_loose_entries()):
+            with open(path, 'r') as f:
+                serialized = f.read()
+            if self.pack.import_entry(prompt_hash, n, serialized):
+                stats['packed'] += 1
+            elif self.pack.load(prompt_hash, n) == serialized:
+                stats['duplicates'] += 1
+            else:
+                # Same name saved both loose and packed, keep it under the next free number
+                self.pack.append(prompt_hash, serialized, min_n=n)
+                stats['packed'] += 1
+            os.remove(path)
+        for name in os.listdir(self.cache_dir):
+            shard = os.path.join(self.cache_dir, name)
+            if len(name) == 2 and os.path.isdir(shard) and not os.listdir(shard):
+                os.rmdir(shard)
+        stats['indexed'] = self.pack.compact()
+        return stats
@@ -0,0 +1,254 @@
+import bisect
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from tempfile import NamedTemporaryFile
+
+# Segment record: digest, n, length of the compressed payload that follows
+RECORD_HEADER = struct.Struct('>16sII')
+# Index entry: digest, n, segment number, payload offset, payload length
+INDEX_ENTRY = struct.Struct('>16sIIQI')
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class _SortedIndex:
+    """Memory-mapped, sorted array of index entries, searched with bisect without loading it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._map = None
+        self.size = 0
+        self.stat = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._file = open(path, 'rb')
+            self.stat = os.fstat(self._file.fileno())
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.size = len(self._map) // INDEX_ENTRY.size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, i: int) -> bytes:
+        # Only the (digest, n) prefix, which is what the entries are sorted by
+        offset = i * INDEX_ENTRY.size
+        return self._map[offset:offset + 20]
+
+    def entry(self, i: int) -> tuple:
+        return INDEX_ENTRY.unpack_from(self._map, i * INDEX_ENTRY.size)
+
+    def find(self, key: bytes) -> tuple | None:
+        i = bisect.bisect_left(self, key)
+        if i < self.size and self[i] == key:
+            return self.entry(i)
+        return None
+
+    def entries(self):
+        for i in range(self.size):
+            yield self.entry(i)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+
+
+class InvocationPack:
+    """
+    Packed storage of LLM invocations: zlib-compressed records appended to a few large segment files.
+
+    The index is a sorted, memory-mapped file of fixed-width entries (written by ``compact``) plus an
+    append-only log of the entries written since, so opening a pack only reads the log. Appends are
+    serialized across processes with a lock file; readers pick up entries appended by other processes
+    on a miss. ``compact`` merges the log into the sorted index and moves loose JSON entries into the pack.
+    """
+
+    def __init__(self, pack_dir: str):
+        self.pack_dir = pack_dir
+        self._lock = threading.Lock()
+        self._fds: dict[int, int] = {}
+        self._open_index()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.pack_dir, name)
+
+    def _segment_path(self, segment: int) -> str:
+        return self._path(f"segment-{segment:06d}.pack")
+
+    def _open_index(self) -> None:
+        self._sorted = _SortedIndex(self._path('index.sorted'))
+        self._log: dict[bytes, tuple] = {}
+        self._log_offset = 0
+        self._read_log()
+
+    def _read_log(self) -> None:
+        log_path = self._path('index.log')
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # A partially written entry at the end is read again next time
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        for offset in range(0, usable, INDEX_ENTRY.size):
+            entry = INDEX_ENTRY.unpack_from(data, offset)
+            self._log[entry[0] + struct.pack('>I', entry[1])] = entry
+        self._log_offset += usable
+
+    def _refresh(self) -> bool:
+        """Pick up entries written by other processes. Returns True if the index changed."""
+        sorted_path, log_path = self._path('index.sorted'), self._path('index.log')
+        stat = os.stat(sorted_path) if os.path.exists(sorted_path) else None
+        log_size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        old_stat = self._sorted.stat
+        if (stat is None) != (old_stat is None) or (stat is not None and (stat.st_ino, stat.st_size) != (old_stat.st_ino, old_stat.st_size)) \
+                or log_size < self._log_offset:
+            # Compacted by another process
+            self._sorted.close()
+            self._open_index()
+            return True
+        if log_size > self._log_offset:
+            self._read_log()
+            return True
+        return False
+
+    def _lookup(self, key: bytes) -> tuple | None:
+        return self._log.get(key) or (self._sorted.find(key) if len(self._sorted) else None)
+
+    def _read_payload(self, entry: tuple) -> str:
+        _, _, segment, offset, length = entry
+        fd = self._fds.get(segment)
+        if fd is None:
+            fd = os.open(self._segment_path(segment), os.O_RDONLY)
+            self._fds[segment] = fd
+        return zlib.decompress(os.pread(fd, length, offset)).decode('utf-8')
+
+    def _find(self, prompt_hash: str, n: int) -> tuple | None:
+        """The index entry of invocation number n of the prompt. Must be called with the lock held."""
+        key = bytes.fromhex(prompt_hash) + struct.pack('>I', n)
+        entry = self._lookup(key)
+        if entry is None and self._refresh():
+            entry = self._lookup(key)
+        return entry
+
+    def contains(self, prompt_hash: str, n: int = 0) -> bool:
+        """Whether invocation number n of the prompt is packed, from the index only."""
+        with self._lock:
+            return self._find(prompt_hash, n) is not None
+
+    def load(self, prompt_hash: str, n: int = 0) -> str | None:
+        """The serialized invocation number n saved for the prompt, or None."""
+        with self._lock:
+            entry = self._find(prompt_hash, n)
+            if entry is None:
+                return None
+            return self._read_payload(entry)
+
+    @contextmanager
+    def _write_lock(self):
+        os.makedirs(self.pack_dir, exist_ok=True)
+        with open(self._path('lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _active_segment(self) -> int:
+        segments = sorted(int(name[8:14]) for name in os.listdir(self.pack_dir)
+                          if name.startswith('segment-') and name.endswith('.pack'))
+        if not segments:
+            return 1
+        if os.path.getsize(self._segment_path(segments[-1])) >= SEGMENT_MAX_BYTES:
+            return segments[-1] + 1
+        return segments[-1]
+
+    def _append_locked(self, prompt_hash: str, n: int, serialized: str) -> None:
+        digest = bytes.fromhex(prompt_hash)
+        payload = zlib.compress(serialized.encode('utf-8'), 6)
+        segment = self._active_segment()
+        with open(self._segment_path(segment), 'ab') as f:
+            offset = f.tell() + RECORD_HEADER.size
+            f.write(RECORD_HEADER.pack(digest, n, len(payload)) + payload)
+        # The index entry is written after the record, so readers never find an incomplete record
+        with open(self._path('index.log'), 'ab') as f:
+            f.write(INDEX_ENTRY.pack(digest, n, segment, offset, len(payload)))
+
+    def append(self, prompt_hash: str, serialized: str, min_n: int = 0) -> int:
+        """Pack one more invocation for the prompt, numbered at least min_n, and return its number."""
+        with self._write_lock(), self._lock:
+            self._refresh()
+            n = min_n
+            while self._lookup(bytes.fromhex(prompt_hash) + struct.pack('>I', n)) is not None:
+                n += 1
+            self._append_locked(prompt_hash, n, serialized)
+            self._read_log()
+            return n
+
+    def import_entry(self, prompt_hash: str, n: int, serialized: str) -> bool:
+        """Pack an invocation under its existing number. Returns False if that number is already packed."""
+        with self._write_lock(), self._lock:
+            self._refresh()
+            if self._lookup(bytes.fromhex(prompt_hash) + struct.pack('>I', n)) is not None:
+                return False
+            self._append_locked(prompt_hash, n, serialized)
+            self._read_log()
+            return True
+
+    def compact(self) -> int:
+        """Merge the index log into the sorted index. Returns the number of indexed invocations."""
+        with self._write_lock(), self._lock:
+            self._refresh()
+            entries = {entry[0] + struct.pack('>I', entry[1]): entry for entry in self._sorted.entries()}
+            entries.update(self._log)
+            tmp_file = NamedTemporaryFile(delete=False, dir=self.pack_dir, suffix='.tmp')
+            try:
+                with tmp_file:
+                    for key in sorted(entries):
+                        tmp_file.write(INDEX_ENTRY.pack(*entries[key]))
+                    tmp_file.flush()
+                    os.fsync(tmp_file.fileno())
+                os.replace(tmp_file.name, self._path('index.sorted'))
+            except BaseException:
+                os.unlink(tmp_file.name)
+                raise
+            open(self._path('index.log'), 'wb').close()
+            self._sorted.close()
+            self._open_index()
+            return len(entries)
+
+    def iter_hashes(self):
+        """The prompt hash of every packed invocation, from the index only."""
+        with self._lock:
+            self._refresh()
+            entries = list(self._sorted.entries()) + list(self._log.values())
+        for entry in entries:
+            yield entry[0].hex()
+
+    def iter_payloads(self):
+        """Every packed invocation, serialized."""
+        with self._lock:
+            self._refresh()
+            entries = list(self._sorted.entries()) + list(self._log.values())
+        for entry in entries:
+            with self._lock:
+                payload = self._read_payload(entry)
+            yield payload
+
+    def stats(self) -> dict:
+        """Files and bytes used by the pack."""
+        if not os.path.isdir(self.pack_dir):
+            return {'files': 0, 'bytes': 0}
+        names = [name for name in os.listdir(self.pack_dir) if name != 'lock']
+        return {'files': len(names), 'bytes': sum(os.path.getsize(self._path(name)) for name in names)}
+
+    def close(self) -> None:
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+            self._sorted.close()
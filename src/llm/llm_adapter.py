@@ -1,36 +1,209 @@
 import os, json, logging
-import uuid
+import asyncio
+import fcntl
+import random
+import threading
+import time
+from collections import Counter
 
-from openai import OpenAI
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 import src.config as conf
-from src.llm.invocation import Invocation, Prompt
+from src.llm.invocation import Invocation, Prompt, Response
+from src.llm.invocation_cache import InvocationCache
+from src.llm.telemetry import STAGE, API, CACHE, COALESCED, telemetry, estimate_cost
+from src.llm.tokens import count_tokens
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """The event loop all adapters run their requests on, in a daemon thread started on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+        return _loop
 
 
 class LLMAdapter:
+    """
+    Chat completion through the OpenRouter API, with the invocation cache in front of it.
+
+    Requests are made with an async client on a shared event loop, at most llm['max-in-flight'] at a time
+    per adapter and each limited to llm['request-timeout'] seconds. Rate limits and transient errors are
+    retried with jittered exponential backoff. Concurrent requests for the same prompt are coalesced into
+    one API call: within a process by awaiting the request in flight, across processes (when the cache
+    is read and written) with a lock file of the prompt, after which the answer of the other process is
+    read from the cache. Cache reads and writes run in worker threads, off the event loop. The synchronous
+    methods can be called from any thread except the event loop's.
+
+    Every call is recorded in the run's LLM telemetry, under the stage of the calling context.
+    """
+
     def __init__(self, read_from_cache: bool=False, save_to_cache: bool=False, model: str=conf.llm['default-model']):
         self.cache_dir = conf.llm['llm-invocation-cache-dir']
+        self.cache = InvocationCache(self.cache_dir, packed=conf.llm['llm-invocation-cache-packed'])
         self.read_from_cache = read_from_cache
         self.save_to_cache = save_to_cache
-        self.client = OpenAI(
+        self.client = AsyncOpenAI(
             base_url=conf.llm['api-url'],
             api_key=conf.llm['openrouter-api-key'],
+            timeout=conf.llm['request-timeout'],
+            max_retries=0, # Retried in _call_with_retry
         )
         self.model = model
-    
+        # Outcomes of the calls, and latency, tokens and cost of the API calls
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        # Only used on the event loop
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+
     def get_model(self) -> str:
         return self.model
 
+    async def complete(self, prompt: Prompt):
+        """One API call, without cache or retries. Returns the response and the token usage reported by the API."""
+        completion = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[m.__dict__ for m in prompt.messages]
+        )
+        response = Response([Response.Sample(c.message.content)
+                             for c in completion.choices])
+        return response, completion.usage
+
+    def _run(self, coroutine):
+        stage = STAGE.get()
+
+        async def in_stage():
+            # The event loop does not share the context of the calling thread
+            STAGE.set(stage)
+            return await coroutine
+
+        return asyncio.run_coroutine_threadsafe(in_stage(), _event_loop()).result()
+
+    def get_response(self, prompt: Prompt) -> Response:
+        return self._run(self.aget_response(prompt))
+
+    def get_responses(self, prompts: list[Prompt]) -> list[Response]:
+        """Answer many prompts concurrently; responses are returned in the order of the prompts."""
+        return self._run(self.aget_responses(prompts))
+
+    async def aget_responses(self, prompts: list[Prompt]) -> list[Response]:
+        return list(await asyncio.gather(*(self.aget_response(prompt) for prompt in prompts)))
+
+    async def aget_response(self, prompt: Prompt) -> Response:
+        started = time.perf_counter()
+        cached_invocation = await asyncio.to_thread(self.load_cache, prompt)
+        if cached_invocation:
+            self._record(prompt, cached_invocation.response, CACHE, time.perf_counter() - started)
+            return cached_invocation.response
+
+        prompt_hash = prompt.hash()
+        task = self._in_flight.get(prompt_hash)
+        owner = task is None
+        if owner:
+            task = asyncio.ensure_future(self._fetch(prompt, prompt_hash))
+            self._in_flight[prompt_hash] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(prompt_hash, None))
+        # A cancelled waiter does not cancel the request the other waiters share
+        response, usage = await asyncio.shield(task)
+        outcome = API if owner and usage is not None else COALESCED
+        self._record(prompt, response, outcome, time.perf_counter() - started, usage if outcome == API else None)
+        return response
+
+    async def _fetch(self, prompt: Prompt, prompt_hash: str) -> tuple[Response, tuple[int, int] | None]:
+        """The response and, if it was made, the (prompt, completion) tokens of the API call."""
+        if not (self.read_from_cache and self.save_to_cache):
+            return await self._call_and_save(prompt)
+
+        lock_file = await asyncio.to_thread(self._lock_prompt, prompt_hash)
+        try:
+            # Answered by another process while waiting for the lock
+            cached_invocation = await asyncio.to_thread(self.load_cache, prompt)
+            if cached_invocation:
+                return cached_invocation.response, None
+            response = await self._call_and_save(prompt)
+            # The answer is in the cache, processes waiting on this file read it from there, later ones do not wait
+            os.unlink(lock_file.name)
+            return response
+        finally:
+            lock_file.close()
+
+    def _lock_prompt(self, prompt_hash: str):
+        """
+        Lock the prompt across processes. The lock file is the prompt's own, so only requests for the same
+        prompt wait for each other.
+        """
+        lock_dir = os.path.join(self.cache_dir, 'locks', prompt_hash[:2])
+        os.makedirs(lock_dir, exist_ok=True)
+        lock_file = open(os.path.join(lock_dir, f"{prompt_hash}.lock"), 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX) # Released when the file is closed
+        return lock_file
+
+    async def _call_and_save(self, prompt: Prompt) -> tuple[Response, tuple[int, int]]:
+        response, tokens = await self._call_with_retry(prompt)
+        await asyncio.to_thread(self.save_cache, Invocation(prompt, response, time.time()))
+        return response, tokens
+
+    async def _call_with_retry(self, prompt: Prompt) -> tuple[Response, tuple[int, int]]:
+        """complete, retried with exponential backoff and jitter on rate limits and transient API errors."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(conf.llm['max-in-flight'])
+        max_retries = conf.llm['max-retries']
+        for attempt in range(max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response, usage = await self.complete(prompt)
+                if usage is None:
+                    return response, self._count_tokens(prompt, response)
+                return response, (usage.prompt_tokens, usage.completion_tokens)
+            except RETRYABLE_ERRORS as e:
+                if attempt == max_retries:
+                    raise
+                backoff = conf.llm['retry-initial-backoff'] * 2 ** attempt
+                backoff += random.uniform(0, backoff)
+                logging.warning(f"{self.model} request failed ({e.__class__.__name__}), retrying in {backoff:.1f}s.")
+                await asyncio.sleep(backoff)
+
+    def _count_tokens(self, prompt: Prompt, response: Response) -> tuple[int, int]:
+        return (sum(count_tokens(self.model, m.content) for m in prompt.messages),
+                sum(count_tokens(self.model, s.content or "") for s in response.samples))
+
+    def _record(self, prompt: Prompt, response: Response, outcome: str, seconds: float,
+                tokens: tuple[int, int] | None = None) -> None:
+        """Record a call in the telemetry. Without tokens from the API, they are counted with tiktoken."""
+        prompt_tokens, completion_tokens = tokens if tokens is not None else self._count_tokens(prompt, response)
+        telemetry.record(STAGE.get(), self.model, outcome, prompt_tokens, completion_tokens, seconds)
+        with self._stats_lock:
+            self.stats[outcome] += 1
+            if outcome == API:
+                self.stats['api_seconds'] += seconds
+                self.stats['cost'] += estimate_cost(self.model, prompt_tokens, completion_tokens) or 0.0
+
+    def mean_call_seconds(self) -> float | None:
+        """Mean wall latency of the API calls, retries included."""
+        with self._stats_lock:
+            return self.stats['api_seconds'] / self.stats[API] if self.stats[API] else None
+
+    def mean_call_cost(self) -> float | None:
+        """Estimated USD per API call, from llm['prices'] and the token usage."""
+        with self._stats_lock:
+            if self.model not in conf.llm['prices'] or not self.stats[API]:
+                return None
+            return self.stats['cost'] / self.stats[API]
+
     def load_cache(self, prompt: Prompt) -> Invocation | None:
         if not self.read_from_cache:
             return None
 
-        prompt_hash = prompt.hash()
-        cached_files = [f for f in os.listdir(self.cache_dir) if os.path.isfile(os.path.join(self.cache_dir, f))
-                        and prompt_hash in f]
-
-        if len(cached_files) > 0:
-            with open(os.path.join(self.cache_dir, cached_files[0]), 'r') as f:
-                return Invocation.load_from_json(json.load(f))
+        cached = self.cache.load(prompt.hash())
+        if cached is not None:
+            return Invocation.load_from_json(cached)
 
         return None
 
@@ -39,13 +212,8 @@ class LLMAdapter:
             return
 
         prompt_hash = invocation.prompt.hash()
-        cached_files = [f for f in os.listdir(self.cache_dir) if os.path.isfile(os.path.join(self.cache_dir, f))
-                        and prompt_hash in f]
-
-        if len(cached_files) > 0 and self.read_from_cache:
+        if self.read_from_cache and self.cache.contains(prompt_hash):
             # It is already loaded from cache, no reason to save it again
             return
 
-        cache_file = os.path.join(self.cache_dir, f"{prompt_hash}-{len(cached_files)}.json")
-        with open(cache_file, 'w') as f:
-            json.dump(invocation, f, default=lambda o: o.__dict__)
\ No newline at end of file
+        self.cache.save(prompt_hash, json.dumps(invocation, default=lambda o: o.__dict__))
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+from typing import Callable
+
+from src.llm.invocation import Invocation, Prompt, Response
+from src.llm.invocation_cache import InvocationCache
+from src.llm.llm_adapter import LLMAdapter
+
+
+class ReplayMissError(LookupError):
+    """A prompt without a recorded invocation was sent to a ReplayLLMAdapter without fallback."""
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    A latency distribution, in seconds, from a spec like 'none', 'constant:0.8', 'uniform:0.3,1.5',
+    'exponential:0.8' (mean) or 'lognormal:0.8,0.5' (median, sigma of the underlying normal).
+    """
+    name, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+    distributions = {
+        'none': (0, lambda rnd: 0.0),
+        'constant': (1, lambda rnd: values[0]),
+        'uniform': (2, lambda rnd: rnd.uniform(values[0], values[1])),
+        'exponential': (1, lambda rnd: rnd.expovariate(1 / values[0])),
+        'lognormal': (2, lambda rnd: rnd.lognormvariate(math.log(values[0]), values[1])),
+    }
+    if name not in distributions or len(values) != distributions[name][0]:
+        raise ValueError(f"Invalid latency distribution '{spec}'.")
+    return distributions[name][1]
+
+
+class ReplayLLMAdapter(LLMAdapter):
+    """
+    LLMAdapter answering from recorded invocations instead of the API, for offline benchmarks.
+
+    Every prompt goes through the regular request path (concurrency limit, coalescing, telemetry) as if it
+    were not cached, and its recorded response in recordings_dir is returned after a simulated latency.
+    The latency of a prompt is drawn from a generator seeded with the prompt hash and the seed, so runs are
+    reproducible whatever the order of the requests. Prompts without a recording raise ReplayMissError,
+    unless a fallback answers them; the fallback answers are recorded, so later runs replay them.
+    """
+
+    def __init__(self, model: str, recordings_dir: str, latency: str = 'none', seed: int = 0,
+                 fallback: Callable[[Prompt], str] | None = None):
+        super().__init__(read_from_cache=False, save_to_cache=False, model=model)
+        self.recordings = InvocationCache(recordings_dir)
+        self.latency = parse_latency(latency)
+        self.seed = seed
+        self.fallback = fallback
+        self._recordings_lock = threading.Lock()
+
+    def _recorded_response(self, prompt: Prompt) -> Response:
+        prompt_hash = prompt.hash()
+        with self._recordings_lock:
+            recorded = self.recordings.load(prompt_hash)
+            if recorded is None:
+                if self.fallback is None:
+                    raise ReplayMissError(f"No recorded invocation of {self.model} for prompt {prompt_hash}.")
+                response = Response([Response.Sample(self.fallback(prompt))])
+                self.recordings.save(prompt_hash, json.dumps(Invocation(prompt, response, 0.0), default=lambda o: o.__dict__))
+                with self._stats_lock:
+                    self.stats['replay_misses'] += 1
+                return response
+        return Invocation.load_from_json(recorded).response
+
+    async def complete(self, prompt: Prompt):
+        response = self._recorded_response(prompt)
+        seed = int(hashlib.md5(f"{self.seed}-{prompt.hash()}".encode('utf-8')).hexdigest()[:16], 16)
+        await asyncio.sleep(self.latency(random.Random(seed)))
+        # No usage, tokens are counted like for cache hits
+        return response, None
@@ -0,0 +1,120 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+import pandas as pd
+import src.config as conf
+
+# Stage the LLM calls of the current context are attributed to, set with LLMTelemetry.stage
+STAGE = contextvars.ContextVar('llm_stage', default='unstaged')
+
+API, CACHE, COALESCED = 'api', 'cache', 'coalesced'
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float | None:
+    """USD, from llm['prices'], or None for models without a price."""
+    price = conf.llm['prices'].get(model)
+    if price is None:
+        return None
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6
+
+
+class LLMTelemetry:
+    """
+    Per-run metrics of the LLM calls, aggregated per stage and model.
+
+    Every get_response is recorded with its outcome (answered by the API, the cache, or a concurrent
+    request for the same prompt), its prompt and completion tokens (as reported by the API, counted with
+    tiktoken otherwise), its wall latency and its estimated cost. For cache hits and coalesced requests,
+    the cost is what the API call would have cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, str], Counter] = defaultdict(Counter)
+        self._latencies: dict[tuple[str, str], list[float]] = defaultdict(list)
+        self._stage_seconds = Counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Attribute the LLM calls made in the block to a stage and measure its wall time."""
+        token = STAGE.set(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            STAGE.reset(token)
+            with self._lock:
+                self._stage_seconds[name] += time.perf_counter() - started
+
+    def record(self, stage: str, model: str, outcome: str, prompt_tokens: int, completion_tokens: int,
+               seconds: float) -> None:
+        cost = estimate_cost(model, prompt_tokens, completion_tokens) or 0.0
+        with self._lock:
+            counter = self._counters[(stage, model)]
+            counter['calls'] += 1
+            counter[outcome] += 1
+            counter['prompt_tokens'] += prompt_tokens
+            counter['completion_tokens'] += completion_tokens
+            counter['seconds'] += seconds
+            counter['cost' if outcome == API else 'cost_avoided'] += cost
+            self._latencies[(stage, model)].append(seconds)
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per stage and model."""
+        rows = []
+        with self._lock:
+            for (stage, model), counter in sorted(self._counters.items()):
+                latencies = pd.Series(self._latencies[(stage, model)])
+                rows.append({
+                    'stage': stage,
+                    'model': model,
+                    'calls': counter['calls'],
+                    'api_calls': counter[API],
+                    'cache_hits': counter[CACHE],
+                    'coalesced': counter[COALESCED],
+                    'cache_hit_rate': counter[CACHE] / counter['calls'],
+                    'prompt_tokens': counter['prompt_tokens'],
+                    'completion_tokens': counter['completion_tokens'],
+                    'llm_seconds': counter['seconds'],
+                    'mean_latency': latencies.mean(),
+                    'p95_latency': latencies.quantile(0.95),
+                    'cost_usd': counter['cost'],
+                    'cost_avoided_usd': counter['cost_avoided'],
+                    'stage_wall_seconds': self._stage_seconds.get(stage),
+                })
+        return pd.DataFrame(rows)
+
+    def report(self) -> str:
+        df = self.to_frame()
+        if df.empty:
+            return "LLM telemetry: no calls recorded."
+        lines = ["LLM telemetry per stage and model:", df.to_string(index=False, float_format=lambda v: f'{v:.4g}')]
+        for stage, group in df.groupby('stage'):
+            wall = self._stage_seconds.get(stage)
+            # Summed latencies exceed the wall time when calls run concurrently
+            wall = f" in {wall:.1f}s of wall time" if wall else ""
+            lines.append(f"{stage}: {group['calls'].sum()} calls, {group['api_calls'].sum()} to the API, "
+                         f"{group['llm_seconds'].sum():.1f}s of summed LLM latency{wall}, "
+                         f"${group['cost_usd'].sum():.4f} spent, ${group['cost_avoided_usd'].sum():.4f} avoided.")
+        return '\n'.join(lines)
+
+    def write_report(self, path: str) -> None:
+        df = self.to_frame()
+        if df.empty:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        df.to_csv(path, index=False)
+
+
+telemetry = LLMTelemetry()
+
+
+def log_llm_telemetry() -> None:
+    """Log the report of the run and write it to llm['telemetry-report-path']."""
+    logging.info(telemetry.report())
+    telemetry.write_report(conf.llm['telemetry-report-path'])
@@ -0,0 +1,68 @@
+import logging
+import threading
+
+import tiktoken
+
+_encodings: dict[str, tiktoken.Encoding | None] = {}
+_encoding_errors: dict[str, Exception] = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding(model: str) -> tiktoken.Encoding | None:
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model.split('/')[-1])
+                except KeyError:
+                    # Models tiktoken does not know, like the OpenRouter ones, are counted with the GPT-4o encoding
+                    _encodings[model] = tiktoken.get_encoding('o200k_base')
+            except Exception as e:
+                # The encodings are downloaded on first use
+                logging.warning(f"No tiktoken encoding for {model} ({e.__class__.__name__}), "
+                                f"counting four characters per token.")
+                _encodings[model] = None
+                _encoding_errors[model] = e
+        return _encodings[model]
+
+
+def _exact_encoding(model: str) -> tiktoken.Encoding:
+    """The encoding of the model, or an error: prompts cut with an estimate would depend on the network."""
+    encoding = _encoding(model)
+    if encoding is None:
+        raise RuntimeError(f"The tiktoken encoding of {model} is needed to cut prompts to their token budget, "
+                           f"but it could not be loaded ({_encoding_errors[model].__class__.__name__}). Load it once "
+                           f"with network access, or point TIKTOKEN_CACHE_DIR to a directory holding it.")
+    return encoding
+
+
+def count_tokens(model: str, text: str) -> int:
+    """Tokens of the text, estimated from its length without the encoding. For reports only."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_exact_tokens(model: str, text: str) -> int:
+    """Tokens of the text, with the encoding of the model or an error."""
+    return len(_exact_encoding(model).encode(text, disallowed_special=()))
+
+
+def fits_in_tokens(model: str, text: str, max_tokens: int) -> bool:
+    """Whether the text has at most max_tokens tokens, without the encoding when it is short enough."""
+    # Every token is at least one byte
+    if len(text.encode('utf-8')) <= max_tokens:
+        return True
+    return count_exact_tokens(model, text) <= max_tokens
+
+
+def truncate_to_tokens(model: str, text: str, max_tokens: int) -> str:
+    """The longest prefix of the text with at most max_tokens tokens."""
+    max_tokens = max(0, max_tokens)
+    if fits_in_tokens(model, text, max_tokens):
+        return text
+    encoding = _exact_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    # A token cut in the middle of a multi-byte character is dropped
+    return encoding.decode_bytes(tokens[:max_tokens]).decode('utf-8', errors='ignore')
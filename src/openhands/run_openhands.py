@@ -2,7 +2,8 @@ import os
 from src.gh.commit_analysis.commit_static_analyzer import RepoAnalyzer
 from src.utils import run_cmd, pull_image_install_git, create_tmp_container
 from src import config
-from github import Github, Auth, Repository
+from src.gh.client import get_github_client, log_github_client_stats
+from github import Repository
 import logging
 
 TASK_TYPE_TO_PATHS = {
@@ -13,8 +14,7 @@ class OpenHandsRunner:
     def __init__(self, working_dir: str):
         self.working_dir = config.utils['working-dir']
         self.gh_token = config.github['access-token']
-        auth = Auth.Token(self.gh_token)
-        self.g = Github(auth=auth)
+        self.g = get_github_client(self.gh_token)
 
     def _prepare_workspace(self, container_name: str, before_commit: str | None, after_commit: str, task_type: str, pr_number: int | None = None) -> str:
         workspace_path = os.path.join(self.working_dir, 'workspace')
@@ -232,6 +232,7 @@ class OpenHandsRunner:
         repo = self.g.get_repo(repo)
 
         self._prepare_openhands_files(image_name, repo, before_commit, after_commit, issue_id, workspace_path, 'patch')
+        log_github_client_stats()
         
         self._remove_tmp_container(container_name)
         self._remove_git_dir(workspace_path, 'patch')
@@ -255,6 +256,7 @@ class OpenHandsRunner:
 
         self._prepare_openhands_files(image_name, repo, before_commit, after_commit, issue_id, workspace_path, 'test')
         logging.info(f"Prepared openhands files")
+        log_github_client_stats()
         
         self._remove_tmp_container(container_name)
         self._remove_git_dir(workspace_path, 'test')
@@ -1,9 +1,13 @@
 import logging
+import time
 from datetime import datetime
+from functools import partial
 import multiprocessing as mp
 from multiprocessing import Manager
 import src.config as conf
-from src.data.dataset_adapter import DatasetAdapter
+from src.analysis_plan import describe_plan, plan_analysis
+from src.analysis_schedule import AnalysisProgress, estimate_costs, format_seconds, longest_first, makespan
+from src.data.dataset_adapter import DatasetAdapter, create_dataset_adapter
 from src.gh.commit_analysis.test_analyzer import CommitPerfImprovementAnalyzer
 import src.reproducibility.system_resource_checker as system_resource_checker
 from src.utils import run_cmd
@@ -28,13 +32,19 @@ def define_new_builder(builder_index: int):
     run_cmd(['docker', 'builder', 'create', '--name', builder_name, '--driver=docker-container', f'--driver-opt=memory={memory_per_exec}g', f'--driver-opt=cpuset-cpus={builder_index*cpu_core_per_exec}-{(builder_index+1)*cpu_core_per_exec-1}'], WORKING_DIR, capture_output=False)
     return builder_name
 
-def run_analysis(repo: str, before_commit: str, commit: str, pr_number: int, builder_queue: mp.Queue, dataset: DatasetAdapter):
+def run_analysis(repo: str, before_commit: str, commit: str, pr_number: int, builder_queue: mp.Queue, dataset: DatasetAdapter,
+                 running=None) -> tuple[float, float] | None:
+    """Analyze a commit with the first free builder. Returns the start and end times of the analysis."""
     builder_name = None
     analyzer = None
+    started = None
     try:
         # Acquire a builder from the queue (blocks until one is available)
         builder_name = builder_queue.get()
         logging.info(f"{repo} - {commit} - Acquired builder: {builder_name}")
+        started = time.time()
+        if running is not None:
+            running[(repo, commit)] = started
         
         logging.info(f"{repo} - {commit} - Running analysis")
 
@@ -54,6 +64,9 @@ def run_analysis(repo: str, before_commit: str, commit: str, pr_number: int, bui
         if builder_name is not None:
             builder_queue.put(builder_name)
             logging.info(f"{repo} - {commit} - Released builder: {builder_name}")
+        if running is not None:
+            running.pop((repo, commit), None)
+    return None if started is None else (started, time.time())
 
 def run_resource_checker():
     try:
@@ -62,13 +75,33 @@ def run_resource_checker():
         logging.error(f"Resource checker error: {e}")
         sys.exit(1)
 
-def run():
+def run(only_status: list[str] | None = None, force: bool = False, dry_run: bool = False):
+    dataset = create_dataset_adapter()
+    # Statuses logged by an interrupted run are not in the dataset yet
+    dataset.compact()
+    plan = plan_analysis(dataset.get_dataset(), dataset.get_events(), only_status, force)
+    summary = describe_plan(plan)
+    logging.info(summary)
+    print(summary)
+    NUM_PROCESSES = conf.run_analysis['num-processes']
+    jobs = longest_first(estimate_costs(plan[plan["run"]], dataset.get_dataset(), dataset.stage_durations()))
+    if len(jobs):
+        sources = ", ".join(f"{count} from {source}" for source, count in jobs["estimate_source"].value_counts().items())
+        longest_first_seconds = makespan(jobs["estimate"].tolist(), NUM_PROCESSES)
+        dataset_order_seconds = makespan(jobs.sort_index()["estimate"].tolist(), NUM_PROCESSES)
+        schedule = (f"Estimated duration with {NUM_PROCESSES} builder(s): {format_seconds(longest_first_seconds)} longest first, "
+                    f"{format_seconds(dataset_order_seconds)} in dataset order (longest job {format_seconds(jobs['estimate'].max())}; "
+                    f"estimates: {sources})")
+        logging.info(schedule)
+        print(schedule)
+    if dry_run or not len(jobs):
+        return
+
     # run_resource_checker() in a separate thread
     # resource_checker_thread = threading.Thread(target=run_resource_checker)
     # resource_checker_thread.start()
 
     pool = None
-    NUM_PROCESSES = conf.run_analysis['num-processes']
     pool = mp.Pool(processes=NUM_PROCESSES)
 
     # Create a manager and a queue to hold builder names
@@ -81,17 +114,25 @@ def run():
         builder_queue.put(builder_name)
         logging.info(f"Created and added builder to queue: {builder_name}")
     
-    dataset = DatasetAdapter()
-    df = dataset.get_dataset()
-    for _, row in df.iterrows():
+    # Start times of the jobs holding a builder, for the progress reports
+    running = manager.dict()
+    progress = AnalysisProgress(jobs, NUM_PROCESSES, running)
+    progress.start()
+    # The pool hands the jobs to the workers in submission order, so the longest ones start first
+    for _, row in jobs.iterrows():
         repo = row['repo']
         commit = row['after_commit']
         before_commit = row['before_commit']
         pr_number = row['pr_number']
-        pool.apply_async(run_analysis, (repo, before_commit, commit, pr_number, builder_queue, dataset))
+        done = partial(progress.job_done, (repo, commit))
+        pool.apply_async(run_analysis, (repo, before_commit, commit, pr_number, builder_queue, dataset, running),
+                         callback=done, error_callback=lambda e, done=done: done(None))
 
     pool.close()
     pool.join()
+    progress.stop()
+    dataset.compact()
+    logging.info("Compacted the status events into the dataset")
 
     # stop resource checker
     # system_resource_checker.stop_resource_checker_event.set()